@@ -1,6 +1,6 @@
 # app/config.py
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Set, Optional
+from typing import Dict, List, Set, Optional
 from pathlib import Path
 import os
 
@@ -35,7 +35,84 @@ class Settings(BaseSettings):
 
     # ── Claude / Anthropic (sole AI provider) ────────────────────
     claude_api_key: str = ""                        # set CLAUDE_API_KEY in .env
+    claude_api_key_pool: List[str] = []             # extra keys, JSON list (admin can edit the pool too)
     claude_model: str = "claude-sonnet-4-6"         # safe default
+    claude_base_url: Optional[str] = None           # e.g. a local stub server (app/scripts/claude_stub_server.py)
+    # Pooled HTTP clients (one per api_key, reused across calls)
+    claude_max_connections: int = 50
+    claude_max_keepalive_connections: int = 20
+    claude_keepalive_expiry_seconds: float = 30.0
+    claude_timeout_seconds: float = 120.0           # read timeout; Opus tailoring can take ~60s
+    claude_connect_timeout_seconds: float = 10.0
+    # Long single-prompt calls get a prompt-cache breakpoint after their stable
+    # prefix only above this size (~1024 tokens, the model minimum)
+    claude_prompt_cache_min_chars: int = 4000
+    # Opt-in response cache for deterministic prompts (call_ai(..., cache=True))
+    ai_cache_max_entries: int = 512                 # in-process LRU size
+    ai_cache_ttl_seconds: int = 7 * 24 * 3600       # Mongo TTL on ai_response_cache
+    # Prompt input budgets, in locally estimated tokens (services/prompt_budget.py)
+    prompt_budget_extract_tokens: int = 25_000      # extraction must see the whole document
+    prompt_budget_resume_tokens: int = 12_000       # resume in resume/JD prompts
+    prompt_budget_jd_tokens: int = 6_000            # job description in resume/JD prompts
+    prompt_budget_ranking_resume_tokens: int = 3_000
+    prompt_budget_ranking_job_tokens: int = 200     # per job description in the ranking prompt
+    # Re-uploading the resume already extracted for the user (same content
+    # fingerprint) reuses the stored extraction; share of the extract_resume
+    # cost still charged then (0 = free)
+    resume_reuse_charge_factor: float = 0.0
+    # Resume PDF → text (services/pdf_text_service.py)
+    pdf_extract_workers: int = 0                    # process pool size, 0 = one per core
+    pdf_extract_engine: str = "auto"                # "auto" = pypdfium2 with pdfplumber fallback, or "pdfplumber"
+    pdf_extract_timeout_seconds: float = 30.0
+    resume_upload_max_bytes: int = 10 * 1024 * 1024  # multipart PDF upload (/extract-resume/upload)
+    # ATS numbers (score, breakdown, matched/missing skills, keyword buckets)
+    # come from the local engine (services/ats_engine.py); Claude writes only
+    # the prose. False = Claude computes everything, as before.
+    ats_local_scoring: bool = True
+    # Tailoring in the streaming flows (/tailor-for-job/stream, chat tool):
+    # "sections" = one Claude call per section, run concurrently and streamed
+    # as they finish (services/tailor_sections.py); "single" = one full call.
+    # Section mode scores with the local ATS engine, so it needs ats_local_scoring
+    tailor_mode: str = "sections"
+    # Opt in: section mode for POST /tailor-resume and tailor_resume jobs too
+    # (their output then carries local scores and per-section notes)
+    tailor_sections_rest: bool = False
+    tailor_section_concurrency: int = 4             # section calls in flight per tailoring
+    # Rewritten sections are kept in tailor_section_cache (TTL ai_cache_ttl_seconds)
+    # and reused for a new JD when the section's target keywords overlap the
+    # cached run's by at least tailor_cache_min_overlap (Jaccard)
+    tailor_section_cache: bool = True
+    tailor_cache_min_overlap: float = 0.8
+    # Background AI jobs (services/ai_jobs.py): /api/ai-jobs/* queue tailor /
+    # extract / analyze-and-tailor in ai_jobs; clients poll or follow the SSE stream
+    ai_job_workers: int = 4                         # jobs run concurrently per process, 0 = none here
+    ai_job_poll_seconds: float = 1.0                # idle workers and subscribers re-check this often
+    ai_job_lease_seconds: float = 60.0              # a running job whose lease lapses is claimed again
+    ai_job_max_attempts: int = 2
+    ai_job_timeout_seconds: float = 600.0
+    ai_job_ttl_seconds: int = 7 * 24 * 3600         # Mongo TTL on ai_jobs (results stay readable until then)
+    # Admission control (per model, this process) + 429/529 backoff. Slot and
+    # token limits are per API key: they scale with the keys not cooling down.
+    claude_max_concurrency_per_model: int = 8
+    claude_tokens_per_minute: int = 400_000         # estimated in+out tokens admitted per model per minute
+    claude_admission_timeout_seconds: float = 120.0 # max time a call may wait for a slot
+    claude_backoff_max_retries: int = 4
+    claude_backoff_base_seconds: float = 1.0
+    claude_backoff_max_seconds: float = 30.0
+    # Key pool: a key that returns 429/529 rests for retry-after (or this long);
+    # a rejected key (401/403) rests much longer
+    claude_key_cooldown_seconds: float = 30.0
+    claude_key_auth_cooldown_seconds: float = 900.0
+    # Fair scheduling weights by users.active_plan (higher = larger share of
+    # Claude slots). ai_plan_weights overrides per plan name, e.g. {"Pro": 6}.
+    ai_weight_free: float = 1.0
+    ai_weight_paid: float = 4.0
+    ai_plan_weights: Dict[str, float] = {}
+    ai_background_max_share: float = 0.5            # max slot share for cron / batch work
+    # Message Batches (daily job-feed ranking)
+    daily_refresh_batch_mode: bool = True
+    claude_batch_poll_seconds: float = 60.0
+    claude_batch_max_wait_seconds: float = 4 * 3600 # then unanswered prompts fall back to normal calls
 
     # ── Google Generative AI (legacy — only used by openclaw CLI) ─
     # Optional. The main API runtime no longer routes any traffic to Google.
@@ -5,35 +5,50 @@ Credits are deducted BEFORE processing and refunded if processing fails.
 Costs are DB-driven via credits_on_features collection.
 """
 
+import asyncio
 import logging
-from fastapi import HTTPException, status
+from contextlib import aclosing
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Set
 
+from fastapi import HTTPException, Request, status
+
+from app.config import settings
 from app.services.credits_service import CreditsService
 from app.services.resume_processor import (
-    analyze_resume_match,
-    extract_resume_from_text,
-    tailor_resume,
-    calculate_ats_score,
-    parse_job_description,
-    generate_cover_letter,
-    generate_skills_roadmap,
-    check_resume_completeness,
-    analyze_and_tailor,
-    keyword_distribution,
+    analyze_resume_match_async,
+    prepare_resume_text_async,
+    prepare_resume_pdf_file_async,
+    resume_fingerprint,
+    extract_resume_from_prepared_text_async,
+    tailor_resume_async,
+    calculate_ats_score_async,
+    quick_ats_score,
+    parse_job_description_async,
+    generate_cover_letter_async,
+    generate_skills_roadmap_async,
+    check_resume_completeness_async,
+    analyze_and_tailor_async,
+    keyword_distribution_async,
+    resume_bundle_async,
 )
+from app.services.tailor_sections import stream_tailor_resume, tailor_resume_sections_async
+from app.services.ai_jobs import get_job, register_job_handler, submit_job
 from app.models.resume_ai.schemas import (
     AnalyzeResumeRequest, AnalyzeResumeResponse,
     ExtractResumeRequest, ExtractResumeResponse,
     TailorResumeRequest, TailorResumeResponse,
-    AtsScoreRequest, AtsScoreResponse,
+    AtsScoreRequest, AtsScoreResponse, QuickAtsScoreResponse,
     ParseJobRequest, ParseJobResponse,
     GenerateCoverLetterRequest, GenerateCoverLetterResponse,
     SkillsRoadmapRequest, SkillsRoadmapResponse,
     CheckCompletenessRequest, CheckCompletenessResponse,
     AnalyzeAndTailorRequest, AnalyzeAndTailorResponse,
     KeywordDistributionRequest, KeywordDistributionResponse,
+    ResumeBundleRequest,
+    AIRequestBase, AiJobKind, AiJobResponse,
 )
 from app.services.incoming_resume_service import IncomingResumeService
+from app.services.resume_upload import UploadError, spool_pdf_upload
 
 logger = logging.getLogger(__name__)
 
@@ -48,7 +63,7 @@ async def process_analyze_resume(
         raise HTTPException(403, message or "Insufficient credits")
 
     try:
-        result = analyze_resume_match(request.resume, request.jobDescription)
+        result = await analyze_resume_match_async(request.resume, request.jobDescription)
         await CreditsService.commit_ai_tokens()
         result["creditsUsed"] = cost
         return AnalyzeResumeResponse(**result)
@@ -58,45 +73,108 @@ async def process_analyze_resume(
         raise HTTPException(500, "Processing failed")
 
 
+async def _reuse_extraction(current_user: str, cost: float, stored: dict) -> ExtractResumeResponse:
+    """Same resume as the stored extraction: no Claude call, discounted charge."""
+    charge = round(cost * settings.resume_reuse_charge_factor, 2)
+    if charge > 0:
+        success, message = await CreditsService.deduct_credits(current_user, amount=charge, feature="extract_resume")
+        if not success:
+            raise HTTPException(403, message or "Insufficient credits")
+    logger.info(f"Extract resume: fingerprint match for {current_user}, reused stored extraction (charged {charge})")
+    return ExtractResumeResponse(**{**stored, "creditsUsed": charge})
+
+
+async def _save_extraction(
+    current_user: str,
+    document_text: Optional[str],
+    result: Dict,
+    fingerprint: str,
+    raw_file: Optional[BinaryIO] = None,
+) -> None:
+    await IncomingResumeService.save_or_update(
+        user_id=current_user,
+        raw_input=document_text,
+        extracted_data=result,
+        fingerprint=fingerprint,
+        raw_file=raw_file,
+    )
+
+    # Auto-save any contact URLs found in the resume to the user profile
+    try:
+        from app.services.mongo import mongo as _mongo
+        from bson import ObjectId
+        contact = result.get("contact", {}) or {}
+        url_patch = {}
+        if contact.get("website"):  url_patch["portfolio_url"] = contact["website"]
+        if contact.get("linkedin"): url_patch["linkedin_url"]  = contact["linkedin"]
+        if contact.get("github"):   url_patch["github_url"]    = contact["github"]
+        if url_patch:
+            await _mongo.users.update_one(
+                {"_id": ObjectId(current_user)},
+                {"$set": url_patch},
+            )
+    except Exception:
+        pass  # non-blocking — profile enrichment failure should not fail extraction
+
+
 async def process_extract_resume(
     request: ExtractResumeRequest,
     current_user: str
 ) -> ExtractResumeResponse:
+    # PDF → text happens before charging: a bad file costs nothing, and the
+    # text fingerprint tells whether this resume was extracted already
+    text, err = await prepare_resume_text_async(request.documentText)
+    if err:
+        raise HTTPException(400, err.get("message", "Could not read the resume"))
+    return await _extract_prepared(current_user, text, document_text=request.documentText)
+
+
+async def process_extract_resume_upload(
+    request: Request,
+    current_user: str
+) -> ExtractResumeResponse:
+    """
+    /extract-resume for a PDF sent as multipart/form-data (field "file"):
+    spooled to a temp file while it arrives, read by the PDF worker pool
+    from disk and stored in GridFS from the same file — never base64.
+    """
+    try:
+        async with spool_pdf_upload(request) as upload:
+            text, err = await prepare_resume_pdf_file_async(upload.path)
+            if err:
+                raise HTTPException(400, err.get("message", "Could not read the resume"))
+            with open(upload.path, "rb") as raw_file:
+                return await _extract_prepared(current_user, text, raw_file=raw_file)
+    except UploadError as e:
+        raise HTTPException(e.status_code, e.message)
+
+
+async def _extract_prepared(
+    current_user: str,
+    text: str,
+    document_text: Optional[str] = None,
+    raw_file: Optional[BinaryIO] = None,
+) -> ExtractResumeResponse:
+    """Charge, extract and save prepared resume text (the upload is document_text or raw_file)."""
     cost = await CreditsService.get_feature_cost("extract_resume")
+    fingerprint = resume_fingerprint(text)
+    stored = await IncomingResumeService.find_by_fingerprint(current_user, fingerprint)
+    if stored:
+        return await _reuse_extraction(current_user, cost, stored)
+
     success, message = await CreditsService.deduct_credits(current_user, amount=cost, feature="extract_resume")
     if not success:
         raise HTTPException(403, message or "Insufficient credits")
 
     try:
-        result = extract_resume_from_text(request.documentText)
+        result = await extract_resume_from_prepared_text_async(text)
         await CreditsService.commit_ai_tokens()
 
         if "error" in result:
             await CreditsService.refund_credits(current_user, cost, "Resume extraction returned error")
             raise ValueError(result.get("message", "AI processing failed"))
 
-        await IncomingResumeService.save_or_update(
-            user_id=current_user,
-            raw_input=request.documentText,
-            extracted_data=result
-        )
-
-        # Auto-save any contact URLs found in the resume to the user profile
-        try:
-            from app.services.mongo import mongo as _mongo
-            from bson import ObjectId
-            contact = result.get("contact", {}) or {}
-            url_patch = {}
-            if contact.get("website"):  url_patch["portfolio_url"] = contact["website"]
-            if contact.get("linkedin"): url_patch["linkedin_url"]  = contact["linkedin"]
-            if contact.get("github"):   url_patch["github_url"]    = contact["github"]
-            if url_patch:
-                await _mongo.users.update_one(
-                    {"_id": ObjectId(current_user)},
-                    {"$set": url_patch},
-                )
-        except Exception:
-            pass  # non-blocking — profile enrichment failure should not fail extraction
+        await _save_extraction(current_user, document_text, result, fingerprint, raw_file)
 
         result["creditsUsed"] = cost
         return ExtractResumeResponse(**result)
@@ -119,7 +197,11 @@ async def process_tailor_resume(
         raise HTTPException(403, message or "Insufficient credits")
 
     try:
-        result = tailor_resume(request.resume, request.jobDescription)
+        if settings.tailor_sections_rest:
+            # Section calls, with unchanged sections reused from tailor_section_cache
+            result = await tailor_resume_sections_async(request.resume, request.jobDescription)
+        else:
+            result = await tailor_resume_async(request.resume, request.jobDescription)
         await CreditsService.commit_ai_tokens()
         if "error" in result:
             await CreditsService.refund_credits(current_user, cost, "Tailor resume: AI error")
@@ -144,7 +226,7 @@ async def process_ats_score(
         raise HTTPException(403, message or "Insufficient credits")
 
     try:
-        result = calculate_ats_score(request.resume, request.jobDescription)
+        result = await calculate_ats_score_async(request.resume, request.jobDescription)
         await CreditsService.commit_ai_tokens()
         if "error" in result:
             await CreditsService.refund_credits(current_user, cost, "ATS score: AI error")
@@ -159,6 +241,19 @@ async def process_ats_score(
         raise HTTPException(500, "ATS calculation failed")
 
 
+async def process_quick_ats_score(
+    request: AtsScoreRequest,
+    current_user: str
+) -> QuickAtsScoreResponse:
+    # Local engine only: free, so the UI can show a score while the Claude
+    # suggestions (process_ats_score) are still generating
+    try:
+        return QuickAtsScoreResponse(**quick_ats_score(request.resume, request.jobDescription))
+    except Exception:
+        logger.exception("Quick ATS score failed")
+        raise HTTPException(500, "ATS calculation failed")
+
+
 async def process_parse_job(
     request: ParseJobRequest,
     current_user: str
@@ -169,7 +264,7 @@ async def process_parse_job(
         raise HTTPException(403, message or "Insufficient credits")
 
     try:
-        result = parse_job_description(request.jobDescription)
+        result = await parse_job_description_async(request.jobDescription)
         await CreditsService.commit_ai_tokens()
         result["creditsUsed"] = cost
         return ParseJobResponse(**result)
@@ -189,7 +284,7 @@ async def process_generate_cover_letter(
         raise HTTPException(403, message or "Insufficient credits")
 
     try:
-        result = generate_cover_letter(request.resume, request.jobDescription)
+        result = await generate_cover_letter_async(request.resume, request.jobDescription)
         await CreditsService.commit_ai_tokens()
         result["creditsUsed"] = cost
         return GenerateCoverLetterResponse(**result)
@@ -209,7 +304,7 @@ async def process_analyze_and_tailor(
         raise HTTPException(403, message or "Insufficient credits")
 
     try:
-        result = analyze_and_tailor(request.pageText, request.resume, request.configuredSections)
+        result = await analyze_and_tailor_async(request.pageText, request.resume, request.configuredSections)
         await CreditsService.commit_ai_tokens()
         if "error" in result:
             await CreditsService.refund_credits(current_user, cost, "Analyze and tailor: AI error")
@@ -234,7 +329,7 @@ async def process_check_completeness(
         raise HTTPException(403, message or "Insufficient credits")
 
     try:
-        result = check_resume_completeness(request.resume)
+        result = await check_resume_completeness_async(request.resume)
         await CreditsService.commit_ai_tokens()
         result["creditsUsed"] = cost
         return CheckCompletenessResponse(**result)
@@ -254,7 +349,7 @@ async def process_generate_skills_roadmap(
         raise HTTPException(403, message or "Insufficient credits")
 
     try:
-        result = generate_skills_roadmap(request.resume, request.jobDescription)
+        result = await generate_skills_roadmap_async(request.resume, request.jobDescription)
         await CreditsService.commit_ai_tokens()
         result["creditsUsed"] = cost
         return SkillsRoadmapResponse(**result)
@@ -264,34 +359,216 @@ async def process_generate_skills_roadmap(
         raise HTTPException(500, "Skills roadmap generation failed")
 
 
+def _keyword_categories(result: Dict) -> List[Dict]:
+    if not isinstance(result, dict) or "categories" not in result:
+        raise ValueError(f"AI returned malformed payload: {result}")
+
+    # Ensure all 5 categories are present (fill missing ones with zero).
+    REQUIRED = ["Skills Relevant", "Experience Relevant", "Projects Relevant", "Others Relevant", "Not Relevant"]
+    existing = {c.get("name"): c for c in result.get("categories", []) if isinstance(c, dict)}
+    normalized = []
+    for name in REQUIRED:
+        c = existing.get(name) or {"name": name, "value": 0, "keywords": []}
+        normalized.append({
+            "name": name,
+            "value": int(c.get("value") or len(c.get("keywords") or [])),
+            "keywords": list(c.get("keywords") or [])[:25],
+        })
+    return normalized
+
+
+async def _feature_cost(feature: str) -> float:
+    # Keyword buckets come from the local engine (no Claude call) with
+    # ats_local_scoring: free then, like /ats-score/quick
+    if feature == "keyword_distribution" and settings.ats_local_scoring:
+        return 0.0
+    return await CreditsService.get_feature_cost(feature)
+
+
 async def process_keyword_distribution(
     request: KeywordDistributionRequest,
     current_user: str
 ) -> KeywordDistributionResponse:
-    cost = await CreditsService.get_feature_cost("keyword_distribution")
-    success, message = await CreditsService.deduct_credits(current_user, amount=cost, feature="keyword_distribution")
-    if not success:
-        raise HTTPException(403, message or "Insufficient credits")
+    cost = await _feature_cost("keyword_distribution")
+    if cost:
+        success, message = await CreditsService.deduct_credits(current_user, amount=cost, feature="keyword_distribution")
+        if not success:
+            raise HTTPException(403, message or "Insufficient credits")
 
     try:
-        result = keyword_distribution(request.resume, request.jobDescription)
+        result = await keyword_distribution_async(request.resume, request.jobDescription)
         await CreditsService.commit_ai_tokens()
-        if not isinstance(result, dict) or "categories" not in result:
-            raise ValueError(f"AI returned malformed payload: {result}")
-
-        # Ensure all 5 categories are present (fill missing ones with zero).
-        REQUIRED = ["Skills Relevant", "Experience Relevant", "Projects Relevant", "Others Relevant", "Not Relevant"]
-        existing = {c.get("name"): c for c in result.get("categories", []) if isinstance(c, dict)}
-        normalized = []
-        for name in REQUIRED:
-            c = existing.get(name) or {"name": name, "value": 0, "keywords": []}
-            normalized.append({
-                "name": name,
-                "value": int(c.get("value") or len(c.get("keywords") or [])),
-                "keywords": list(c.get("keywords") or [])[:25],
-            })
-        return KeywordDistributionResponse(categories=normalized, creditsUsed=cost)
+        return KeywordDistributionResponse(categories=_keyword_categories(result), creditsUsed=cost)
     except Exception:
-        await CreditsService.refund_credits(current_user, cost, "Keyword distribution failed")
+        if cost:
+            await CreditsService.refund_credits(current_user, cost, "Keyword distribution failed")
         logger.exception("Keyword distribution failed")
         raise HTTPException(500, "Keyword distribution failed")
+
+
+# ── Resume intelligence bundle ────────────────────────────
+# analyze / ats / keywords / completeness / roadmap in one request. Every
+# requested section is paid for when the stream starts (one credits_log entry
+# that also carries all the AI tokens); sections that fail — or are never
+# delivered because the client left — are refunded, so the user pays per
+# section delivered.
+_BUNDLE_FEATURES = {
+    "analyze":      "analyze_resume",
+    "ats":          "ats_score",
+    "keywords":     "keyword_distribution",
+    "completeness": "check_completeness",
+    "roadmap":      "skills_roadmap",
+}
+_BUNDLE_MODELS = {
+    "analyze":      AnalyzeResumeResponse,
+    "ats":          AtsScoreResponse,
+    "completeness": CheckCompletenessResponse,
+    "roadmap":      SkillsRoadmapResponse,
+}
+_background_refunds: Set[asyncio.Task] = set()
+
+
+def _refund_in_background(current_user: str, amount: float, reason: str) -> None:
+    # The stream may be closing because its task was cancelled — refund outside it
+    task = asyncio.create_task(CreditsService.refund_credits(current_user, amount, reason))
+    _background_refunds.add(task)
+    task.add_done_callback(_background_refunds.discard)
+
+
+def _bundle_payload(section: str, result: Dict, cost: float) -> Dict:
+    if "error" in result:
+        raise ValueError(result.get("message") or result["error"])
+    if section == "keywords":
+        return KeywordDistributionResponse(categories=_keyword_categories(result), creditsUsed=cost).model_dump()
+    return _BUNDLE_MODELS[section](**{**result, "creditsUsed": cost}).model_dump()
+
+
+async def process_resume_bundle(
+    request: ResumeBundleRequest,
+    current_user: str
+) -> AsyncIterator[Dict]:
+    """
+    Event stream of the bundle (charging happens on first iteration, so a
+    stream that is never consumed costs nothing):
+      {"type": "score", "data"}                        local ATS pre-pass (free), first
+      {"type": "section", "section", "data", "creditsUsed"}
+      {"type": "section_error", "section", "refunded"}
+      {"type": "done", "creditsUsed", "refunded"}
+      {"type": "error", "message", ...}                 insufficient credits / unexpected failure
+    """
+    sections = list(dict.fromkeys(request.sections))
+    costs = {s: await _feature_cost(_BUNDLE_FEATURES[s]) for s in sections}
+    success, message = await CreditsService.deduct_credits(current_user, amount=sum(costs.values()), feature="resume_bundle")
+    if not success:
+        yield {"type": "error", "message": message or "Insufficient credits"}
+        return
+
+    pending = dict(costs)  # charged, not delivered yet
+    charged = refunded = 0.0
+    try:
+        async with aclosing(resume_bundle_async(request.resume, request.jobDescription, sections)) as results:
+            async for section, result in results:
+                if section == "score":
+                    yield {"type": "score", "data": QuickAtsScoreResponse(**result).model_dump()}
+                    continue
+                cost = pending.pop(section)
+                try:
+                    data = _bundle_payload(section, result, cost)
+                except Exception:
+                    logger.exception(f"Resume bundle: {section} failed")
+                    if cost:
+                        await CreditsService.refund_credits(current_user, cost, f"Resume bundle: {section} failed")
+                    refunded += cost
+                    yield {"type": "section_error", "section": section, "refunded": cost}
+                    continue
+                charged += cost
+                yield {"type": "section", "section": section, "data": data, "creditsUsed": cost}
+        await CreditsService.commit_ai_tokens()
+        yield {"type": "done", "creditsUsed": charged, "refunded": refunded}
+    except Exception:
+        logger.exception("Resume bundle failed")
+        yield {"type": "error", "message": "Processing failed", "refunded": refunded + sum(pending.values())}
+    finally:
+        if sum(pending.values()):
+            _refund_in_background(current_user, sum(pending.values()), "Resume bundle: sections not delivered")
+
+
+# ── Background jobs (services/ai_jobs.py) ──────────────────
+# The same work as process_tailor_resume / process_extract_resume /
+# process_analyze_and_tailor, run by a job worker. Credits are deducted at
+# submit; a handler returns the endpoint's response dict, or {"error",
+# "message"} and the job refunds the charge.
+async def _tailor_resume_job(payload: Dict, current_user: str, cost: float, progress) -> Dict:
+    request = TailorResumeRequest(**payload)
+    if settings.tailor_sections_rest:
+        result: Dict = {}
+        done: List[str] = []
+        reused = 0
+        async for event in stream_tailor_resume(request.resume, request.jobDescription):
+            if event["type"] == "section":
+                done.append(event["section"])
+                reused += bool(event.get("reused"))
+                await progress("tailoring", sectionsDone=done, sectionsReused=reused)
+            else:
+                result = event["result"]
+    else:
+        await progress("tailoring")
+        result = await tailor_resume_async(request.resume, request.jobDescription)
+    if "error" in result:
+        return result
+    return TailorResumeResponse(**{**result, "creditsUsed": cost}).model_dump()
+
+
+async def _extract_resume_job(payload: Dict, current_user: str, cost: float, progress) -> Dict:
+    request = ExtractResumeRequest(**payload)
+    await progress("reading")
+    text, err = await prepare_resume_text_async(request.documentText)
+    if err:
+        return {"error": err.get("error", "invalid_input"), "message": err.get("message", "Could not read the resume")}
+    fingerprint = resume_fingerprint(text)
+    stored = await IncomingResumeService.find_by_fingerprint(current_user, fingerprint)
+    if stored:
+        # Reused extraction: the job refunds what exceeds the reuse charge
+        charge = round(cost * settings.resume_reuse_charge_factor, 2)
+        return ExtractResumeResponse(**{**stored, "creditsUsed": charge}).model_dump()
+
+    await progress("extracting")
+    result = await extract_resume_from_prepared_text_async(text)
+    if "error" in result:
+        return result
+    await progress("saving")
+    await _save_extraction(current_user, request.documentText, result, fingerprint)
+    return ExtractResumeResponse(**{**result, "creditsUsed": cost}).model_dump()
+
+
+async def _analyze_and_tailor_job(payload: Dict, current_user: str, cost: float, progress) -> Dict:
+    request = AnalyzeAndTailorRequest(**payload)
+    await progress("analyzing")
+    result = await analyze_and_tailor_async(request.pageText, request.resume, request.configuredSections)
+    if "error" in result:
+        return result
+    return AnalyzeAndTailorResponse(**{**result, "creditsUsed": cost}).model_dump()
+
+
+register_job_handler("tailor_resume", _tailor_resume_job)
+register_job_handler("extract_resume", _extract_resume_job)
+register_job_handler("analyze_and_tailor", _analyze_and_tailor_job)
+
+
+async def process_submit_job(
+    kind: AiJobKind,
+    request: AIRequestBase,
+    current_user: str
+) -> AiJobResponse:
+    cost = await CreditsService.get_feature_cost(kind)
+    success, message = await CreditsService.deduct_credits(current_user, amount=cost, feature=kind)
+    if not success:
+        raise HTTPException(403, message or "Insufficient credits")
+
+    try:
+        job_id = await submit_job(current_user, kind, request.model_dump(), cost, CreditsService.current_log_id())
+    except Exception:
+        await CreditsService.refund_credits(current_user, cost, f"{kind} job could not be queued")
+        logger.exception(f"Submitting {kind} job failed")
+        raise HTTPException(500, "Could not start the job")
+    return AiJobResponse(**await get_job(current_user, job_id))
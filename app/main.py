@@ -104,6 +104,12 @@ async def startup_event():
     from app.services.ai_provider_service import init_active_provider
     await init_active_provider()
 
+    from app.services.pdf_text_service import start_pdf_workers
+    start_pdf_workers()
+
+    from app.services.ai_jobs import start_ai_job_workers
+    start_ai_job_workers()
+
     # Freelancer search index
     await mongo.users.create_index([("available_for_hire", 1), ("freelance_skills", 1)], background=True)
 
@@ -221,6 +227,10 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     _scheduler.shutdown(wait=False)
+    from app.services.pdf_text_service import shutdown_pdf_workers
+    shutdown_pdf_workers()
+    from app.services.ai_jobs import stop_ai_job_workers
+    await stop_ai_job_workers()
     await mongo.close()
 
 
@@ -2,6 +2,7 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from app.config import settings
+from app.services.ai_provider_service import set_ai_user
 
 security = HTTPBearer()  # ← Changed to HTTPBearer
 
@@ -17,6 +18,8 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         uid: str = payload.get("sub")
         if uid is None:
             raise credentials_exception
+        # Attribute this request's Claude calls to the user (fair scheduling)
+        set_ai_user(uid)
         return uid
     except JWTError as e:
         raise credentials_exception
\ No newline at end of file
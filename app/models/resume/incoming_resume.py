@@ -5,7 +5,9 @@ from typing import Dict, Optional
 
 class IncomingResume(BaseModel):
     user_id: str
-    raw_input: str                    # base64 or plain text (for debugging)
+    raw_input_id: Optional[str] = None  # original upload (base64 or plain text) in GridFS resume_files
+    fingerprint: Optional[str] = None   # content hash of the prepared resume text
     extracted_data: Dict              # whatever Claude returns (no fixed schema)
+    context: Optional[Dict] = None    # materialized prompt text / summary / skills (resume_context.py)
     created_at: datetime
     updated_at: datetime
\ No newline at end of file
@@ -4,8 +4,9 @@ Pydantic models for the Claude-powered resume/job endpoints.
 These are SEPARATE from the resume template/schema models.
 """
 
+from functools import lru_cache
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Literal, Any
+from typing import List, Dict, Optional, Literal, Any, Type, Union
 
 
 
@@ -77,7 +78,7 @@ class ExtractResumeResponse(BaseModel):
     publications: List[str] = Field(default_factory=list)
     hobbies: List[str] = Field(default_factory=list)
     customSections: Dict[str, str] = Field(default_factory=dict)
-    creditsUsed: Literal[2] = 2   # ← changed
+    creditsUsed: float = 2        # less (or 0) when a re-upload reuses the stored extraction
 
 
 class SectionScore(BaseModel):
@@ -88,6 +89,14 @@ class SectionScore(BaseModel):
     jdKeywordsTotal: int = Field(default=0, ge=0)
 
 
+class OptimizationNote(BaseModel):
+    """One before/after change shown in the tailoring comparison UI."""
+    section: str
+    note: str
+    before: str = ""
+    after: str = ""
+
+
 class TailorResumeResponse(BaseModel):
     jobTitle: Optional[str] = None
     company: Optional[str] = None
@@ -101,12 +110,13 @@ class TailorResumeResponse(BaseModel):
     publications: List[str] = Field(default_factory=list)
     hobbies: List[str] = Field(default_factory=list)
     customSections: Dict[str, str] = Field(default_factory=dict)
-    optimizationNotes: List[str] = Field(default_factory=list)
+    optimizationNotes: List[Union[OptimizationNote, str]] = Field(default_factory=list)
     keywordsAdded: List[str] = Field(default_factory=list)
     keywordsPresent: List[str] = Field(default_factory=list)
     sectionScores: List[SectionScore] = Field(default_factory=list)
     estimatedATSScore: int = Field(default=0, ge=0, le=100)
     originalAtsScore: int = Field(default=0, ge=0, le=100)
+    sectionsReused: int = Field(default=0, ge=0)   # section-mode tailoring: sections served from the cache
     creditsUsed: Literal[2] = 2
 
 
@@ -228,4 +238,109 @@ class AnalyzeAndTailorResponse(BaseModel):
     improvements: List[str] = Field(default_factory=list)
     jobSummary: str = ""
     customSections: Dict[str, str] = Field(default_factory=dict)
-    creditsUsed: int = 3
\ No newline at end of file
+    creditsUsed: int = 3
+
+
+# ── Section-parallel tailoring (one Claude answer per resume section) ──────
+
+class TailorSummaryPart(BaseModel):
+    summary: str = ""
+    jobTitle: str = ""
+    company: str = ""
+    note: Optional[OptimizationNote] = None
+
+
+class TailorSkillsPart(BaseModel):
+    skills: List[str]
+    note: Optional[OptimizationNote] = None
+
+
+class TailorExperiencePart(BaseModel):
+    description: List[str]
+    note: Optional[OptimizationNote] = None
+
+
+class TailoredProjectText(BaseModel):
+    title: str
+    description: str
+
+
+class TailorProjectsPart(BaseModel):
+    projects: List[TailoredProjectText]
+    note: Optional[OptimizationNote] = None
+
+
+class TailorCustomSectionsPart(BaseModel):
+    customSections: Dict[str, str]
+    note: Optional[OptimizationNote] = None
+
+
+# ── Resume intelligence bundle (one request, sections streamed as SSE) ─────
+
+BundleSection = Literal["analyze", "ats", "keywords", "completeness", "roadmap"]
+
+
+class ResumeBundleRequest(AIRequestBase):
+    resume: str = Field(..., min_length=100, description="Resume text or JSON")
+    jobDescription: str = Field(..., min_length=100, description="Job description text")
+    sections: List[BundleSection] = Field(
+        default_factory=lambda: ["analyze", "ats", "keywords", "completeness", "roadmap"],
+        min_length=1,
+        description="Analyses to run; each is charged at its own feature cost when delivered",
+    )
+
+
+# ── Prose-only answers (the numbers come from services/ats_engine) ──────────
+
+class AnalyzeResumeProse(BaseModel):
+    strengths: List[str]
+    weaknesses: List[str]
+    suggestions: List[str]
+
+
+class AtsImprovementsProse(BaseModel):
+    improvements: List[Dict[str, str]]  # issue, suggestion, impact
+
+
+class QuickAtsScoreResponse(BaseModel):
+    """Local ATS pre-pass — instant, no credits, no Claude call."""
+    atsScore: int = Field(..., ge=0, le=100)
+    matchPercentage: int = Field(..., ge=0, le=100)
+    scoreBreakdown: Dict[Literal["formatting", "keywords", "structure", "relevance"], int]
+    matchedSkills: List[str]
+    missingSkills: List[str]
+    matchedKeywords: List[str]
+    missingKeywords: List[str]
+
+
+# ── Background AI jobs (services/ai_jobs.py) ─────────────────────────────────
+
+AiJobKind = Literal["tailor_resume", "extract_resume", "analyze_and_tailor"]
+
+
+class AiJobResponse(BaseModel):
+    jobId: str
+    kind: AiJobKind
+    status: Literal["queued", "running", "succeeded", "failed"]
+    progress: Dict[str, Any] = Field(default_factory=dict)   # {"stage", ...}
+    result: Optional[Dict[str, Any]] = None   # the synchronous endpoint's response, once succeeded
+    error: Optional[str] = None
+    creditsUsed: float = 0                     # charged at submit; 0 once a failed job is refunded
+    createdAt: Optional[str] = None
+    startedAt: Optional[str] = None
+    finishedAt: Optional[str] = None
+
+
+# ── Structured output ────────────────────────────────────────────────────────
+
+@lru_cache(maxsize=None)
+def output_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    JSON schema Claude must answer with (forced tool use) for a response
+    model. creditsUsed is dropped — the controller fills it in.
+    """
+    schema = model.model_json_schema()
+    schema.get("properties", {}).pop("creditsUsed", None)
+    if "required" in schema:
+        schema["required"] = [k for k in schema["required"] if k != "creditsUsed"]
+    return schema
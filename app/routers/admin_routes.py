@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime, timezone, timedelta
 from bson import ObjectId
 
@@ -16,12 +16,24 @@ from app.config import settings
 from app.services.claude_config_service import (
     get_claude_config,
     save_claude_config,
+    get_feature_routes,
+    save_feature_routes,
+    FEATURE_ROUTE_DEFAULTS,
     AVAILABLE_MODELS as CLAUDE_MODELS,
 )
 from app.services.ai_provider_service import (
     get_active_provider,
     set_active_provider,
+    get_ai_cache_stats,
+    get_admission_stats,
+    get_feature_telemetry,
+    get_structured_output_stats,
+    get_call_trace_stats,
+    get_recent_call_traces,
+    get_key_pool_stats,
+    get_fallback_stats,
 )
+from app.services.prompt_budget import get_prompt_budget_stats
 from app.services.admin_settings_service import get_default_credits, set_default_credits, get_app_config, set_app_config
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -206,13 +218,35 @@ async def delete_coupon(
 
 # ── Resource Utilization ─────────────────────────────────────
 
+class ClaudeApiKey(BaseModel):
+    # Send "key" for a new key, or the "id" from api_key_pool to keep a stored one
+    id: Optional[str] = None
+    key: Optional[str] = None
+    label: Optional[str] = None
+    enabled: bool = True
+
+
 class ClaudeConfigUpdate(BaseModel):
     api_key: Optional[str] = None
+    api_keys: Optional[List[ClaudeApiKey]] = None  # replaces the whole extra-key pool
     model: Optional[str] = None
     temperature: Optional[float] = None
     max_tokens: Optional[int] = None
 
 
+class FeatureRoute(BaseModel):
+    # None = use the call site's default (model falls back to the active config model)
+    model: Optional[str] = None
+    max_tokens: Optional[int] = None
+    # None = keep the current value; [] / 0 clear it
+    fallbacks: Optional[List[str]] = None
+    deadline_seconds: Optional[float] = None
+
+
+class FeatureRoutesUpdate(BaseModel):
+    routes: Dict[str, FeatureRoute]
+
+
 class ActiveProviderUpdate(BaseModel):
     # Kept as a no-op shim for backwards compatibility with older admin frontends.
     # The system is Claude-only; any value other than "claude" is ignored upstream.
@@ -249,7 +283,16 @@ async def get_claude_resource(admin: str = Depends(require_admin)):
         "claude-opus-4-7":            (15.0, 75.0),
         "claude-haiku-4-5-20251001":  (0.80,  4.0),
     }
-    price_in, price_out = CLAUDE_PRICING.get(cfg.get("model", ""), (3.0, 15.0))
+    # Prompt-cache multipliers on the input price (5-minute cache)
+    CACHE_WRITE_MULT, CACHE_READ_MULT = 1.25, 0.10
+
+    def _price(model: str) -> tuple:
+        if model in CLAUDE_PRICING:
+            return CLAUDE_PRICING[model]
+        for family, price in (("opus", (15.0, 75.0)), ("haiku", (0.80, 4.0))):
+            if family in model:
+                return price
+        return (3.0, 15.0)
 
     async def _agg(match_extra: dict) -> dict:
         pipeline = [
@@ -259,6 +302,9 @@ async def get_claude_resource(admin: str = Depends(require_admin)):
                 "count":         {"$sum": 1},
                 "input_tokens":  {"$sum": "$input_tokens"},
                 "output_tokens": {"$sum": "$output_tokens"},
+                "cache_read_tokens":     {"$sum": "$cache_read_tokens"},
+                "cache_creation_tokens": {"$sum": "$cache_creation_tokens"},
+                "cache_hits":    {"$sum": "$ai_cache_hits"},
             }},
         ]
         rows = await mongo.credits_log.aggregate(pipeline).to_list(length=1)
@@ -267,9 +313,31 @@ async def get_claude_resource(admin: str = Depends(require_admin)):
     today_stat = await _agg({"created_at": {"$gte": today_start}})
     month_stat = await _agg({"created_at": {"$gte": month_start}})
 
-    in_m   = (month_stat.get("input_tokens")  or 0) / 1_000_000
-    out_m  = (month_stat.get("output_tokens") or 0) / 1_000_000
-    est_cost = round(in_m * price_in + out_m * price_out, 4)
+    # Each model's tokens at its own rate: routes pin features to different
+    # models and fallbacks serve others. ai_model is the model that answered
+    # (commit_ai_tokens); rows logged before it existed count as the active model.
+    month_by_model = await mongo.credits_log.aggregate([
+        {"$match": {"type": "deduction", "provider": "claude", "created_at": {"$gte": month_start}}},
+        {"$group": {
+            "_id":                   "$ai_model",
+            "input_tokens":          {"$sum": "$input_tokens"},
+            "output_tokens":         {"$sum": "$output_tokens"},
+            "cache_read_tokens":     {"$sum": "$cache_read_tokens"},
+            "cache_creation_tokens": {"$sum": "$cache_creation_tokens"},
+        }},
+    ]).to_list(length=None)
+    cost_by_model: dict = {}
+    for row in month_by_model:
+        model = row["_id"] or cfg.get("model", "")
+        price_in, price_out = _price(model)
+        cost = (
+            (row.get("input_tokens") or 0) * price_in
+            + (row.get("output_tokens") or 0) * price_out
+            + (row.get("cache_creation_tokens") or 0) * price_in * CACHE_WRITE_MULT
+            + (row.get("cache_read_tokens") or 0) * price_in * CACHE_READ_MULT
+        ) / 1_000_000
+        cost_by_model[model] = round(cost_by_model.get(model, 0.0) + cost, 4)
+    est_cost = round(sum(cost_by_model.values()), 4)
 
     # 30-day daily breakdown with token counts
     history_pipeline = [
@@ -301,6 +369,8 @@ async def get_claude_resource(admin: str = Depends(require_admin)):
             "max_tokens":          cfg["max_tokens"],
             "updated_at":          cfg["updated_at"].isoformat() if cfg["updated_at"] else None,
             "updated_by":          cfg["updated_by"],
+            # primary + extra keys: headroom, cooldown and usage per key (this process)
+            "api_key_pool":        get_key_pool_stats(),
             # today
             "today_usage":         today_stat.get("count",         0) or 0,
             "today_input_tokens":  today_stat.get("input_tokens",  0) or 0,
@@ -309,7 +379,21 @@ async def get_claude_resource(admin: str = Depends(require_admin)):
             "month_usage":         month_stat.get("count",         0) or 0,
             "month_input_tokens":  month_stat.get("input_tokens",  0) or 0,
             "month_output_tokens": month_stat.get("output_tokens", 0) or 0,
+            "month_cache_read_tokens":     month_stat.get("cache_read_tokens",     0) or 0,
+            "month_cache_creation_tokens": month_stat.get("cache_creation_tokens", 0) or 0,
+            "month_cache_hits":    month_stat.get("cache_hits",    0) or 0,
             "estimated_cost_month": est_cost,
+            "estimated_cost_month_by_model": cost_by_model,
+            # response cache (this process since startup)
+            "response_cache":      get_ai_cache_stats(),
+            # admission control: slots, queue depth, wait times per model
+            "admission":           get_admission_stats(),
+            # JSON answers: forced-tool / clean / locally repaired / re-requested / failed
+            "structured_output":   get_structured_output_stats(),
+            # model fallbacks per feature ("from→to" counts, this process)
+            "fallbacks":           get_fallback_stats(),
+            # prompt compaction: tokens saved per input kind (this process)
+            "prompt_budget":       get_prompt_budget_stats(),
             # history
             "usage_history":       history,
             "available_models":    CLAUDE_MODELS,
@@ -326,10 +410,69 @@ async def update_claude_config(
     update = body.model_dump(exclude_none=True)
     if not update:
         raise HTTPException(400, "No fields provided to update")
-    await save_claude_config(update, admin_email=admin)
+    try:
+        await save_claude_config(update, admin_email=admin)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     return {"success": True, "message": "Claude config updated and applied immediately."}
 
 
+@router.get("/resources/claude/routes")
+async def get_claude_routes(admin: str = Depends(require_admin)):
+    """Per-feature model routing table + p50/p95 latency and tokens per feature (this process)."""
+    routing = await get_feature_routes()
+    cfg = await get_claude_config()
+    return {
+        "data": {
+            "routes":           routing["routes"],
+            "defaults":         FEATURE_ROUTE_DEFAULTS,
+            "default_model":    cfg["model"],
+            "telemetry":        get_feature_telemetry(),
+            "updated_at":       routing["updated_at"].isoformat() if routing["updated_at"] else None,
+            "updated_by":       routing["updated_by"],
+            "available_models": CLAUDE_MODELS,
+        }
+    }
+
+
+@router.patch("/resources/claude/routes")
+async def update_claude_routes(
+    body: FeatureRoutesUpdate,
+    admin: str = Depends(require_admin),
+):
+    """Pin model / max_tokens (null clears a pin) and the fallback chain / deadline
+    for the given features. Takes effect immediately."""
+    if not body.routes:
+        raise HTTPException(400, "No routes provided to update")
+    try:
+        routing = await save_feature_routes(
+            {feature: route.model_dump() for feature, route in body.routes.items()},
+            admin_email=admin,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {"success": True, "data": {"routes": routing["routes"]}}
+
+
+@router.get("/resources/claude/traces")
+async def get_claude_traces(
+    feature: Optional[str] = Query(None, description="Only traces for this feature"),
+    limit: int = Query(100, ge=1, le=1000),
+    admin: str = Depends(require_admin),
+):
+    """
+    Per-call AI traces (this process): p50/p95/p99 of latency, queue wait,
+    backoff, API time, TTFT and tokens per feature + model, event-loop lag,
+    and the newest individual traces.
+    """
+    return {
+        "data": {
+            **get_call_trace_stats(),
+            "recent": get_recent_call_traces(limit, feature),
+        }
+    }
+
+
 # ── Active AI Provider (Claude-only — kept for back-compat) ──
 
 @router.get("/resources/active-provider")
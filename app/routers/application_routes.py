@@ -180,14 +180,14 @@ Write 3–5 bullet points like:
 Be specific and data-driven. Use the actual numbers. Return ONLY a JSON array:
 ["observation 1", "observation 2", "observation 3"]"""
 
-    from app.services.ai_provider_service import call_ai
-    result = call_ai(prompt, temperature=0.4, max_tokens=600)
+    from app.services.ai_provider_service import call_ai_async
+    result = await call_ai_async(prompt, temperature=0.4, max_tokens=600, feature="application_insights")
 
     if "error" in result:
         await CreditsService.refund_credits(current_user, cost, "Insights AI call failed")
         raise HTTPException(status_code=500, detail=result["error"])
 
-    # call_ai returns a dict; the prompt asks for a JSON array which will be
+    # call_ai_async returns a dict; the prompt asks for a JSON array which will be
     # parsed as a list at the top level.  Handle both cases.
     observations: list = []
     if isinstance(result, list):
@@ -303,8 +303,8 @@ Return ONLY valid JSON:
   "linkedinDraft": "A LinkedIn message. MAX 300 characters absolute limit. Warm, professional, specific to company/role. No hashtags."
 }}"""
 
-    from app.services.ai_provider_service import call_ai
-    result = call_ai(prompt, temperature=0.4, max_tokens=600)
+    from app.services.ai_provider_service import call_ai_async
+    result = await call_ai_async(prompt, temperature=0.4, max_tokens=600, feature="followup_generate")
 
     if "error" in result:
         await CreditsService.refund_credits(current_user, cost, "Follow-up generation AI call failed")
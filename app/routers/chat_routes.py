@@ -2,7 +2,6 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from typing import Dict
 import json
-import asyncio
 from datetime import datetime
 from pydantic import BaseModel
 from app.controllers.chat.chat_controller import chat_controller
@@ -10,7 +9,7 @@ from app.models.chat.schemas import SendMessageRequest
 from app.middleware.auth import get_current_user
 from app.services.credits_service import CreditsService
 from app.services.chat.ai_chat_service import (
-    ai_chat_service, _get_user_resume_text,
+    ai_chat_service, _get_user_resume_text, _tailor_events,
     _build_tailored_text, _merge_tailored_resume,
 )
 from app.services.chat.session_service import session_service
@@ -79,7 +78,10 @@ async def send_message_stream(
     request: SendMessageRequest,
     current_user: str = Depends(get_current_user)
 ):
-    """SSE endpoint — streams each lead/job/freelancer card as it is found."""
+    """SSE endpoint — streams reply text as `delta` events and each
+    lead/job/freelancer card as it is found. A `reset` event means the text
+    streamed so far is not the reply and should be cleared. The `done` event
+    carries the full reply, which is what gets persisted."""
     cost = await CreditsService.get_feature_cost("ai_chat")
     if cost > 0:
         success, msg = await CreditsService.deduct_credits(current_user, amount=cost, feature="ai_chat")
@@ -103,6 +105,7 @@ async def send_message_stream(
         final_action_type = None
         final_action_data: dict = {}
         accumulated_items: list = []
+        streamed_text: list = []
 
         try:
             yield f"data: {json.dumps({'type': 'session', 'session_id': session_id})}\n\n"
@@ -111,7 +114,11 @@ async def send_message_stream(
                 current_user, request.message, session_history
             ):
                 yield f"data: {json.dumps(event)}\n\n"
-                if event["type"] == "item":
+                if event["type"] == "delta":
+                    streamed_text.append(event["text"])
+                elif event["type"] == "reset":
+                    streamed_text.clear()
+                elif event["type"] == "item":
                     accumulated_items.append(event["item"])
                 elif event["type"] == "done":
                     final_response    = event.get("response", "")
@@ -121,7 +128,8 @@ async def send_message_stream(
 
         except Exception as e:
             yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
-            final_response = "something went wrong. please try again."
+            # Keep whatever the user already saw if the stream broke mid-reply
+            final_response = "".join(streamed_text) or "something went wrong. please try again."
 
         # Merge streamed items back into action_data for history persistence
         if accumulated_items and not final_action_type:
@@ -219,14 +227,18 @@ async def tailor_for_job_stream(
                 yield f"data: {json.dumps({'type': 'error', 'message': 'No resume found. Upload at /upload first.'})}\n\n"
                 return
 
-            from app.services.resume_processor import tailor_resume as do_tailor_resume
-            loop   = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, lambda: do_tailor_resume(resume_text, job_description))
+            # Sections stream in as they finish (settings.tailor_mode)
+            orig_struct = await ai_chat_service._get_user_resume_structured(current_user)
+            result: Dict = {}
+            async for event in _tailor_events(resume_text, orig_struct, job_description):
+                if event["type"] == "section":
+                    yield f"data: {json.dumps(event)}\n\n"
+                else:
+                    result = event["result"]
 
             # ── Step 3: Build output ─────────────────────────────────────────
             yield f"data: {json.dumps({'type': 'progress', 'step': 3, 'total_steps': 3, 'step_label': 'Computing ATS score and generating insights…'})}\n\n"
 
-            orig_struct  = await ai_chat_service._get_user_resume_structured(current_user)
             tailored     = _build_tailored_text(result)
             resume_data  = _merge_tailored_resume(result, orig_struct)
             ats_score    = result.get("estimatedATSScore", 0)
@@ -365,7 +377,7 @@ async def get_context_status(
     if not user:
         raise HTTPException(404, "User not found")
 
-    has_resume = await mongo.incoming_resumes.find_one({"user_id": current_user}) is not None
+    has_resume = await mongo.incoming_resumes.find_one({"user_id": current_user}, {"_id": 1}) is not None
     job_prefs = user.get("jobPreferences") or user.get("job_preferences") or {}
     job_prefs_set = bool(job_prefs.get("desired_role") or job_prefs.get("desiredRole"))
 
@@ -201,7 +201,7 @@ async def analyze_lead(
         "What service would most benefit them? Be specific and concise (3-4 sentences)."
     )
 
-    insight = await call_ai_text_async(prompt)
+    insight = await call_ai_text_async(prompt, feature="analyze_lead")
 
     await mongo.clients.update_one(
         {"_id": ObjectId(client_id)},
@@ -11,15 +11,14 @@ from our own async task instead of a SimhaCLI subprocess.
 
 import asyncio
 from datetime import datetime
-from bson import ObjectId
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 
 from app.middleware.auth import get_current_user
-from app.services.mongo import mongo
 from app.services.credits_service import CreditsService
+from app.services.incoming_resume_service import IncomingResumeService
 from app.services import simhacli_service
 
 router = APIRouter(tags=["Company Research"])
@@ -32,26 +31,11 @@ class CompanyResearchRequest(BaseModel):
     role: str
 
 
-# ── Resume helper (mirrors job_evaluation_routes._get_resume_text) ──
+# ── Resume helper (compact summary from the materialized context) ──
 
 async def _get_resume_summary(user_id: str) -> str:
-    doc = await mongo.incoming_resumes.find_one(
-        {"user_id": user_id}, sort=[("created_at", -1)]
-    )
-    if not doc:
-        return ""
-    extracted = doc.get("extracted_data")
-    if extracted and isinstance(extracted, dict):
-        parts = []
-        for key, val in extracted.items():
-            if val:
-                parts.append(
-                    f"{key}: {', '.join(str(v) for v in val)}"
-                    if isinstance(val, list)
-                    else f"{key}: {val}"
-                )
-        return "\n".join(parts)[:1500]
-    return (doc.get("raw_text") or "")[:1500]
+    context = await IncomingResumeService.get_context(user_id)
+    return context["summary"] if context else ""
 
 
 # ── Markdown formatter ─────────────────────────────────────
@@ -140,13 +124,9 @@ Return ONLY valid JSON:
   ]
 }}"""
 
-    # Run the synchronous AI call in a thread so we don't block the event loop
-    from app.services.ai_provider_service import call_ai
+    from app.services.ai_provider_service import call_ai_async
     try:
-        result = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: call_ai(prompt, temperature=0.3, max_tokens=2000),
-        )
+        result = await call_ai_async(prompt, temperature=0.3, max_tokens=2000, feature="company_research")
     except Exception as exc:
         await _finish(f"AI call failed: {exc}")
         return
@@ -80,8 +80,8 @@ If the stated salary is empty or cannot be assessed, set verdict to "unknown" an
 Use the currency most common for this location (e.g. USD for USA, GBP for UK, INR for India).
 Salary values should be annual total compensation in integers."""
 
-    from app.services.ai_provider_service import call_ai
-    result = call_ai(prompt, temperature=0.2, max_tokens=600)
+    from app.services.ai_provider_service import call_ai_async
+    result = await call_ai_async(prompt, temperature=0.2, max_tokens=600, feature="compensation")
 
     if "error" in result:
         await CreditsService.refund_credits(user_id, cost, "Compensation research AI call failed")
@@ -7,6 +7,7 @@ from bson import ObjectId
 from app.middleware.auth import get_current_user
 from app.services.mongo import mongo
 from app.services.credits_service import CreditsService
+from app.services.incoming_resume_service import IncomingResumeService
 
 router = APIRouter(tags=["Job Evaluation"])
 
@@ -42,30 +43,15 @@ class EvaluateJobRequest(BaseModel):
 # ── Resume text helper ─────────────────────────────────────
 
 async def _get_resume_text(user_id: str, resume_id: Optional[str] = None) -> str:
-    query: dict = {"user_id": user_id}
+    oid = None
     if resume_id:
         try:
-            query["_id"] = ObjectId(resume_id)
+            oid = ObjectId(resume_id)
         except Exception:
             pass
 
-    doc = await mongo.incoming_resumes.find_one(query, sort=[("created_at", -1)])
-    if not doc:
-        return ""
-
-    extracted = doc.get("extracted_data")
-    if extracted and isinstance(extracted, dict):
-        parts = []
-        for key, val in extracted.items():
-            if val:
-                parts.append(
-                    f"{key}: {', '.join(str(v) for v in val)}"
-                    if isinstance(val, list)
-                    else f"{key}: {val}"
-                )
-        return "\n".join(parts)
-
-    return doc.get("raw_text", "") or ""
+    context = await IncomingResumeService.get_context(user_id, oid)
+    return context["prompt_text"] if context else ""
 
 
 # ── Ghost-job signal computation ───────────────────────────
@@ -236,8 +222,8 @@ Grades: A+, A, A-, B+, B, B-, C+, C, C-, D, F
 Score: 1.0–5.0 (one decimal place)"""
 
     # ── 6. AI call ─────────────────────────────────────────
-    from app.services.ai_provider_service import call_ai
-    ai_result = call_ai(prompt, temperature=0.2, max_tokens=1200)
+    from app.services.ai_provider_service import call_ai_async
+    ai_result = await call_ai_async(prompt, temperature=0.2, max_tokens=1200, feature="job_evaluate")
 
     if "error" in ai_result:
         await CreditsService.refund_credits(user_id, cost, "Job evaluation AI call failed")
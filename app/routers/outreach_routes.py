@@ -49,8 +49,8 @@ CRITICAL: The message MUST be under 300 characters including spaces. No hashtags
 Return ONLY valid JSON:
 {{ "message": "your message here", "characterCount": 245 }}"""
 
-    from app.services.ai_provider_service import call_ai
-    result = call_ai(prompt, temperature=0.5, max_tokens=200)
+    from app.services.ai_provider_service import call_ai_async
+    result = await call_ai_async(prompt, temperature=0.5, max_tokens=200, feature="outreach_generate")
 
     if "error" in result:
         await CreditsService.refund_credits(current_user, cost, "Outreach generation AI call failed")
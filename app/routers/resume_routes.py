@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from app.middleware.auth import get_current_user
 from typing import Dict, List, Optional
 from app.services.credits_service import CreditsService
@@ -11,27 +13,34 @@ from app.services.incoming_resume_service import IncomingResumeService
 from app.controllers.resume_ai_controller import (
     process_analyze_resume,
     process_extract_resume,
+    process_extract_resume_upload,
     process_tailor_resume,
     process_ats_score,
+    process_quick_ats_score,
     process_parse_job,
     process_generate_cover_letter,
     process_generate_skills_roadmap,
     process_check_completeness,
     process_analyze_and_tailor,
     process_keyword_distribution,
+    process_resume_bundle,
+    process_submit_job,
 )
+from app.services.ai_jobs import get_job, job_events, list_jobs
 
 from app.models.resume_ai.schemas import (
     AnalyzeResumeRequest, AnalyzeResumeResponse,
     ExtractResumeRequest, ExtractResumeResponse,
     TailorResumeRequest, TailorResumeResponse,
-    AtsScoreRequest, AtsScoreResponse,
+    AtsScoreRequest, AtsScoreResponse, QuickAtsScoreResponse,
     ParseJobRequest, ParseJobResponse,
     GenerateCoverLetterRequest, GenerateCoverLetterResponse,
     SkillsRoadmapRequest, SkillsRoadmapResponse,
     CheckCompletenessRequest, CheckCompletenessResponse,
     AnalyzeAndTailorRequest, AnalyzeAndTailorResponse,
     KeywordDistributionRequest, KeywordDistributionResponse,
+    ResumeBundleRequest,
+    AiJobResponse,
 )
 
 router = APIRouter(tags=["resume"])
@@ -260,6 +269,38 @@ async def ai_extract_resume(
     return await process_extract_resume(request, current_user)
 
 
+# The body is parsed by the controller as it streams in (not by FastAPI), so
+# the multipart schema is declared here for the docs
+_PDF_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+@router.post("/extract-resume/upload", response_model=ExtractResumeResponse, openapi_extra=_PDF_UPLOAD_OPENAPI)
+async def ai_extract_resume_upload(
+    request: Request,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Extract structured resume data from a PDF sent as multipart/form-data
+    (field "file"). /extract-resume keeps accepting base64 PDFs in
+    documentText for older extension clients.
+    Credits used: 2
+    """
+    return await process_extract_resume_upload(request, current_user)
+
+
 @router.post("/tailor-resume", response_model=TailorResumeResponse)
 async def ai_tailor_resume(
     request: TailorResumeRequest,
@@ -284,6 +325,19 @@ async def ai_ats_score(
     return await process_ats_score(request, current_user)
 
 
+@router.post("/ats-score/quick", response_model=QuickAtsScoreResponse)
+async def ai_quick_ats_score(
+    request: AtsScoreRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Instant local ATS score (keyword coverage, relevance, structure, formatting)
+    + matched/missing skills — no AI call
+    Credits used: 0
+    """
+    return await process_quick_ats_score(request, current_user)
+
+
 @router.post("/parse-job", response_model=ParseJobResponse)
 async def ai_parse_job(
     request: ParseJobRequest,
@@ -328,11 +382,33 @@ async def ai_keyword_distribution(
     """
     Categorize JD keywords across 5 buckets (Skills / Experience / Projects / Others / Not Relevant).
     Powers the keyword-distribution pie chart on the Resume Optimizer.
-    Credits used: 1
+    Credits used: 0 with local ATS scoring (ats_local_scoring), else 1
     """
     return await process_keyword_distribution(request, current_user)
 
 
+@router.post("/resume-bundle/stream")
+async def ai_resume_bundle(
+    request: ResumeBundleRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    analyze-resume + ats-score + keyword-distribution + check-completeness +
+    skills-roadmap for one resume/JD in a single request (SSE). A free local
+    ATS score arrives first, then each section as soon as it is ready.
+    Credits used: the sum of the requested sections; failed ones are refunded
+    """
+    async def event_generator():
+        async for event in process_resume_bundle(request, current_user):
+            yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/check-completeness", response_model=CheckCompletenessResponse)
 async def ai_check_completeness(
     request: CheckCompletenessRequest,
@@ -358,16 +434,104 @@ async def ai_analyze_and_tailor(
     return await process_analyze_and_tailor(request, current_user)
 
 
+# ── Background AI jobs ──
+# The long Opus calls without holding the request open: submit returns a job
+# at once (credits deducted now, refunded if the job fails), then poll
+# GET /ai-jobs/{id} or follow /ai-jobs/{id}/stream. Results stay readable
+# after a reconnect.
+
+@router.post("/ai-jobs/tailor-resume", response_model=AiJobResponse, status_code=202)
+async def ai_job_tailor_resume(
+    request: TailorResumeRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    /tailor-resume as a background job; result is a TailorResumeResponse
+    Credits used: 2
+    """
+    return await process_submit_job("tailor_resume", request, current_user)
+
+
+@router.post("/ai-jobs/extract-resume", response_model=AiJobResponse, status_code=202)
+async def ai_job_extract_resume(
+    request: ExtractResumeRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    /extract-resume as a background job; result is an ExtractResumeResponse
+    Credits used: 2 (the unused part is refunded when the stored extraction is reused)
+    """
+    return await process_submit_job("extract_resume", request, current_user)
+
+
+@router.post("/ai-jobs/analyze-and-tailor", response_model=AiJobResponse, status_code=202)
+async def ai_job_analyze_and_tailor(
+    request: AnalyzeAndTailorRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    /analyze-and-tailor as a background job; result is an AnalyzeAndTailorResponse
+    Credits used: 3
+    """
+    return await process_submit_job("analyze_and_tailor", request, current_user)
+
+
+@router.get("/ai-jobs", response_model=List[AiJobResponse])
+async def ai_jobs_list(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: str = Depends(get_current_user)
+):
+    """The user's recent jobs, newest first (without results)."""
+    return await list_jobs(current_user, limit)
+
+
+@router.get("/ai-jobs/{job_id}", response_model=AiJobResponse)
+async def ai_job_status(
+    job_id: str,
+    current_user: str = Depends(get_current_user)
+):
+    """Status, progress and — once succeeded — the result of a job."""
+    job = await get_job(current_user, job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return job
+
+
+@router.get("/ai-jobs/{job_id}/stream")
+async def ai_job_stream(
+    job_id: str,
+    current_user: str = Depends(get_current_user)
+):
+    """
+    SSE: {"type": "progress", "job"} on every change, {"type": "ping"} while
+    idle, then {"type": "done", "job"} with the result or error. Reconnecting
+    resumes from the job's current state.
+    """
+    async def event_generator():
+        async for event in job_events(current_user, job_id):
+            yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ── Incoming Resume (Save + Read) ─────────────────────────────────────
 @router.get("/incoming-resume", response_model=dict)
 async def get_incoming_resume(
+    include_raw: bool = Query(False, description="Also return the original upload as raw_input"),
     current_user: str = Depends(get_current_user)
 ):
     """
     Get the latest incoming resume extraction for the current user.
-    Returns the saved extracted_data (flexible JSON from Claude).
+    Returns user_id, extracted_data (flexible JSON from Claude), raw_input_size,
+    created_at and updated_at. The original upload (raw_input, often megabytes
+    of base64 PDF) now lives in GridFS and is only returned with
+    ?include_raw=true; PDFs uploaded as files come back as a base64 data URI.
     """
-    data = await IncomingResumeService.get_latest(current_user)
+    data = await IncomingResumeService.get_latest(current_user, include_raw=include_raw)
     if not data:
         raise HTTPException(status_code=404, detail="No incoming resume found for this user")
 
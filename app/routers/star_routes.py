@@ -208,8 +208,8 @@ Return ONLY valid JSON:
 }}
 Return the top 3 most relevant stories only."""
 
-    from app.services.ai_provider_service import call_ai
-    ai_result = call_ai(prompt, temperature=0.3, max_tokens=600)
+    from app.services.ai_provider_service import call_ai_async
+    ai_result = await call_ai_async(prompt, temperature=0.3, max_tokens=600, feature="star_stories")
 
     if "error" in ai_result:
         await CreditsService.refund_credits(current_user, cost, "STAR suggest AI call failed")
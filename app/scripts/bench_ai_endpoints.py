@@ -0,0 +1,129 @@
+"""
+Load-test the AI-heavy endpoints against a running API.
+
+Usage:
+    # 1. stub Claude (synthetic latency, or STUB_MODE=replay with recorded fixtures)
+    uvicorn app.scripts.claude_stub_server:app --port 8787
+    # 2. the API, pointed at the stub
+    CLAUDE_BASE_URL=http://127.0.0.1:8787 uvicorn app.main:app --port 8000
+    # 3. the load
+    python -m app.scripts.bench_ai_endpoints --token <JWT> --target tailor --requests 200 --concurrency 20
+
+Targets:
+    tailor     POST /api/tailor-resume          (latency per request)
+    chat       POST /api/chat/message/stream    (time to first `delta` + total)
+    recommend  POST /api/jobs/recommend         (ranking; job scraping still hits
+                                                 the job boards — use --payload)
+
+--payload <file.json> replaces the default request body of the target.
+Each request costs the test user credits: seed a user with enough of them.
+"""
+
+import json
+import time
+import asyncio
+import argparse
+from typing import Dict, List, Optional
+
+import httpx
+
+
+SAMPLE_RESUME = (
+    "Jane Doe — jane@example.com\n\nSUMMARY\nBackend engineer with 6 years of Python, "
+    "FastAPI and MongoDB experience building high-traffic APIs.\n\nEXPERIENCE\n"
+    "Senior Engineer, Acme (2021–present): led the move to async services, cut p95 latency 40%.\n"
+    "Engineer, Globex (2018–2021): built billing and notification pipelines.\n\n"
+    "SKILLS\nPython, FastAPI, MongoDB, Redis, AWS, Docker, Kubernetes"
+)
+SAMPLE_JD = (
+    "We are hiring a Senior Backend Engineer to design and scale Python services. "
+    "You will own FastAPI microservices, MongoDB data models and AWS infrastructure, "
+    "mentor engineers and improve reliability. 5+ years of backend experience required."
+)
+
+TARGETS = {
+    "tailor": ("/api/tailor-resume", {"userCredits": 0, "resume": SAMPLE_RESUME, "jobDescription": SAMPLE_JD}),
+    "chat": ("/api/chat/message/stream", {"message": "find me backend python jobs in Bangalore"}),
+    "recommend": ("/api/jobs/recommend", {
+        "search_term": "Backend Engineer", "location": "Bangalore, India",
+        "sites": ["indeed"], "results_per_site": 5, "include_naukri": False, "top_n": 5,
+    }),
+}
+
+
+async def _plain(client: httpx.AsyncClient, path: str, body: Dict) -> Dict:
+    started = time.perf_counter()
+    response = await client.post(path, json=body)
+    return {"status": response.status_code, "total": time.perf_counter() - started, "ttft": None}
+
+
+async def _sse(client: httpx.AsyncClient, path: str, body: Dict) -> Dict:
+    started = time.perf_counter()
+    ttft: Optional[float] = None
+    async with client.stream("POST", path, json=body) as response:
+        async for line in response.aiter_lines():
+            if ttft is None and line.startswith("data:") and '"type": "delta"' in line:
+                ttft = time.perf_counter() - started
+        status = response.status_code
+    return {"status": status, "total": time.perf_counter() - started, "ttft": ttft}
+
+
+def _percentiles(values: List[float]) -> str:
+    if not values:
+        return "n/a"
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return f"p50={pick(0.50):.0f}ms  p95={pick(0.95):.0f}ms  p99={pick(0.99):.0f}ms  max={ordered[-1] * 1000:.0f}ms"
+
+
+async def run(args) -> None:
+    path, body = TARGETS[args.target]
+    if args.payload:
+        with open(args.payload, encoding="utf-8") as f:
+            body = json.load(f)
+    call = _sse if args.target == "chat" else _plain
+
+    results: List[Dict] = []
+    gate = asyncio.Semaphore(args.concurrency)
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+
+    async with httpx.AsyncClient(base_url=args.base, headers=headers, timeout=args.timeout) as client:
+        async def one() -> None:
+            async with gate:
+                try:
+                    results.append(await call(client, path, body))
+                except httpx.HTTPError as e:
+                    results.append({"status": type(e).__name__, "total": None, "ttft": None})
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+        wall = time.perf_counter() - started
+
+    ok = [r for r in results if r["status"] == 200]
+    errors: Dict[str, int] = {}
+    for r in results:
+        if r["status"] != 200:
+            errors[str(r["status"])] = errors.get(str(r["status"]), 0) + 1
+
+    print(f"{args.target}: {len(results)} requests, concurrency {args.concurrency}, "
+          f"{wall:.1f}s wall, {len(results) / wall:.1f} req/s")
+    print(f"  ok:      {len(ok)}   errors: {errors or 'none'}")
+    print(f"  latency: {_percentiles([r['total'] for r in ok])}")
+    if args.target == "chat":
+        print(f"  ttft:    {_percentiles([r['ttft'] for r in ok if r['ttft'] is not None])}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark AI-heavy API endpoints")
+    parser.add_argument("--base", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", default="", help="JWT of the benchmark user")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="tailor")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--payload", help="JSON file with the request body")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""
+Local stand-in for the Anthropic Messages API (+ Message Batches).
+
+Point the app at it and every AI endpoint runs offline and deterministically —
+for development, CI and load tests (see bench_ai_endpoints.py):
+
+    uvicorn app.scripts.claude_stub_server:app --port 8787
+    CLAUDE_BASE_URL=http://127.0.0.1:8787  (any non-empty CLAUDE_API_KEY)
+
+Modes (STUB_MODE):
+  synthetic (default)  answers are generated locally: schema-shaped tool input for
+                       forced tool use (structured output), a deterministic ranking
+                       for job-ranking prompts, STUB_RESPONSE_TEXT otherwise
+  record               forwards POST /v1/messages to STUB_UPSTREAM (the real API,
+                       with the caller's x-api-key) and saves every answer under
+                       STUB_FIXTURES_DIR
+  replay               answers from STUB_FIXTURES_DIR; a miss falls back to
+                       synthetic, or 404s when STUB_REPLAY_STRICT=1
+
+Fixtures are keyed by a hash of what shapes the answer (model, system, messages,
+tools, tool_choice, max_tokens, temperature). `stream` is not part of the key, so
+one recording serves streaming and non-streaming callers alike; streams are
+re-synthesised from the recorded message.
+
+Synthetic latency (synthetic + replay):
+  STUB_TTFT_MS         delay before the first token (default 300)
+  STUB_TOKENS_PER_SEC  output pacing, 0 = instant (default 80)
+  STUB_JITTER          ± fraction applied to both, seeded per request (default 0.2)
+
+Nova chat: with STUB_CHAT_TOOL=<tool name>, a tool-enabled turn calls that tool
+(with schema-shaped arguments) instead of replying with STUB_CHAT_TEXT.
+
+Batches report "in_progress" for STUB_BATCH_DELAY seconds (default 2), then
+"ended"; their results are replayed / synthesised like single messages.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+app = FastAPI(title="Claude API stub")
+
+MODE           = os.getenv("STUB_MODE", "synthetic")
+UPSTREAM       = os.getenv("STUB_UPSTREAM", "https://api.anthropic.com").rstrip("/")
+FIXTURES_DIR   = Path(os.getenv("STUB_FIXTURES_DIR", "fixtures/claude"))
+REPLAY_STRICT  = os.getenv("STUB_REPLAY_STRICT", "0") == "1"
+TTFT_MS        = float(os.getenv("STUB_TTFT_MS", "300"))
+TOKENS_PER_SEC = float(os.getenv("STUB_TOKENS_PER_SEC", "80"))
+JITTER         = float(os.getenv("STUB_JITTER", "0.2"))
+CHAT_TOOL      = os.getenv("STUB_CHAT_TOOL", "")
+CHAT_TEXT      = os.getenv("STUB_CHAT_TEXT", "This is a stub reply.")
+BATCH_DELAY    = float(os.getenv("STUB_BATCH_DELAY", "2"))
+RESPONSE_TEXT  = os.getenv("STUB_RESPONSE_TEXT", "{}")
+
+_batches: dict = {}
+
+# Request fields that shape the answer — the fixture key.
+_KEY_FIELDS = ("model", "system", "messages", "tools", "tool_choice", "max_tokens", "temperature")
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+def _error(status: int, kind: str, message: str) -> JSONResponse:
+    return JSONResponse({"type": "error", "error": {"type": kind, "message": message}}, status_code=status)
+
+
+# ── Fixtures ─────────────────────────────────────────────────
+
+def _fixture_key(params: dict) -> str:
+    canonical = json.dumps({k: params.get(k) for k in _KEY_FIELDS}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def _load_fixture(key: str):
+    path = FIXTURES_DIR / f"{key}.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))["response"]
+
+
+def _save_fixture(key: str, params: dict, message: dict) -> None:
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    body = {"key": key, "recorded_at": _iso(time.time()), "request": params, "response": message}
+    (FIXTURES_DIR / f"{key}.json").write_text(json.dumps(body, ensure_ascii=False, indent=1), encoding="utf-8")
+
+
+# ── Synthetic answers ────────────────────────────────────────
+
+def _text_of(content) -> str:
+    if isinstance(content, list):
+        return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+    return content or ""
+
+
+def _prompt_text(params: dict) -> str:
+    return _text_of((params.get("messages") or [{}])[-1].get("content", ""))
+
+
+def _answer(prompt: str) -> str:
+    """Ranking prompts (see job_recommendation_service._ranking_prompt) get a
+    plausible ranking so the cron can fan results into daily_job_feed."""
+    match = re.search(r"JOBS LIST:\s*(\[.*\])\s*$", prompt, re.S)
+    if not match:
+        return RESPONSE_TEXT
+    try:
+        jobs = json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return RESPONSE_TEXT
+    ranked = [
+        {
+            "id": job["id"],
+            "fit_score": max(0, 90 - 3 * n),
+            "best_role_label": job.get("title", ""),
+            "archetype": "General",
+            "description_summary": f"{job.get('title', 'Role')} at {job.get('company', 'a company')}.",
+            "matched_keywords": [],
+            "missing_keywords": [],
+            "reasoning": "stub ranking",
+            "risk_flags": [],
+        }
+        for n, job in enumerate(jobs)
+    ]
+    return json.dumps({"ranked": ranked})
+
+
+def _sample(schema: dict, defs: dict):
+    """Smallest plausible instance of a JSON schema (all properties filled)."""
+    if "$ref" in schema:
+        return _sample(defs.get(schema["$ref"].rsplit("/", 1)[-1], {}), defs)
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return _sample(options[0], defs)
+    if "default" in schema:
+        return schema["default"]
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type", "object")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        return {name: _sample(sub, defs) for name, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [_sample(schema["items"], defs)] if schema.get("items") else []
+    if kind in ("integer", "number"):
+        lo = schema.get("minimum", 0)
+        hi = schema.get("maximum", lo + 100)
+        return (lo + hi) // 2 if kind == "integer" else (lo + hi) / 2
+    if kind == "boolean":
+        return False
+    if kind == "string":
+        return "stub"
+    return None
+
+
+def _tool_block(tool: dict) -> dict:
+    schema = tool.get("input_schema") or {}
+    return {
+        "type": "tool_use",
+        "id": f"toolu_stub_{uuid.uuid4().hex[:12]}",
+        "name": tool["name"],
+        "input": _sample(schema, schema.get("$defs", {})),
+    }
+
+
+def _synthetic_content(params: dict) -> list:
+    tools = params.get("tools") or []
+    choice = params.get("tool_choice") or {"type": "auto"}
+    last = (params.get("messages") or [{}])[-1].get("content", "")
+
+    if tools and choice.get("type") in ("tool", "any"):
+        tool = next((t for t in tools if t["name"] == choice.get("name")), tools[0])
+        return [_tool_block(tool)]
+    if tools:
+        # Second round trip of a tool call: acknowledge the tool result
+        if isinstance(last, list) and any(b.get("type") == "tool_result" for b in last if isinstance(b, dict)):
+            result = next(b for b in last if isinstance(b, dict) and b.get("type") == "tool_result")
+            return [{"type": "text", "text": f"Done. {_text_of(result.get('content', ''))[:200]}".strip()}]
+        tool = next((t for t in tools if t["name"] == CHAT_TOOL), None)
+        if tool:
+            return [_tool_block(tool)]
+        return [{"type": "text", "text": CHAT_TEXT}]
+    return [{"type": "text", "text": _answer(_prompt_text(params))}]
+
+
+def _message(params: dict) -> dict:
+    content = _synthetic_content(params)
+    output = json.dumps(content)
+    return {
+        "id": f"msg_stub_{uuid.uuid4().hex[:12]}",
+        "type": "message",
+        "role": "assistant",
+        "model": params.get("model", "claude-stub"),
+        "content": content,
+        "stop_reason": "tool_use" if content[0]["type"] == "tool_use" else "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": len(json.dumps(params.get("messages", []))) // 4,
+                  "output_tokens": max(1, len(output) // 4)},
+    }
+
+
+def _offline_message(params: dict):
+    """Replay the fixture for these params if there is one, else synthesise
+    (None when replay is strict and the fixture is missing)."""
+    if MODE == "replay":
+        recorded = _load_fixture(_fixture_key(params))
+        if recorded is not None:
+            return recorded
+        if REPLAY_STRICT:
+            return None
+    return _message(params)
+
+
+# ── Latency + streaming ──────────────────────────────────────
+
+def _pacing(params: dict) -> tuple:
+    """(seconds to first token, seconds per output token), jittered per request."""
+    rng = random.Random(_fixture_key(params))
+    jitter = lambda: 1 + rng.uniform(-JITTER, JITTER)
+    per_token = (1 / TOKENS_PER_SEC) * jitter() if TOKENS_PER_SEC > 0 else 0.0
+    return TTFT_MS / 1000 * jitter(), per_token
+
+
+def _chunks(text: str, size: int = 16):
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _stream(message: dict, ttft: float, per_token: float):
+    """Messages-API event stream re-synthesised from a complete message."""
+    head = {**message, "content": [], "stop_reason": None,
+            "usage": {**message["usage"], "output_tokens": 1}}
+    await asyncio.sleep(ttft)
+    yield _sse("message_start", {"type": "message_start", "message": head})
+    for index, block in enumerate(message["content"]):
+        if block["type"] == "tool_use":
+            start = {**block, "input": {}}
+            pieces = _chunks(json.dumps(block["input"], ensure_ascii=False))
+            delta = lambda piece: {"type": "input_json_delta", "partial_json": piece}
+        else:
+            start = {"type": "text", "text": ""}
+            pieces = _chunks(block.get("text", ""))
+            delta = lambda piece: {"type": "text_delta", "text": piece}
+        yield _sse("content_block_start", {"type": "content_block_start", "index": index, "content_block": start})
+        for piece in pieces:
+            if per_token:
+                await asyncio.sleep(per_token * max(1, len(piece) // 4))
+            yield _sse("content_block_delta", {"type": "content_block_delta", "index": index, "delta": delta(piece)})
+        yield _sse("content_block_stop", {"type": "content_block_stop", "index": index})
+    yield _sse("message_delta", {
+        "type": "message_delta",
+        "delta": {"stop_reason": message["stop_reason"], "stop_sequence": message.get("stop_sequence")},
+        "usage": {"output_tokens": message["usage"]["output_tokens"]},
+    })
+    yield _sse("message_stop", {"type": "message_stop"})
+
+
+async def _record(params: dict, request: Request):
+    """Forward to the real API (non-streaming) and keep the answer as a fixture."""
+    headers = {
+        "x-api-key": request.headers.get("x-api-key", ""),
+        "anthropic-version": request.headers.get("anthropic-version", "2023-06-01"),
+        "content-type": "application/json",
+    }
+    if request.headers.get("anthropic-beta"):
+        headers["anthropic-beta"] = request.headers["anthropic-beta"]
+    async with httpx.AsyncClient(timeout=600) as client:
+        upstream = await client.post(f"{UPSTREAM}/v1/messages", json={**params, "stream": False}, headers=headers)
+    if upstream.status_code != 200:
+        return None, JSONResponse(upstream.json(), status_code=upstream.status_code)
+    message = upstream.json()
+    _save_fixture(_fixture_key(params), params, message)
+    return message, None
+
+
+# ── Messages API ─────────────────────────────────────────────
+
+@app.post("/v1/messages")
+async def create_message(request: Request):
+    body = await request.json()
+    stream = bool(body.pop("stream", False))
+
+    if MODE == "record":
+        message, failure = await _record(body, request)
+        if failure:
+            return failure
+        ttft, per_token = 0.0, 0.0  # the real call already took its time
+    else:
+        message = _offline_message(body)
+        if message is None:
+            return _error(404, "not_found_error", f"no fixture for request {_fixture_key(body)}")
+        ttft, per_token = _pacing(body)
+
+    if stream:
+        return StreamingResponse(_stream(message, ttft, per_token), media_type="text/event-stream")
+    await asyncio.sleep(ttft + per_token * message["usage"]["output_tokens"])
+    return message
+
+
+# ── Message Batches ──────────────────────────────────────────
+
+def _view(batch: dict, base_url: str) -> dict:
+    ended = time.time() >= batch["created"] + BATCH_DELAY or batch["canceled"]
+    n = len(batch["requests"])
+    return {
+        "id": batch["id"],
+        "type": "message_batch",
+        "processing_status": "ended" if ended else "in_progress",
+        "request_counts": {
+            "processing": 0 if ended else n,
+            "succeeded": n if ended and not batch["canceled"] else 0,
+            "errored": 0,
+            "canceled": n if batch["canceled"] else 0,
+            "expired": 0,
+        },
+        "created_at": _iso(batch["created"]),
+        "expires_at": _iso(batch["created"] + timedelta(days=1).total_seconds()),
+        "ended_at": _iso(batch["created"] + BATCH_DELAY) if ended else None,
+        "cancel_initiated_at": _iso(batch["created"]) if batch["canceled"] else None,
+        "archived_at": None,
+        "results_url": f"{base_url}v1/messages/batches/{batch['id']}/results" if ended else None,
+    }
+
+
+def _get(batch_id: str) -> dict:
+    batch = _batches.get(batch_id)
+    if not batch:
+        raise HTTPException(404, {"type": "error", "error": {"type": "not_found_error", "message": "batch not found"}})
+    return batch
+
+
+@app.post("/v1/messages/batches")
+async def create_batch(request: Request):
+    body = await request.json()
+    batch_id = f"msgbatch_stub_{uuid.uuid4().hex[:16]}"
+    _batches[batch_id] = {"id": batch_id, "requests": body.get("requests", []), "created": time.time(), "canceled": False}
+    return _view(_batches[batch_id], str(request.base_url))
+
+
+@app.get("/v1/messages/batches/{batch_id}")
+async def retrieve_batch(batch_id: str, request: Request):
+    return _view(_get(batch_id), str(request.base_url))
+
+
+@app.post("/v1/messages/batches/{batch_id}/cancel")
+async def cancel_batch(batch_id: str, request: Request):
+    batch = _get(batch_id)
+    batch["canceled"] = True
+    return _view(batch, str(request.base_url))
+
+
+@app.get("/v1/messages/batches/{batch_id}/results")
+async def batch_results(batch_id: str):
+    batch = _get(batch_id)
+    lines = []
+    for req in batch["requests"]:
+        message = None if batch["canceled"] else _offline_message(req.get("params", {}))
+        if batch["canceled"]:
+            result = {"type": "canceled"}
+        elif message is None:
+            result = {"type": "errored", "error": {"type": "not_found_error", "message": "no fixture"}}
+        else:
+            result = {"type": "succeeded", "message": message}
+        lines.append(json.dumps({"custom_id": req.get("custom_id"), "result": result}))
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="application/x-jsonl")
@@ -0,0 +1,42 @@
+"""
+Move inline incoming_resumes.raw_input uploads into the resume_files GridFS bucket.
+
+Usage:
+    cd resumematch-api
+    python -m app.scripts.migrate_resume_files
+
+What it does:
+    For every incoming_resumes document that still carries raw_input, uploads it
+    to GridFS, sets raw_input_id / raw_input_size and unsets raw_input. Safe to
+    re-run: migrated documents no longer match.
+"""
+
+import asyncio
+
+from app.services.mongo import mongo
+from app.services.incoming_resume_service import IncomingResumeService
+
+
+async def migrate():
+    await mongo.connect()
+
+    moved = 0
+    cursor = mongo.incoming_resumes.find(
+        {"raw_input": {"$exists": True}},
+        {"user_id": 1, "raw_input": 1, "fingerprint": 1},
+    )
+    async for doc in cursor:
+        raw_input = doc.get("raw_input") or ""
+        file_id = await IncomingResumeService._store_raw_input(doc["user_id"], raw_input, doc.get("fingerprint"))
+        await mongo.incoming_resumes.update_one(
+            {"_id": doc["_id"]},
+            {"$set": {"raw_input_id": file_id, "raw_input_size": len(raw_input)}, "$unset": {"raw_input": ""}},
+        )
+        moved += 1
+
+    print(f"Moved {moved} resume uploads to GridFS")
+    await mongo.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
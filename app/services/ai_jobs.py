@@ -0,0 +1,309 @@
+"""
+Durable background jobs for long-running AI operations (tailor / extract /
+analyze-and-tailor), backed by the ai_jobs collection.
+
+A job is inserted "queued" and its id returned at once. Bounded workers
+(settings.ai_job_workers per process) claim jobs, run the registered
+handler and write progress and the final result onto the document, so a
+client can poll — or re-subscribe after a reconnect — until the TTL
+(ai_job_ttl_seconds) removes it. A claim is a lease (ai_job_lease_seconds)
+renewed while the handler runs: jobs of a process that died are claimed
+again by another worker, up to ai_job_max_attempts.
+
+Credits are charged by the submitter (resume_ai_controller); the job keeps
+the amount and the credits_log entry its tokens are committed to. A failed
+job refunds the charge exactly once; a succeeded job whose result reports a
+smaller creditsUsed (e.g. a reused extraction) refunds the difference.
+
+Job document:
+  _id, user_id, kind, payload (dropped once finished), status (queued |
+  running | succeeded | failed), progress {"stage", ...}, seq (bumped on
+  every change a subscriber should see), result, error, cost, credits_used,
+  credits_log_id, refunded, attempts, claim, lease_until, created_at,
+  updated_at, started_at, finished_at
+
+Exported callables:
+  register_job_handler(kind, handler)                        → None
+  submit_job(user_id, kind, payload, cost, credits_log_id)   → async → str (job id)
+  get_job(user_id, job_id)                                   → async → Optional[Dict]
+  list_jobs(user_id, limit=20)                               → async → List[Dict]
+  job_events(user_id, job_id)                                → async iterator of events
+      {"type": "progress", "job": Dict}   on every change while queued / running
+      {"type": "ping"}                    keep-alive while nothing changes
+      {"type": "done", "job": Dict}       succeeded or failed (last event)
+      {"type": "error", "message"}        unknown job
+  start_ai_job_workers()                                     → sync  → None  (startup)
+  stop_ai_job_workers()                                      → async → None  (shutdown)
+
+Handler: async (payload, user_id, cost, progress) → result Dict or {"error", "message"}
+         progress(stage, **fields) stores {"stage", **fields} as job.progress
+"""
+
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId
+
+from app.config import settings
+from app.services.ai_provider_service import set_ai_user
+from app.services.credits_service import CreditsService
+from app.services.mongo import mongo
+
+logger = logging.getLogger(__name__)
+
+Progress = Callable[..., Awaitable[None]]
+Handler = Callable[[Dict, str, float, Progress], Awaitable[Dict]]
+
+TERMINAL = ("succeeded", "failed")
+_KEEPALIVE_SECONDS = 15.0
+# Never sent back to clients (the payload can be a multi-MB resume upload)
+_HIDDEN = {"payload": 0}
+
+_handlers: Dict[str, Handler] = {}
+_workers: List[asyncio.Task] = []
+_wakeup: Optional[asyncio.Event] = None
+
+
+def register_job_handler(kind: str, handler: Handler) -> None:
+    _handlers[kind] = handler
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _public(doc: Dict) -> Dict:
+    """AiJobResponse shape."""
+    status = doc.get("status", "queued")
+    return {
+        "jobId":       str(doc["_id"]),
+        "kind":        doc.get("kind"),
+        "status":      status,
+        "progress":    doc.get("progress") or {},
+        "result":      doc.get("result") if status == "succeeded" else None,
+        "error":       doc.get("error"),
+        "creditsUsed": doc.get("credits_used", doc.get("cost", 0)),
+        "createdAt":   _iso(doc.get("created_at")),
+        "startedAt":   _iso(doc.get("started_at")),
+        "finishedAt":  _iso(doc.get("finished_at")),
+    }
+
+
+def _object_id(job_id: str) -> Optional[ObjectId]:
+    return ObjectId(job_id) if ObjectId.is_valid(job_id) else None
+
+
+# ── Client side ─────────────────────────────────────────────
+async def submit_job(
+    user_id: str,
+    kind: str,
+    payload: Dict,
+    cost: float,
+    credits_log_id: Optional[ObjectId] = None,
+) -> str:
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    now = datetime.utcnow()
+    result = await mongo.ai_jobs.insert_one({
+        "user_id":        user_id,
+        "kind":           kind,
+        "payload":        payload,
+        "status":         "queued",
+        "progress":       {"stage": "queued"},
+        "seq":            0,
+        "cost":           cost,
+        "credits_log_id": credits_log_id,
+        "refunded":       False,
+        "attempts":       0,
+        "created_at":     now,
+        "updated_at":     now,
+    })
+    if _wakeup is not None:
+        _wakeup.set()  # an idle worker in this process takes it right away
+    return str(result.inserted_id)
+
+
+async def get_job(user_id: str, job_id: str) -> Optional[Dict]:
+    oid = _object_id(job_id)
+    if oid is None:
+        return None
+    doc = await mongo.ai_jobs.find_one({"_id": oid, "user_id": user_id}, _HIDDEN)
+    return _public(doc) if doc else None
+
+
+async def list_jobs(user_id: str, limit: int = 20) -> List[Dict]:
+    cursor = mongo.ai_jobs.find({"user_id": user_id}, {**_HIDDEN, "result": 0}).sort("created_at", -1).limit(limit)
+    return [_public(doc) async for doc in cursor]
+
+
+async def job_events(user_id: str, job_id: str) -> AsyncIterator[Dict]:
+    """Progress of one job, read from Mongo — works whichever process runs it."""
+    oid = _object_id(job_id)
+    seq, quiet = -1, 0.0
+    while True:
+        doc = await mongo.ai_jobs.find_one({"_id": oid, "user_id": user_id}, _HIDDEN) if oid else None
+        if doc is None:
+            yield {"type": "error", "message": "Job not found"}
+            return
+        if doc.get("status") in TERMINAL:
+            yield {"type": "done", "job": _public(doc)}
+            return
+        if doc.get("seq", 0) != seq:
+            seq, quiet = doc.get("seq", 0), 0.0
+            yield {"type": "progress", "job": _public(doc)}
+        elif quiet >= _KEEPALIVE_SECONDS:
+            quiet = 0.0
+            yield {"type": "ping"}
+        await asyncio.sleep(settings.ai_job_poll_seconds)
+        quiet += settings.ai_job_poll_seconds
+
+
+# ── Worker side ─────────────────────────────────────────────
+def _lease_until() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=settings.ai_job_lease_seconds)
+
+
+async def _claim() -> Optional[Dict]:
+    """Oldest queued job, or a running one whose worker stopped renewing its lease."""
+    now = datetime.utcnow()
+    return await mongo.ai_jobs.find_one_and_update(
+        {"$or": [{"status": "queued"}, {"status": "running", "lease_until": {"$lt": now}}]},
+        {
+            "$set": {"status": "running", "claim": uuid.uuid4().hex, "lease_until": _lease_until(),
+                     "started_at": now, "updated_at": now, "progress": {"stage": "started"}},
+            "$inc": {"attempts": 1, "seq": 1},
+        },
+        sort=[("created_at", 1)],
+        return_document=True,
+    )
+
+
+async def _renew_lease(job_id: ObjectId, claim: str) -> None:
+    while True:
+        await asyncio.sleep(settings.ai_job_lease_seconds / 3)
+        try:
+            await mongo.ai_jobs.update_one({"_id": job_id, "claim": claim}, {"$set": {"lease_until": _lease_until()}})
+        except Exception as e:
+            logger.warning(f"AI job {job_id}: lease renewal failed: {e}")
+
+
+async def _refund(doc: Dict, amount: float, reason: str) -> None:
+    # Flag first: a job finished twice (or by two workers) never refunds twice
+    flagged = await mongo.ai_jobs.update_one(
+        {"_id": doc["_id"], "refunded": {"$ne": True}},
+        {"$set": {"refunded": True, "refunded_amount": amount}},
+    )
+    if flagged.modified_count:
+        await CreditsService.refund_credits(doc["user_id"], amount, reason)
+
+
+async def _finish(doc: Dict, result: Dict) -> None:
+    failed = not isinstance(result, dict) or "error" in result
+    cost = doc.get("cost", 0)
+    now = datetime.utcnow()
+    update: Dict[str, Any] = {
+        "status": "failed" if failed else "succeeded",
+        "progress": {"stage": "failed" if failed else "done"},
+        "finished_at": now,
+        "updated_at": now,
+    }
+    if failed:
+        update["error"] = (result or {}).get("message") or (result or {}).get("error") or "Processing failed"
+        update["credits_used"] = 0
+    else:
+        update["result"] = result
+        update["credits_used"] = min(cost, result.get("creditsUsed", cost))
+    written = await mongo.ai_jobs.update_one(
+        {"_id": doc["_id"], "claim": doc["claim"], "status": "running"},
+        {"$set": update, "$unset": {"payload": "", "lease_until": ""}, "$inc": {"seq": 1}},
+    )
+    if not written.modified_count:
+        return  # lease lapsed and another worker took the job over — its outcome stands
+    refund = cost - update["credits_used"]
+    if refund > 0:
+        await _refund(doc, refund, f"{doc['kind']} job {'failed' if failed else 'partially charged'}")
+    logger.info(f"AI job {doc['_id']} ({doc['kind']}) {update['status']} after {doc.get('attempts', 1)} attempt(s)")
+
+
+async def _process(doc: Dict) -> None:
+    job_id, claim = doc["_id"], doc["claim"]
+    handler = _handlers.get(doc.get("kind"))
+    if handler is None:
+        await _finish(doc, {"error": "unknown_kind", "message": f"No handler for {doc.get('kind')}"})
+        return
+    if doc.get("attempts", 1) > settings.ai_job_max_attempts:
+        await _finish(doc, {"error": "gave_up", "message": "The job was interrupted too many times"})
+        return
+
+    async def progress(stage: str, **fields) -> None:
+        await mongo.ai_jobs.update_one(
+            {"_id": job_id, "claim": claim},
+            {"$set": {"progress": {"stage": stage, **fields}, "updated_at": datetime.utcnow()}, "$inc": {"seq": 1}},
+        )
+
+    renewal = asyncio.create_task(_renew_lease(job_id, claim))
+    CreditsService.bind_log(doc.get("credits_log_id"))
+    # Worker tasks outlive requests: schedule this job's Claude calls as its user's
+    # (plan weight, own WFQ flow) — a user is waiting on the result, so interactive
+    set_ai_user(doc["user_id"])
+    try:
+        result = await asyncio.wait_for(
+            handler(doc.get("payload") or {}, doc["user_id"], doc.get("cost", 0), progress),
+            settings.ai_job_timeout_seconds,
+        )
+    except asyncio.TimeoutError:
+        result = {"error": "timeout", "message": "Processing took too long"}
+    except Exception:
+        logger.exception(f"AI job {job_id} ({doc.get('kind')}) failed")
+        result = {"error": "processing_failed", "message": "Processing failed"}
+    finally:
+        renewal.cancel()
+        # Tokens spent are recorded whatever the outcome; a failed write
+        # never turns a finished result into a failed (refunded) job
+        try:
+            await CreditsService.commit_ai_tokens()
+        except Exception as e:
+            logger.warning(f"AI job {job_id}: committing AI tokens failed: {e}")
+    await _finish(doc, result)
+
+
+async def _worker(index: int) -> None:
+    while True:
+        try:
+            doc = await _claim()
+        except Exception as e:
+            logger.warning(f"AI job worker {index}: claim failed: {e}")
+            doc = None
+        if doc is None:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), settings.ai_job_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+            continue
+        try:
+            await _process(doc)
+        except Exception:
+            # Mongo unreachable while finishing: the lease lapses and the job is retried
+            logger.exception(f"AI job worker {index}: job {doc['_id']} not finished")
+
+
+def start_ai_job_workers() -> None:
+    """Start this process's workers (call from the running event loop)."""
+    global _wakeup
+    if _workers or settings.ai_job_workers <= 0:
+        return
+    _wakeup = asyncio.Event()
+    _workers.extend(asyncio.create_task(_worker(i)) for i in range(settings.ai_job_workers))
+    logger.info(f"✅ AI job workers started: {settings.ai_job_workers}")
+
+
+async def stop_ai_job_workers() -> None:
+    """Cancel the workers; jobs they were running are retried once their lease lapses."""
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -2,24 +2,49 @@
 Claude-only AI provider service. Every AI call routes to Anthropic Claude.
 
 Exported callables:
-  call_ai(prompt, ...)                      → sync  → Dict (JSON)
+  call_ai(prompt, ..., cache=False)         → sync  → Dict (JSON)   (scripts / thread pools)
+  call_ai_async(prompt, ..., cache=False)   → async → Dict (JSON)   (request handlers)
+  get_ai_cache_stats()                      → sync  → Dict (response-cache hit/miss counters)
+  run_json_batch({id: prompt}, ...)         → async → Dict[id, Dict] (Message Batches, offline work)
   call_ai_text_async(prompt, ...)           → async → str  (plain text)
   call_ai_chat_async(history, msg, ...)     → async → str  (chat response)
   call_ai_with_tools_async(...)             → async → dict (tool-call response)
   send_tool_result_async(...)               → async → str  (final reply after tool)
+  stream_ai_with_tools_async(...)           → async gen → delta events + final tool-call dict
+  stream_tool_result_async(...)             → async gen → delta events + final reply
   get_active_provider_sync()                → sync  → "claude"
   get_active_provider()                     → async → "claude"
   set_active_provider(...)                  → async → None  (no-op shim, kept for compat)
   init_active_provider()                    → async → None  (call at startup)
+  get_sync_client / get_async_client(key)   → pooled Anthropic clients per api_key
+  get_key_pool_stats()                      → sync  → List (per-key headroom / cooldown / usage)
+  get_admission_stats()                     → sync  → Dict (per-model slots / queue / waits)
+  get_feature_telemetry()                   → sync  → Dict (per-feature latency + token percentiles)
+  get_call_trace_stats()                    → sync  → Dict (p50/p95/p99 per feature+model, loop lag)
+  get_recent_call_traces(limit, feature)    → sync  → List (newest individual call traces)
+  get_structured_output_stats()             → sync  → Dict (tool / clean / repaired / retried / failed)
+  get_fallback_stats()                      → sync  → Dict (per-feature model fallback counts)
+  get_request_models()                      → sync  → Dict (models that answered this request)
+  set_ai_user(user_id, priority)            → sync  → None  (fair-scheduling identity for this context)
+  reset_client_registry()                   → sync  → None  (on admin key change)
 """
 
+import re
 import json
 import time
+import random
+import asyncio
+import hashlib
 import logging
+import itertools
+import threading
 import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager, asynccontextmanager
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+from app.config import settings
 from app.services.mongo import mongo
 
 logger = logging.getLogger(__name__)
@@ -41,22 +66,1459 @@ _request_tokens_var: "contextvars.ContextVar[Optional[Dict[str, int]]]" = (
 )
 
 
+def _empty_token_counter() -> Dict[str, int]:
+    # cache_read / cache_creation are Anthropic prompt-cache tokens (billed
+    # apart from "input"); cache_hits counts calls answered from the response
+    # cache (0 tokens spent)
+    return {"input": 0, "output": 0, "cache_read": 0, "cache_creation": 0, "cache_hits": 0}
+
+
+# Models that answered this request ({model: calls}) and how many calls a
+# fallback model served (see "Model fallback"); persisted alongside the tokens.
+_request_models_var: "contextvars.ContextVar[Optional[Dict]]" = (
+    contextvars.ContextVar("ai_request_models", default=None)
+)
+
+
 def reset_request_tokens() -> None:
-    _request_tokens_var.set({"input": 0, "output": 0})
+    _request_tokens_var.set(_empty_token_counter())
+    _request_models_var.set({"models": {}, "fallbacks": 0})
 
 
 def get_request_tokens() -> Dict[str, int]:
     val = _request_tokens_var.get()
-    return dict(val) if val else {"input": 0, "output": 0}
+    return {**_empty_token_counter(), **val} if val else _empty_token_counter()
+
 
+def get_request_models() -> Dict:
+    """{"models": {model: calls}, "fallbacks": n} for this request."""
+    val = _request_models_var.get()
+    return {"models": dict(val["models"]), "fallbacks": val["fallbacks"]} if val else {"models": {}, "fallbacks": 0}
 
-def _accumulate_tokens(input_t: int, output_t: int) -> None:
+
+def _request_models() -> Dict:
+    cur = _request_models_var.get()
+    if cur is None:
+        cur = {"models": {}, "fallbacks": 0}
+        _request_models_var.set(cur)
+    return cur
+
+
+def _request_counter() -> Dict[str, int]:
     cur = _request_tokens_var.get()
     if cur is None:
-        cur = {"input": 0, "output": 0}
+        cur = _empty_token_counter()
         _request_tokens_var.set(cur)
+    return cur
+
+
+def _accumulate_tokens(input_t: int, output_t: int, cache_read: int = 0, cache_creation: int = 0) -> None:
+    cur = _request_counter()
     cur["input"] += int(input_t or 0)
     cur["output"] += int(output_t or 0)
+    cur["cache_read"] = cur.get("cache_read", 0) + int(cache_read or 0)
+    cur["cache_creation"] = cur.get("cache_creation", 0) + int(cache_creation or 0)
+
+
+def _usage_tokens(response) -> Dict[str, int]:
+    """Token counts from a Messages API response (missing fields → 0)."""
+    usage = getattr(response, "usage", None)
+    return {
+        "input":          getattr(usage, "input_tokens", 0) or 0,
+        "output":         getattr(usage, "output_tokens", 0) or 0,
+        "cache_read":     getattr(usage, "cache_read_input_tokens", 0) or 0,
+        "cache_creation": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+    }
+
+
+def _accumulate_usage(response) -> Dict[str, int]:
+    usage = _usage_tokens(response)
+    _accumulate_tokens(usage["input"], usage["output"], usage["cache_read"], usage["cache_creation"])
+    return usage
+
+
+def _accumulate_cache_hit() -> None:
+    cur = _request_counter()
+    cur["cache_hits"] = cur.get("cache_hits", 0) + 1
+
+
+# ─────────────────────────────────────────────────────────────
+# Pooled Anthropic clients
+# ─────────────────────────────────────────────────────────────
+# One sync + one async client per api_key, each holding a keep-alive
+# connection pool. Building a client per call paid a fresh TLS handshake
+# on every request. save_claude_config() swaps the registry so a new key or
+# new pool limits apply immediately; in-flight calls keep the old client.
+
+class _ClientRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync: Dict[str, object] = {}
+        self._async: Dict[str, object] = {}
+
+    @staticmethod
+    def _pool_kwargs() -> Dict:
+        import httpx
+        return {
+            "limits": httpx.Limits(
+                max_connections=settings.claude_max_connections,
+                max_keepalive_connections=settings.claude_max_keepalive_connections,
+                keepalive_expiry=settings.claude_keepalive_expiry_seconds,
+            ),
+            "timeout": httpx.Timeout(
+                settings.claude_timeout_seconds,
+                connect=settings.claude_connect_timeout_seconds,
+            ),
+        }
+
+    def get_sync(self, api_key: str):
+        client = self._sync.get(api_key)
+        if client is not None:
+            return client
+        import anthropic as _anthropic
+        with self._lock:
+            client = self._sync.get(api_key)
+            if client is None:
+                kw = self._pool_kwargs()
+                client = _anthropic.Anthropic(
+                    api_key=api_key,
+                    base_url=settings.claude_base_url,
+                    timeout=kw["timeout"],
+                    http_client=_anthropic.DefaultHttpxClient(limits=kw["limits"], timeout=kw["timeout"]),
+                )
+                self._sync[api_key] = client
+        return client
+
+    def get_async(self, api_key: str):
+        client = self._async.get(api_key)
+        if client is not None:
+            return client
+        import anthropic as _anthropic
+        with self._lock:
+            client = self._async.get(api_key)
+            if client is None:
+                kw = self._pool_kwargs()
+                client = _anthropic.AsyncAnthropic(
+                    api_key=api_key,
+                    base_url=settings.claude_base_url,
+                    timeout=kw["timeout"],
+                    http_client=_anthropic.DefaultAsyncHttpxClient(limits=kw["limits"], timeout=kw["timeout"]),
+                )
+                self._async[api_key] = client
+        return client
+
+
+_client_registry = _ClientRegistry()
+
+
+def get_sync_client(api_key: str):
+    """Pooled anthropic.Anthropic for api_key (created on first use)."""
+    return _client_registry.get_sync(api_key)
+
+
+def get_async_client(api_key: str):
+    """Pooled anthropic.AsyncAnthropic for api_key (created on first use)."""
+    return _client_registry.get_async(api_key)
+
+
+def reset_client_registry() -> None:
+    """Atomically swap in an empty registry. Called on admin config save.
+    The old clients are not closed — a thread-pool or awaiting call may still
+    hold one; their pools are released when the last reference goes."""
+    global _client_registry
+    _client_registry = _ClientRegistry()
+
+
+# ─────────────────────────────────────────────────────────────
+# API key pool
+# ─────────────────────────────────────────────────────────────
+# claude_config_service holds the primary key plus an admin-editable pool.
+# Each call takes the key with the most rate-limit headroom, read from the
+# anthropic-ratelimit-* headers of that key's last response (a key with no
+# recent observation counts as fully free), minus a share for calls already
+# in flight on it. A key answering 429/529 rests until retry-after, one
+# answering 401/403 rests for claude_key_auth_cooldown_seconds; while every
+# key rests, the one that recovers first is used so callers still back off
+# normally instead of failing outright.
+
+_RATELIMIT_KINDS = ("requests", "tokens", "input-tokens", "output-tokens")
+_HEADROOM_TTL_SECONDS = 60.0  # rate-limit windows refill within a minute
+
+
+class _KeyState:
+    __slots__ = ("id", "label", "in_flight", "headroom", "observed_at", "cooldown_until",
+                 "last_error", "counts")
+
+    def __init__(self, key_id: str, label: str):
+        self.id = key_id
+        self.label = label
+        self.in_flight = 0
+        self.headroom: Dict[str, Tuple[int, int]] = {}  # kind → (remaining, limit)
+        self.observed_at = 0.0
+        self.cooldown_until = 0.0
+        self.last_error: Optional[str] = None
+        self.counts: Dict[str, int] = {"calls": 0, "errors": 0, "throttled": 0, "tokens": 0}
+
+    def free_share(self, now: float) -> float:
+        """Lowest remaining/limit across the observed rate-limit kinds (1.0 if unknown)."""
+        if not self.headroom or now - self.observed_at > _HEADROOM_TTL_SECONDS:
+            return 1.0
+        return min(remaining / limit for remaining, limit in self.headroom.values() if limit)
+
+
+class _KeyPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states: Dict[str, _KeyState] = {}  # api key → state
+
+    @staticmethod
+    def _entries() -> List[Dict]:
+        from app.services.claude_config_service import get_api_key_pool_sync
+        return get_api_key_pool_sync()
+
+    def _state(self, entry: Dict) -> _KeyState:
+        state = self._states.get(entry["key"])
+        if state is None:
+            state = self._states[entry["key"]] = _KeyState(entry["id"], entry["label"])
+        state.label = entry["label"]
+        return state
+
+    def has_keys(self) -> bool:
+        return bool(self._entries())
+
+    def _ready(self) -> int:
+        now = time.monotonic()
+        entries = self._entries()
+        with self._lock:
+            return sum(1 for e in entries if self._state(e).cooldown_until <= now)
+
+    def has_ready(self) -> bool:
+        return self._ready() > 0
+
+    def capacity(self) -> int:
+        """Keys not cooling down (at least 1) — admission limits scale with it."""
+        return max(1, self._ready())
+
+    def acquire(self, in_flight: bool = True) -> str:
+        """Key with the most headroom; counts the call as in flight until release()
+        (in_flight=False just picks — for work that outlives one call, e.g. batches)."""
+        entries = self._entries()
+        if not entries:
+            raise RuntimeError("Claude API key not set")
+        now = time.monotonic()
+        per_key_slots = max(1, settings.claude_max_concurrency_per_model)
+        with self._lock:
+            states = [(e["key"], self._state(e)) for e in entries]
+            ready = [(k, s) for k, s in states if s.cooldown_until <= now]
+            if ready:
+                key, state = max(ready, key=lambda ks: ks[1].free_share(now) - ks[1].in_flight / per_key_slots)
+            else:
+                key, state = min(states, key=lambda ks: ks[1].cooldown_until)
+            if in_flight:
+                state.in_flight += 1
+                state.counts["calls"] += 1
+        return key
+
+    def observe(self, key: str, headers) -> None:
+        """Record the anthropic-ratelimit-* headers of a response made with key."""
+        if not headers:
+            return
+        headroom: Dict[str, Tuple[int, int]] = {}
+        for kind in _RATELIMIT_KINDS:
+            try:
+                remaining = int(headers.get(f"anthropic-ratelimit-{kind}-remaining"))
+                limit = int(headers.get(f"anthropic-ratelimit-{kind}-limit"))
+            except (TypeError, ValueError):
+                continue
+            headroom[kind] = (remaining, limit)
+        if not headroom:
+            return
+        with self._lock:
+            state = self._states.get(key)
+            if state:
+                state.headroom = headroom
+                state.observed_at = time.monotonic()
+
+    def release(self, key: str, response=None, error: Optional[Exception] = None) -> None:
+        """End of a call made with key: usage on success, cooldown on throttle / auth errors."""
+        headers = getattr(getattr(error, "response", None), "headers", None) if error else None
+        if headers:
+            self.observe(key, headers)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return
+            state.in_flight = max(0, state.in_flight - 1)
+            if error is None:
+                state.counts["tokens"] += _usage_total(response) or 0
+                return
+            state.counts["errors"] += 1
+            state.last_error = type(error).__name__
+            status = getattr(error, "status_code", None)
+            if _is_throttle(error):
+                state.counts["throttled"] += 1
+                rest = _retry_after_seconds(error) or settings.claude_key_cooldown_seconds
+            elif status in (401, 403):
+                rest = settings.claude_key_auth_cooldown_seconds
+            else:
+                return
+            state.cooldown_until = max(state.cooldown_until, time.monotonic() + rest)
+        logger.info(f"Claude key {state.label} cooling down for {rest:.0f}s ({type(error).__name__})")
+
+    def snapshot(self) -> List[Dict]:
+        now = time.monotonic()
+        entries = self._entries()
+        with self._lock:
+            out = []
+            for entry in entries:
+                state = self._state(entry)
+                out.append({
+                    "id":                entry["id"],
+                    "label":             state.label,
+                    "key_masked":        entry["key"][:8] + "•" * 12,
+                    "in_flight":         state.in_flight,
+                    "cooling_down":      state.cooldown_until > now,
+                    "cooldown_left_s":   round(max(0.0, state.cooldown_until - now), 1),
+                    "headroom":          round(state.free_share(now), 3),
+                    "ratelimit":         {kind: {"remaining": r, "limit": l} for kind, (r, l) in state.headroom.items()},
+                    "observed_s_ago":    round(now - state.observed_at, 1) if state.observed_at else None,
+                    "last_error":        state.last_error,
+                    **state.counts,
+                })
+        return out
+
+
+_key_pool = _KeyPool()
+
+
+def get_key_pool_stats() -> List[Dict]:
+    """Per-key headroom, cooldown and usage counters (admin resource page)."""
+    return _key_pool.snapshot()
+
+
+def _raw_headers(raw) -> Any:
+    """Response headers of an SDK raw response / message stream, if exposed."""
+    response = getattr(raw, "http_response", None) or getattr(raw, "response", None) or raw
+    return getattr(response, "headers", None)
+
+
+@asynccontextmanager
+async def _pooled_stream(request: Dict, timeout: Optional[float] = None):
+    """messages.stream() on the pool key with the most headroom (SDK retries
+    off — throttles are retried by _admitted_stream_async())."""
+    key = _key_pool.acquire()
+    try:
+        client = get_async_client(key).with_options(max_retries=0, **({"timeout": timeout} if timeout else {}))
+        async with client.messages.stream(**request) as stream:
+            yield stream
+            _key_pool.observe(key, _raw_headers(stream))
+            response = await stream.get_final_message()
+    except BaseException as e:
+        _key_pool.release(key, error=e if isinstance(e, Exception) else None)
+        raise
+    _key_pool.release(key, response)
+
+
+# ─────────────────────────────────────────────────────────────
+# Admission control + throttle-aware backoff
+# ─────────────────────────────────────────────────────────────
+# Every Messages API call waits for a per-model slot: at most
+# claude_max_concurrency_per_model in flight and claude_tokens_per_minute
+# (estimated) admitted in any 60s window, both per API key that is not
+# cooling down (see the key pool above). A freed slot is handed to the
+# next waiter directly. The lock is a threading.Lock because sync
+# call_claude() runs in thread pools while the async variants run on the
+# event loop — both share one set of lanes.
+#
+# Waiters are ordered by weighted fair queuing: each user is a flow whose
+# calls are tagged with a virtual finish time (estimated tokens / plan
+# weight), so one user's burst can't starve everyone else and paid plans
+# get a larger share. Interactive work always goes before background work
+# (daily cron), and background work may hold at most
+# ai_background_max_share of the slots so interactive calls find room.
+#
+# 429 / 529 responses are retried here (slot released while sleeping) with
+# full-jitter exponential backoff, never sooner than retry-after. Calls that
+# go through this path disable the SDK's own retries so they don't stack.
+
+class AdmissionTimeout(Exception):
+    """No slot became free within claude_admission_timeout_seconds."""
+
+
+class DeadlineExceeded(Exception):
+    """A model missed the latency deadline of its feature's fallback route."""
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0.0 when empty)."""
+    if not ordered:
+        return 0.0
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+
+# (user_id, priority) of the work running in this context. Set per request
+# by the auth dependency and per user by background jobs.
+_ai_principal_var: "contextvars.ContextVar[Optional[Tuple[str, str]]]" = (
+    contextvars.ContextVar("ai_principal", default=None)
+)
+
+
+def set_ai_user(user_id: Optional[str], priority: str = PRIORITY_INTERACTIVE) -> None:
+    """Attribute AI calls made from this context to user_id for fair scheduling."""
+    _ai_principal_var.set((user_id or "", priority))
+
+
+# user_id → (weight, expires_at). Plans change rarely; a short TTL is enough.
+_plan_weight_cache: Dict[str, Tuple[float, float]] = {}
+_PLAN_WEIGHT_TTL_SECONDS = 300.0
+
+
+def _weight_for_plan(plan: Optional[str]) -> float:
+    plan = (plan or "Free").strip()
+    if plan in settings.ai_plan_weights:
+        return float(settings.ai_plan_weights[plan])
+    return settings.ai_weight_free if plan.lower() == "free" else settings.ai_weight_paid
+
+
+async def _user_weight(user_id: str) -> float:
+    cached = _plan_weight_cache.get(user_id)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+    weight = settings.ai_weight_free
+    try:
+        from bson import ObjectId
+        user = await mongo.users.find_one({"_id": ObjectId(user_id)}, {"active_plan": 1})
+        weight = _weight_for_plan((user or {}).get("active_plan"))
+    except Exception as e:
+        logger.debug(f"Plan lookup for AI scheduling failed ({user_id}): {e}")
+    _plan_weight_cache[user_id] = (weight, time.monotonic() + _PLAN_WEIGHT_TTL_SECONDS)
+    return weight
+
+
+def _principal_sync() -> Tuple[str, float, str]:
+    """(flow, weight, priority) from cached data only — worker threads can't await."""
+    user_id, priority = _ai_principal_var.get() or ("", PRIORITY_INTERACTIVE)
+    cached = _plan_weight_cache.get(user_id) if user_id else None
+    return user_id, (cached[0] if cached else settings.ai_weight_free), priority
+
+
+async def _principal_async() -> Tuple[str, float, str]:
+    user_id, priority = _ai_principal_var.get() or ("", PRIORITY_INTERACTIVE)
+    if not user_id or priority == PRIORITY_BACKGROUND:
+        return user_id, settings.ai_weight_free, priority
+    return user_id, await _user_weight(user_id), priority
+
+
+class _Ticket:
+    __slots__ = ("seq", "tokens", "flow", "priority", "start", "finish", "enqueued",
+                 "granted", "wake", "window_entry", "actual")
+
+    def __init__(self, seq: int, tokens: int, flow: str, priority: str, wake):
+        self.seq = seq
+        self.tokens = tokens
+        self.flow = flow
+        self.priority = priority
+        self.start = 0.0   # virtual start / finish tags (fair queuing)
+        self.finish = 0.0
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.wake = wake
+        self.window_entry: Optional[list] = None
+        self.actual: Optional[int] = None  # real token usage, set by the caller
+
+
+class _ModelLane:
+    def __init__(self):
+        self.in_flight = 0
+        self.background_in_flight = 0
+        self.waiters: List[_Ticket] = []
+        self.window: "deque[list]" = deque()  # [admitted_at, tokens]
+        self.vtime = 0.0                      # virtual clock for fair queuing
+        self.flows: Dict[str, float] = {}     # flow → last virtual finish
+        self.stats: Dict[str, float] = {"timeouts": 0, "throttled": 0, "retries": 0}
+        self.waits: Dict[str, "deque[float]"] = {
+            PRIORITY_INTERACTIVE: deque(maxlen=500),
+            PRIORITY_BACKGROUND:  deque(maxlen=500),
+        }
+        self.admitted: Dict[str, int] = {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 0}
+
+
+class _AdmissionController:
+    _WINDOW_SECONDS = 60.0
+    _POLL_SECONDS = 0.5  # re-check cadence while blocked on the token window
+    _MAX_FLOWS = 2000    # prune idle flow tags beyond this
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lanes: Dict[str, _ModelLane] = {}
+        self._seq = itertools.count()
+
+    def _lane(self, model: str) -> _ModelLane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            lane = self._lanes[model] = _ModelLane()
+        return lane
+
+    def _window_used(self, lane: _ModelLane, now: float) -> int:
+        while lane.window and now - lane.window[0][0] >= self._WINDOW_SECONDS:
+            lane.window.popleft()
+        return sum(entry[1] for entry in lane.window)
+
+    @staticmethod
+    def _slots() -> int:
+        return settings.claude_max_concurrency_per_model * _key_pool.capacity()
+
+    @staticmethod
+    def _tokens_per_minute() -> int:
+        return settings.claude_tokens_per_minute * _key_pool.capacity()
+
+    @classmethod
+    def _background_slots(cls) -> int:
+        limit = cls._slots()
+        return max(1, min(limit, int(limit * settings.ai_background_max_share)))
+
+    def _next_waiter(self, lane: _ModelLane) -> Optional[_Ticket]:
+        """Smallest virtual finish time, interactive before background."""
+        interactive = [t for t in lane.waiters if t.priority != PRIORITY_BACKGROUND]
+        if interactive:
+            return min(interactive, key=lambda t: (t.finish, t.seq))
+        if lane.background_in_flight >= self._background_slots():
+            return None
+        return min(lane.waiters, key=lambda t: (t.finish, t.seq))
+
+    def _dispatch(self, lane: _ModelLane) -> None:
+        """Grant slots to waiters while capacity allows. Caller holds the lock."""
+        now = time.monotonic()
+        slots, tokens_per_minute = self._slots(), self._tokens_per_minute()
+        while lane.waiters and lane.in_flight < slots:
+            ticket = self._next_waiter(lane)
+            if ticket is None:
+                break
+            used = self._window_used(lane, now)
+            # An oversized request still runs once the window is empty
+            if used and used + ticket.tokens > tokens_per_minute:
+                break
+            lane.waiters.remove(ticket)
+            lane.in_flight += 1
+            if ticket.priority == PRIORITY_BACKGROUND:
+                lane.background_in_flight += 1
+            lane.vtime = max(lane.vtime, ticket.start)
+            ticket.window_entry = [now, ticket.tokens]
+            lane.window.append(ticket.window_entry)
+            ticket.granted = True
+            lane.admitted[ticket.priority] += 1
+            lane.waits[ticket.priority].append((now - ticket.enqueued) * 1000)
+            ticket.wake()
+
+    def _enqueue(self, model: str, tokens: int, principal: Tuple[str, float, str], wake) -> _Ticket:
+        flow, weight, priority = principal
+        with self._lock:
+            lane = self._lane(model)
+            ticket = _Ticket(next(self._seq), tokens, flow, priority, wake)
+            ticket.start = max(lane.vtime, lane.flows.get(flow, 0.0))
+            ticket.finish = ticket.start + max(tokens, 1) / max(weight, 0.01)
+            lane.flows[flow] = ticket.finish
+            if len(lane.flows) > self._MAX_FLOWS:
+                lane.flows = {f: v for f, v in lane.flows.items() if v > lane.vtime}
+            lane.waiters.append(ticket)
+            self._dispatch(lane)
+            return ticket
+
+    def _poll(self, model: str, ticket: _Ticket) -> bool:
+        """Re-run dispatch (the token window may have slid). Raises on timeout."""
+        with self._lock:
+            if ticket.granted:
+                return True
+            lane = self._lane(model)
+            self._dispatch(lane)
+            if ticket.granted:
+                return True
+            if time.monotonic() - ticket.enqueued >= settings.claude_admission_timeout_seconds:
+                lane.waiters.remove(ticket)
+                lane.stats["timeouts"] += 1
+                raise AdmissionTimeout(f"Claude is busy — no {model} slot within {settings.claude_admission_timeout_seconds:.0f}s")
+            return False
+
+    def _abandon(self, model: str, ticket: _Ticket) -> None:
+        with self._lock:
+            lane = self._lane(model)
+            if ticket.granted:
+                return  # caller releases normally
+            if ticket in lane.waiters:
+                lane.waiters.remove(ticket)
+
+    def release(self, model: str, ticket: _Ticket, actual_tokens: Optional[int] = None) -> None:
+        with self._lock:
+            lane = self._lane(model)
+            lane.in_flight -= 1
+            if ticket.priority == PRIORITY_BACKGROUND:
+                lane.background_in_flight -= 1
+            if actual_tokens is not None and ticket.window_entry is not None:
+                ticket.window_entry[1] = actual_tokens  # replace the estimate
+            self._dispatch(lane)
+
+    def note(self, model: str, stat: str) -> None:
+        with self._lock:
+            self._lane(model).stats[stat] += 1
+
+    @contextmanager
+    def admit_sync(self, model: str, tokens: int):
+        event = threading.Event()
+        ticket = self._enqueue(model, tokens, _principal_sync(), event.set)
+        try:
+            while not ticket.granted:
+                event.wait(self._POLL_SECONDS)
+                self._poll(model, ticket)
+        except BaseException:
+            self._abandon(model, ticket)
+            if ticket.granted:
+                self.release(model, ticket)
+            raise
+        try:
+            yield ticket
+        finally:
+            self.release(model, ticket, ticket.actual)
+
+    @asynccontextmanager
+    async def admit_async(self, model: str, tokens: int):
+        principal = await _principal_async()
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        ticket = self._enqueue(model, tokens, principal, lambda: loop.call_soon_threadsafe(event.set))
+        try:
+            while not ticket.granted:
+                try:
+                    await asyncio.wait_for(event.wait(), self._POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self._poll(model, ticket)
+        except BaseException:
+            self._abandon(model, ticket)
+            if ticket.granted:
+                self.release(model, ticket)
+            raise
+        try:
+            yield ticket
+        finally:
+            self.release(model, ticket, ticket.actual)
+
+    @staticmethod
+    def _wait_summary(admitted: int, waits: "deque[float]") -> Dict:
+        ordered = sorted(waits)
+        return {
+            "admitted":    admitted,
+            "avg_wait_ms": round(sum(ordered) / len(ordered), 1) if ordered else 0.0,
+            "p50_wait_ms": _percentile(ordered, 0.50),
+            "p95_wait_ms": _percentile(ordered, 0.95),
+            "max_wait_ms": round(ordered[-1], 1) if ordered else 0.0,
+        }
+
+    def snapshot(self) -> Dict[str, Dict]:
+        now = time.monotonic()
+        out = {}
+        with self._lock:
+            for model, lane in self._lanes.items():
+                out[model] = {
+                    "in_flight":            lane.in_flight,
+                    "background_in_flight": lane.background_in_flight,
+                    "queue_depth":          len(lane.waiters),
+                    "background_queued":    sum(1 for t in lane.waiters if t.priority == PRIORITY_BACKGROUND),
+                    "oldest_wait_ms":       round((now - min(t.enqueued for t in lane.waiters)) * 1000, 1) if lane.waiters else 0.0,
+                    "tokens_last_minute":   self._window_used(lane, now),
+                    # wait stats cover the last 500 admissions per class
+                    "interactive":          self._wait_summary(lane.admitted[PRIORITY_INTERACTIVE], lane.waits[PRIORITY_INTERACTIVE]),
+                    "background":           self._wait_summary(lane.admitted[PRIORITY_BACKGROUND], lane.waits[PRIORITY_BACKGROUND]),
+                    "throttled":            int(lane.stats["throttled"]),
+                    "retries":              int(lane.stats["retries"]),
+                    "timeouts":             int(lane.stats["timeouts"]),
+                }
+        return out
+
+
+_admission = _AdmissionController()
+
+
+def get_admission_stats() -> Dict:
+    """Per-model slot / queue / wait-time counters (admin resource page)."""
+    return {
+        "api_keys_ready":            _key_pool.capacity(),
+        "max_concurrency_per_model": _AdmissionController._slots(),
+        "background_slots":          _AdmissionController._background_slots(),
+        "tokens_per_minute":         _AdmissionController._tokens_per_minute(),
+        "models":                    _admission.snapshot(),
+    }
+
+
+def _estimate_request_tokens(request: Dict) -> int:
+    """Rough in+out estimate (~4 chars/token) used to reserve TPM budget."""
+    chars = len(str(request.get("system", ""))) + len(str(request.get("messages", "")))
+    if request.get("tools"):
+        chars += len(str(request["tools"]))
+    return chars // 4 + int(request.get("max_tokens", 0))
+
+
+def _is_throttle(e: Exception) -> bool:
+    status = getattr(e, "status_code", None)
+    if status in (429, 529):
+        return True
+    msg = str(e).lower()
+    return "rate_limit" in msg or "overloaded" in msg
+
+
+def _retry_after_seconds(e: Exception) -> Optional[float]:
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_delay(e: Exception, attempt: int, model: str) -> Optional[float]:
+    """Seconds to sleep before retrying a throttled call, or None to give up."""
+    if not _is_throttle(e) or attempt >= settings.claude_backoff_max_retries:
+        return None
+    _admission.note(model, "throttled")
+    _admission.note(model, "retries")
+    ceiling = min(settings.claude_backoff_max_seconds, settings.claude_backoff_base_seconds * (2 ** attempt))
+    delay = random.uniform(0, ceiling)
+    retry_after = _retry_after_seconds(e)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, settings.claude_backoff_max_seconds))
+    logger.info(f"Claude throttled on {model} (attempt {attempt + 1}); retrying in {delay:.1f}s")
+    return delay
+
+
+def _usage_total(response) -> Optional[int]:
+    try:
+        usage = _usage_tokens(response)
+        return usage["input"] + usage["output"] + usage["cache_read"] + usage["cache_creation"]
+    except Exception:
+        return None
+
+
+def _retry_delay(e: Exception, attempt: int, model: str) -> Optional[float]:
+    """_backoff_delay(), except that a throttled call retries at once while
+    another key of the pool is still ready (the failing key is cooling down)."""
+    delay = _backoff_delay(e, attempt, model)
+    if delay is not None and _key_pool.has_ready():
+        return 0.0
+    return delay
+
+
+def _time_left(deadline_at: Optional[float], model: str) -> Optional[float]:
+    """Seconds before deadline_at (None = no deadline). Raises DeadlineExceeded."""
+    if deadline_at is None:
+        return None
+    left = deadline_at - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded(f"{model} missed its latency deadline")
+    return left
+
+
+def _admitted_create_sync(
+    request: Dict,
+    feature: Optional[str] = None,
+    prior_attempts: int = 0,
+    deadline: Optional[float] = None,
+    fall_back: bool = False,
+):
+    """messages.create() through the shared limiter on the pool key with the
+    most headroom, retrying 429/529 (on another key when one is ready).
+    prior_attempts: earlier requests for the same answer (JSON retries), for tracing.
+    deadline: seconds this model may take, queueing and backoff included.
+    fall_back: a fallback model is waiting — raise on overload instead of backing off."""
+    model = request["model"]
+    estimate = _estimate_request_tokens(request)
+    deadline_at = time.monotonic() + deadline if deadline else None
+    trace = _CallTrace(feature, model, prior_attempts)
+    try:
+        for attempt in itertools.count():
+            with _admission.admit_sync(model, estimate) as ticket:
+                trace.admitted(ticket)
+                left = _time_left(deadline_at, model)
+                key = _key_pool.acquire()
+                try:
+                    client = get_sync_client(key).with_options(max_retries=0, **({"timeout": left} if left else {}))
+                    raw = client.messages.with_raw_response.create(**request)
+                    response = raw.parse()
+                except Exception as e:
+                    _key_pool.release(key, error=e)
+                    _raise_for_fallback(e, deadline_at, fall_back, model)
+                    delay = _retry_delay(e, attempt, model)
+                    if delay is None:
+                        raise
+                else:
+                    _key_pool.observe(key, _raw_headers(raw))
+                    _key_pool.release(key, response)
+                    ticket.actual = _usage_total(response)
+                    trace.finish(response)
+                    return response
+            if deadline_at is not None and time.monotonic() + delay >= deadline_at:
+                raise DeadlineExceeded(f"{model} would miss its latency deadline backing off")
+            trace.backoff(delay)
+            if delay:
+                time.sleep(delay)
+    except Exception as e:
+        trace.finish(error=e)
+        raise
+
+
+async def _admitted_create_async(
+    request: Dict,
+    feature: Optional[str] = None,
+    prior_attempts: int = 0,
+    deadline: Optional[float] = None,
+    fall_back: bool = False,
+):
+    """Async twin of _admitted_create_sync()."""
+    model = request["model"]
+    estimate = _estimate_request_tokens(request)
+    deadline_at = time.monotonic() + deadline if deadline else None
+    trace = _CallTrace(feature, model, prior_attempts)
+    try:
+        for attempt in itertools.count():
+            async with _admission.admit_async(model, estimate) as ticket:
+                trace.admitted(ticket)
+                left = _time_left(deadline_at, model)
+                key = _key_pool.acquire()
+                try:
+                    client = get_async_client(key).with_options(max_retries=0, **({"timeout": left} if left else {}))
+                    raw = await client.messages.with_raw_response.create(**request)
+                    response = raw.parse()
+                except Exception as e:
+                    _key_pool.release(key, error=e)
+                    _raise_for_fallback(e, deadline_at, fall_back, model)
+                    delay = _retry_delay(e, attempt, model)
+                    if delay is None:
+                        raise
+                else:
+                    _key_pool.observe(key, _raw_headers(raw))
+                    _key_pool.release(key, response)
+                    ticket.actual = _usage_total(response)
+                    trace.finish(response)
+                    return response
+            if deadline_at is not None and time.monotonic() + delay >= deadline_at:
+                raise DeadlineExceeded(f"{model} would miss its latency deadline backing off")
+            trace.backoff(delay)
+            if delay:
+                await asyncio.sleep(delay)
+    except Exception as e:
+        trace.finish(error=e)
+        raise
+
+
+async def _admitted_stream_async(
+    request: Dict,
+    feature: Optional[str] = None,
+    deadline: Optional[float] = None,
+    fall_back: bool = False,
+):
+    """
+    Streaming twin of _admitted_create_async(). Async generator yielding
+      {"type": "delta", "text": str}         → text as it is generated
+      {"type": "response", "response": Message} → once, at the end
+    Until the first delta a failed stream is retried / handed to the
+    fallback like a create; after it, errors propagate to the caller.
+    """
+    model = request["model"]
+    estimate = _estimate_request_tokens(request)
+    deadline_at = time.monotonic() + deadline if deadline else None
+    trace = _CallTrace(feature, model)
+    streamed = False
+    try:
+        for attempt in itertools.count():
+            async with _admission.admit_async(model, estimate) as ticket:
+                trace.admitted(ticket)
+                left = _time_left(deadline_at, model)
+                try:
+                    async with _pooled_stream(request, left) as stream:
+                        async for event in stream:
+                            if event.type in ("text", "input_json"):
+                                trace.first_token()
+                            if event.type == "text" and event.text:
+                                streamed = True
+                                yield {"type": "delta", "text": event.text}
+                        response = await stream.get_final_message()
+                except Exception as e:
+                    if streamed:
+                        raise
+                    _raise_for_fallback(e, deadline_at, fall_back, model)
+                    delay = _retry_delay(e, attempt, model)
+                    if delay is None:
+                        raise
+                else:
+                    ticket.actual = _usage_total(response)
+                    trace.finish(response)
+                    yield {"type": "response", "response": response}
+                    return
+            if deadline_at is not None and time.monotonic() + delay >= deadline_at:
+                raise DeadlineExceeded(f"{model} would miss its latency deadline backing off")
+            trace.backoff(delay)
+            if delay:
+                await asyncio.sleep(delay)
+    except Exception as e:
+        trace.finish(error=e)
+        raise
+
+
+# ─────────────────────────────────────────────────────────────
+# Per-feature routing
+# ─────────────────────────────────────────────────────────────
+# Callers name their feature ("tailor_resume", "classify_intent", ...).
+# The admin routing table (claude_config_service) may pin a model and
+# max_tokens per feature; those win over the call site's defaults.
+
+def _route(feature: Optional[str], model: Optional[str], max_tokens: int) -> Tuple[Optional[str], int]:
+    if not feature:
+        return model, max_tokens
+    from app.services.claude_config_service import get_feature_route_sync
+    route = get_feature_route_sync(feature)
+    return route.get("model") or model, route.get("max_tokens") or max_tokens
+
+
+# ─────────────────────────────────────────────────────────────
+# Model fallback
+# ─────────────────────────────────────────────────────────────
+# A route may list fallback models (claude_config_service). The requested
+# model is tried first with the route's deadline_seconds; an overload (529),
+# an admission timeout or a missed deadline moves the call to the next model
+# at once instead of backing off on a model that is having an incident. The
+# last model runs without a deadline so the user still gets an answer.
+# Whichever model answered is recorded per request (credits_log.ai_model).
+
+# Model that answered the last call made from this context; call_ai() only
+# caches answers that came from the requested model.
+_served_model_var: "contextvars.ContextVar[Optional[str]]" = (
+    contextvars.ContextVar("ai_served_model", default=None)
+)
+
+
+def _is_overloaded(e: Exception) -> bool:
+    return getattr(e, "status_code", None) == 529 or "overloaded" in str(e).lower()
+
+
+def _raise_for_fallback(e: Exception, deadline_at: Optional[float], fall_back: bool, model: str) -> None:
+    """Inside a failed attempt: give up on this model when a fallback is due."""
+    if deadline_at is not None and time.monotonic() >= deadline_at:
+        raise DeadlineExceeded(f"{model} missed its latency deadline") from e
+    if fall_back and _is_overloaded(e):
+        raise e
+
+
+def _fallback_chain(feature: Optional[str], model: str) -> List[Tuple[str, Optional[float]]]:
+    """[(model, deadline_seconds)] to try in order; the last has no deadline."""
+    if not feature:
+        return [(model, None)]
+    from app.services.claude_config_service import get_feature_route_sync
+    route = get_feature_route_sync(feature)
+    models = [model] + [m for m in route.get("fallbacks") or [] if m != model]
+    deadline = route.get("deadline_seconds") if len(models) > 1 else None
+    return [(m, deadline if i < len(models) - 1 else None) for i, m in enumerate(models)]
+
+
+def _should_fall_back(e: Exception) -> bool:
+    return isinstance(e, (DeadlineExceeded, AdmissionTimeout)) or _is_overloaded(e)
+
+
+class _FallbackStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}  # feature → "from→to" → n
+
+    def note(self, feature: Optional[str], src: str, dst: str, e: Exception) -> None:
+        logger.warning(f"Claude fallback [{feature}]: {src} → {dst} ({type(e).__name__}: {str(e)[:120]})")
+        with self._lock:
+            per_feature = self._counts.setdefault(feature or "unlabelled", {})
+            per_feature[f"{src}→{dst}"] = per_feature.get(f"{src}→{dst}", 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {f: dict(c) for f, c in self._counts.items()}
+
+
+_fallback_stats = _FallbackStats()
+
+
+def get_fallback_stats() -> Dict[str, Dict[str, int]]:
+    """Per-feature "from→to" fallback counts since startup (admin resource page)."""
+    return _fallback_stats.snapshot()
+
+
+def get_served_model() -> Optional[str]:
+    """Model that answered the last call made from this context (None if it failed)."""
+    return _served_model_var.get()
+
+
+def feature_model(feature: str) -> str:
+    """Model a call for this feature goes to first (its route's model, else the active model)."""
+    return _resolve_model(_route(feature, None, 0)[0])
+
+
+def _note_served(model: str, fell_back: bool) -> None:
+    _served_model_var.set(model)
+    counter = _request_models()
+    counter["models"][model] = counter["models"].get(model, 0) + 1
+    if fell_back:
+        counter["fallbacks"] += 1
+
+
+def _create_with_fallback_sync(request: Dict, feature: Optional[str] = None, prior_attempts: int = 0):
+    """_admitted_create_sync() along the feature's fallback chain."""
+    _served_model_var.set(None)
+    chain = _fallback_chain(feature, request["model"])
+    for i, (model, deadline) in enumerate(chain):
+        last = i == len(chain) - 1
+        try:
+            response = _admitted_create_sync({**request, "model": model}, feature, prior_attempts, deadline, not last)
+        except Exception as e:
+            if last or not _should_fall_back(e):
+                raise
+            _fallback_stats.note(feature, model, chain[i + 1][0], e)
+            continue
+        _note_served(model, i > 0)
+        return response
+
+
+async def _create_with_fallback_async(request: Dict, feature: Optional[str] = None, prior_attempts: int = 0):
+    """Async twin of _create_with_fallback_sync()."""
+    _served_model_var.set(None)
+    chain = _fallback_chain(feature, request["model"])
+    for i, (model, deadline) in enumerate(chain):
+        last = i == len(chain) - 1
+        try:
+            response = await _admitted_create_async({**request, "model": model}, feature, prior_attempts, deadline, not last)
+        except Exception as e:
+            if last or not _should_fall_back(e):
+                raise
+            _fallback_stats.note(feature, model, chain[i + 1][0], e)
+            continue
+        _note_served(model, i > 0)
+        return response
+
+
+async def _stream_with_fallback_async(request: Dict, feature: Optional[str] = None):
+    """_admitted_stream_async() along the feature's fallback chain — a model is
+    only given up on while none of its text has reached the caller."""
+    _served_model_var.set(None)
+    chain = _fallback_chain(feature, request["model"])
+    for i, (model, deadline) in enumerate(chain):
+        last = i == len(chain) - 1
+        streamed = False
+        try:
+            async for event in _admitted_stream_async({**request, "model": model}, feature, deadline, not last):
+                if event["type"] == "delta":
+                    streamed = True
+                else:
+                    _note_served(model, i > 0)
+                yield event
+            return
+        except Exception as e:
+            if streamed or last or not _should_fall_back(e):
+                raise
+            _fallback_stats.note(feature, model, chain[i + 1][0], e)
+
+
+# ─────────────────────────────────────────────────────────────
+# Call tracing
+# ─────────────────────────────────────────────────────────────
+# Every request to the Messages API leaves one trace: feature, model,
+# tokens, error class, retries, and where the wall time went —
+#   queue_ms   waiting for an admission slot
+#   backoff_ms sleeping between throttled attempts
+#   api_ms     the rest: Anthropic's time plus any event-loop stall
+#   ttft_ms    first streamed token (streaming calls only)
+# Traces go to a bounded in-memory store (recent list + a rolling window
+# per feature/model). A watchdog samples event-loop lag alongside, so a
+# slow api_ms can be told apart from our own loop being blocked.
+
+def _dist(values) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "n":   len(ordered),
+        "p50": _percentile(ordered, 0.50),
+        "p95": _percentile(ordered, 0.95),
+        "p99": _percentile(ordered, 0.99),
+        "max": round(ordered[-1], 1) if ordered else 0.0,
+    }
+
+
+class _CallTrace:
+    """One call's timings, filled in as it runs and filed by finish()."""
+    __slots__ = ("feature", "model", "started", "queue_ms", "backoff_ms", "ttft_ms", "retries")
+
+    def __init__(self, feature: Optional[str], model: str, retries: int = 0):
+        self.feature = feature or "unlabelled"
+        self.model = model
+        self.started = time.monotonic()
+        self.queue_ms = 0.0
+        self.backoff_ms = 0.0
+        self.ttft_ms: Optional[float] = None
+        self.retries = retries
+
+    def admitted(self, ticket: "_Ticket") -> None:
+        self.queue_ms += (time.monotonic() - ticket.enqueued) * 1000
+
+    def backoff(self, delay: float) -> None:
+        self.retries += 1
+        self.backoff_ms += delay * 1000
+
+    def first_token(self) -> None:
+        if self.ttft_ms is None:
+            self.ttft_ms = (time.monotonic() - self.started) * 1000
+
+    def finish(self, response=None, error: Optional[BaseException] = None) -> None:
+        latency_ms = (time.monotonic() - self.started) * 1000
+        try:
+            usage = _usage_tokens(response) if response is not None else None
+        except Exception:
+            usage = None
+        _traces.record({
+            "at":            datetime.utcnow().isoformat(),
+            "feature":       self.feature,
+            "model":         self.model,
+            "ok":            error is None,
+            "error_class":   type(error).__name__ if error is not None else None,
+            "retries":       self.retries,
+            "latency_ms":    round(latency_ms, 1),
+            "queue_ms":      round(self.queue_ms, 1),
+            "backoff_ms":    round(self.backoff_ms, 1),
+            "api_ms":        round(max(0.0, latency_ms - self.queue_ms - self.backoff_ms), 1),
+            "ttft_ms":       round(self.ttft_ms, 1) if self.ttft_ms is not None else None,
+            "input_tokens":  (usage["input"] + usage["cache_read"] + usage["cache_creation"]) if usage else 0,
+            "output_tokens": usage["output"] if usage else 0,
+            "cache_read_tokens": usage["cache_read"] if usage else 0,
+        })
+
+
+class _TraceStore:
+    _RECENT = 1000  # newest traces kept for the trace list
+    _WINDOW = 500   # traces kept per (feature, model) for percentiles
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recent: "deque[Dict]" = deque(maxlen=self._RECENT)
+        self._windows: Dict[Tuple[str, str], "deque[Dict]"] = {}
+        self._counts: Dict[Tuple[str, str], Dict] = {}
+
+    def record(self, trace: Dict) -> None:
+        key = (trace["feature"], trace["model"])
+        with self._lock:
+            self._recent.append(trace)
+            self._windows.setdefault(key, deque(maxlen=self._WINDOW)).append(trace)
+            counts = self._counts.setdefault(key, {"calls": 0, "errors": 0, "retries": 0, "error_classes": {}})
+            counts["calls"] += 1
+            counts["retries"] += trace["retries"]
+            if not trace["ok"]:
+                counts["errors"] += 1
+                classes = counts["error_classes"]
+                classes[trace["error_class"]] = classes.get(trace["error_class"], 0) + 1
+
+    def recent(self, limit: int, feature: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            traces = list(self._recent)
+        if feature:
+            traces = [t for t in traces if t["feature"] == feature]
+        return traces[::-1][:limit]
+
+    def summary(self, by_model: bool = True) -> List[Dict]:
+        """Lifetime counts + windowed percentiles per feature (and model)."""
+        with self._lock:
+            windows = {k: list(v) for k, v in self._windows.items()}
+            counts = {k: {**v, "error_classes": dict(v["error_classes"])} for k, v in self._counts.items()}
+
+        groups: Dict[Tuple, Dict] = {}
+        for (feature, model), samples in windows.items():
+            group = groups.setdefault((feature, model) if by_model else (feature,), {
+                "samples": [], "calls": 0, "errors": 0, "retries": 0, "error_classes": {}, "models": {},
+            })
+            c = counts[(feature, model)]
+            group["samples"].extend(samples)
+            group["calls"] += c["calls"]
+            group["errors"] += c["errors"]
+            group["retries"] += c["retries"]
+            group["models"][model] = group["models"].get(model, 0) + c["calls"]
+            for cls, n in c["error_classes"].items():
+                group["error_classes"][cls] = group["error_classes"].get(cls, 0) + n
+
+        rows = []
+        for key, g in groups.items():
+            samples = g.pop("samples")
+            ok = [t for t in samples if t["ok"]]
+            models = g.pop("models")
+            rows.append({
+                "feature":       key[0],
+                **({"model": key[1]} if by_model else {"models": models}),
+                **g,
+                "latency_ms":    _dist(t["latency_ms"] for t in samples),
+                "queue_ms":      _dist(t["queue_ms"] for t in samples),
+                "backoff_ms":    _dist(t["backoff_ms"] for t in samples),
+                "api_ms":        _dist(t["api_ms"] for t in samples),
+                "ttft_ms":       _dist(t["ttft_ms"] for t in samples if t["ttft_ms"] is not None),
+                "input_tokens":  _dist(t["input_tokens"] for t in ok),
+                "output_tokens": _dist(t["output_tokens"] for t in ok),
+            })
+        rows.sort(key=lambda r: r["calls"], reverse=True)
+        return rows
+
+
+_traces = _TraceStore()
+
+_LOOP_LAG_INTERVAL = 0.25                      # seconds between watchdog ticks
+_loop_lag_ms: "deque[float]" = deque(maxlen=2400)  # ~10 minutes of samples
+_loop_lag_task: Optional[asyncio.Task] = None
+
+
+async def _watch_loop_lag() -> None:
+    """How late the loop wakes a 250 ms sleep = how long something blocked it."""
+    while True:
+        before = time.monotonic()
+        await asyncio.sleep(_LOOP_LAG_INTERVAL)
+        _loop_lag_ms.append(max(0.0, (time.monotonic() - before - _LOOP_LAG_INTERVAL) * 1000))
+
+
+def get_feature_telemetry() -> Dict[str, Dict]:
+    """Per-feature latency / token percentiles over the recent window."""
+    return {row["feature"]: row for row in _traces.summary(by_model=False)}
+
+
+def get_call_trace_stats() -> Dict:
+    """p50/p95/p99 per feature and model, plus event-loop lag."""
+    return {
+        "by_feature_model":  _traces.summary(by_model=True),
+        "event_loop_lag_ms": _dist(list(_loop_lag_ms)),
+    }
+
+
+def get_recent_call_traces(limit: int = 100, feature: Optional[str] = None) -> List[Dict]:
+    """Newest-first individual call traces."""
+    return _traces.recent(limit, feature)
+
+
+# ─────────────────────────────────────────────────────────────
+# Response cache (opt-in, content-addressed)
+# ─────────────────────────────────────────────────────────────
+# Deterministic prompts (resume extraction, JD parsing, keyword buckets,
+# job ranking) are often re-sent verbatim. Callers pass cache=True to
+# call_ai / call_ai_async; the key is a hash of everything that shapes the
+# output. An in-process LRU sits in front of the ai_response_cache
+# collection (TTL index created in mongo.connect). Only successful JSON
+# results are stored. A hit spends zero tokens and is counted in the
+# request accumulator so credits_log stays truthful.
+
+# Part of every key — bump it when what shapes an answer changes in a way the
+# key fields don't show (v2: schema and cache_prefix joined the key)
+_RESPONSE_CACHE_VERSION = 2
+
+
+class _ResponseCache:
+    def __init__(self, max_entries: int):
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[str, str]" = OrderedDict()
+        self._max = max_entries
+        self.stats: Dict[str, int] = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    @staticmethod
+    def key(
+        model: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        schema: Optional[Dict] = None,
+        cache_prefix: Optional[str] = None,
+    ) -> str:
+        # schema: a forced-tool answer and a free-text JSON answer to the same prompt differ
+        raw = json.dumps(
+            [_RESPONSE_CACHE_VERSION, model, prompt, float(temperature), int(max_tokens), schema, cache_prefix],
+            ensure_ascii=False, sort_keys=True,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def bump(self, stat: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get_local(self, key: str) -> Optional[str]:
+        with self._lock:
+            val = self._lru.get(key)
+            if val is not None:
+                self._lru.move_to_end(key)
+            return val
+
+    def put_local(self, key: str, payload: str) -> None:
+        with self._lock:
+            self._lru[key] = payload
+            self._lru.move_to_end(key)
+            while len(self._lru) > self._max:
+                self._lru.popitem(last=False)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            lookups = self.stats["memory_hits"] + self.stats["db_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["db_hits"]
+            return {
+                **self.stats,
+                "memory_entries": len(self._lru),
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_response_cache = _ResponseCache(settings.ai_cache_max_entries)
+
+# The event loop Motor is bound to — lets sync call_ai() running in a thread
+# pool reach the Mongo tier. Captured by init_active_provider().
+_main_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def _cache_db_get(key: str) -> Optional[str]:
+    doc = await mongo.ai_response_cache.find_one({"_id": key}, {"response": 1})
+    return doc.get("response") if doc else None
+
+
+async def _cache_db_put(key: str, model: str, payload: str) -> None:
+    await mongo.ai_response_cache.update_one(
+        {"_id": key},
+        {"$set": {"response": payload, "model": model, "created_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+def _run_on_main_loop(coro):
+    """Run a Mongo coroutine from a worker thread. Returns None (and closes the
+    coroutine) when called on the loop thread itself or before startup."""
+    loop = _main_loop
+    if loop is None or not loop.is_running():
+        coro.close()
+        return None
+    try:
+        if asyncio.get_running_loop() is loop:
+            coro.close()
+            return None
+    except RuntimeError:
+        pass  # no loop in this thread — the normal thread-pool case
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout=5)
+
+
+def _cache_hit(payload: str, stat: str) -> Dict:
+    _response_cache.bump(stat)
+    _accumulate_cache_hit()
+    return json.loads(payload)  # fresh object — callers mutate results
+
+
+def _cache_lookup_sync(key: str) -> Optional[Dict]:
+    payload = _response_cache.get_local(key)
+    if payload is not None:
+        return _cache_hit(payload, "memory_hits")
+    try:
+        payload = _run_on_main_loop(_cache_db_get(key))
+    except Exception as e:
+        _response_cache.bump("errors")
+        logger.warning(f"AI cache read failed: {e}")
+        payload = None
+    if payload is not None:
+        _response_cache.put_local(key, payload)
+        return _cache_hit(payload, "db_hits")
+    _response_cache.bump("misses")
+    return None
+
+
+async def _cache_lookup_async(key: str) -> Optional[Dict]:
+    payload = _response_cache.get_local(key)
+    if payload is not None:
+        return _cache_hit(payload, "memory_hits")
+    try:
+        payload = await _cache_db_get(key)
+    except Exception as e:
+        _response_cache.bump("errors")
+        logger.warning(f"AI cache read failed: {e}")
+        payload = None
+    if payload is not None:
+        _response_cache.put_local(key, payload)
+        return _cache_hit(payload, "db_hits")
+    _response_cache.bump("misses")
+    return None
+
+
+def _cache_store_sync(key: str, model: str, result: Dict) -> None:
+    if not isinstance(result, (dict, list)) or (isinstance(result, dict) and "error" in result):
+        return
+    payload = json.dumps(result, ensure_ascii=False)
+    _response_cache.put_local(key, payload)
+    _response_cache.bump("stores")
+    try:
+        _run_on_main_loop(_cache_db_put(key, model, payload))
+    except Exception as e:
+        _response_cache.bump("errors")
+        logger.warning(f"AI cache write failed: {e}")
+
+
+async def _cache_store_async(key: str, model: str, result: Dict) -> None:
+    if not isinstance(result, (dict, list)) or (isinstance(result, dict) and "error" in result):
+        return
+    payload = json.dumps(result, ensure_ascii=False)
+    _response_cache.put_local(key, payload)
+    _response_cache.bump("stores")
+    try:
+        await _cache_db_put(key, model, payload)
+    except Exception as e:
+        _response_cache.bump("errors")
+        logger.warning(f"AI cache write failed: {e}")
+
+
+def get_ai_cache_stats() -> Dict:
+    """Hit / miss counters for the response cache (admin resource page)."""
+    return _response_cache.snapshot()
+
+
+def _resolve_model(model: Optional[str]) -> str:
+    from app.services.claude_config_service import get_active_config_sync
+    return model or get_active_config_sync()["model"]
+
+
+# ─────────────────────────────────────────────────────────────
+# Prompt caching (Anthropic cache breakpoints)
+# ─────────────────────────────────────────────────────────────
+# A breakpoint caches everything up to and including the marked block
+# (order: tools → system → messages) for ~5 minutes. Cache writes bill at
+# 1.25x input, reads at 0.1x, so only stable, long prefixes are marked.
+# Prefixes under the model minimum (~1024 tokens) are simply not cached.
+
+_EPHEMERAL = {"type": "ephemeral"}
+
+
+def _cached_system(system_prompt: str) -> List[Dict]:
+    return [{"type": "text", "text": system_prompt, "cache_control": _EPHEMERAL}]
+
+
+def _cached_tools(claude_tools: list) -> list:
+    if not claude_tools:
+        return claude_tools
+    return claude_tools[:-1] + [{**claude_tools[-1], "cache_control": _EPHEMERAL}]
+
+
+def _cached_user_turn(message: str) -> Dict:
+    return {"role": "user", "content": [{"type": "text", "text": message, "cache_control": _EPHEMERAL}]}
+
+
+def _prompt_content(prompt: str, cache_prefix: Optional[str]):
+    """Plain string, or two text blocks with a breakpoint after cache_prefix
+    when it is a long-enough leading part of prompt."""
+    if (
+        not cache_prefix
+        or len(cache_prefix) < settings.claude_prompt_cache_min_chars
+        or not prompt.startswith(cache_prefix)
+        or len(prompt) == len(cache_prefix)
+    ):
+        return prompt
+    return [
+        {"type": "text", "text": cache_prefix, "cache_control": _EPHEMERAL},
+        {"type": "text", "text": prompt[len(cache_prefix):]},
+    ]
 
 
 # ─────────────────────────────────────────────────────────────
@@ -82,8 +1544,13 @@ async def set_active_provider(provider: str, admin_email: str) -> None:
 
 
 async def init_active_provider() -> None:
-    """Claude-only startup hook."""
+    """Claude-only startup hook. Also binds the response cache to this loop
+    and starts the event-loop lag watchdog used by call tracing."""
+    global _main_loop, _loop_lag_task
     _active_provider["value"] = "claude"
+    _main_loop = asyncio.get_running_loop()
+    if _loop_lag_task is None or _loop_lag_task.done():
+        _loop_lag_task = asyncio.create_task(_watch_loop_lag())
     logger.info("✅ AI provider locked to Claude")
 
 
@@ -103,71 +1570,346 @@ def _clean_json(text: str) -> str:
     return text
 
 
+# ── Structured output + tolerant JSON repair ─────────────────
+# With a schema, the request carries one tool whose input_schema is that
+# schema and tool_choice forces it, so the answer arrives as tool input the
+# API has already parsed. Free-text answers (no schema) that fail json.loads
+# go through _repair_json() before a second request is ever made.
+
+_OUTPUT_TOOL = "emit_result"
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _output_tool(schema: Dict) -> Dict:
+    return {
+        "name":         _OUTPUT_TOOL,
+        "description":  "Return the complete result. Call exactly once.",
+        "input_schema": schema,
+    }
+
+
+def _close_truncated(text: str) -> str:
+    """Close the strings / brackets an output cut off at max_tokens left open."""
+    stack: List[str] = []
+    in_string = escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text = (text[:-1] if escaped else text) + '"'
+    text = text.rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    elif text.endswith(":"):
+        text += " null"
+    return text + "".join(reversed(stack))
+
+
+def _repair_json(text: str) -> Optional[Any]:
+    """
+    Local fix-up of almost-JSON: prose around the value, trailing commas,
+    raw control characters inside strings, and truncation. None if the text
+    still doesn't parse.
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        return None
+    text = text[min(starts):]
+    decoder = json.JSONDecoder(strict=False)
+    for candidate in (text, _close_truncated(text)):
+        try:
+            return decoder.raw_decode(_TRAILING_COMMA.sub(r"\1", candidate))[0]
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+class _StructuredStats:
+    """How each JSON answer was obtained, overall and per feature."""
+    OUTCOMES = ("tool", "clean", "repaired", "retried", "failed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_feature: Dict[str, Dict[str, int]] = {}
+
+    def note(self, feature: Optional[str], outcome: str) -> None:
+        with self._lock:
+            counts = self._by_feature.setdefault(feature or "unlabelled", dict.fromkeys(self.OUTCOMES, 0))
+            counts[outcome] += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            by_feature = {f: dict(c) for f, c in self._by_feature.items()}
+        total = {o: sum(c[o] for c in by_feature.values()) for o in self.OUTCOMES}
+        answered = total["tool"] + total["clean"] + total["repaired"] + total["failed"]
+        return {
+            **total,
+            "repair_rate": round(total["repaired"] / answered, 4) if answered else 0.0,
+            "retry_rate":  round(total["retried"] / answered, 4) if answered else 0.0,
+            "by_feature":  by_feature,
+        }
+
+
+_structured_stats = _StructuredStats()
+
+
+def get_structured_output_stats() -> Dict:
+    """Counts of tool / clean / repaired / retried / failed JSON answers."""
+    return _structured_stats.snapshot()
+
+
+# call_claude() and call_claude_async() share these so the sync and async
+# paths keep identical JSON / retry / token-accounting semantics.
+_JSON_ATTEMPTS = 2
+
+
+def _json_call_preflight() -> Tuple[Optional[Dict], Optional[Dict]]:
+    """Return (cfg, None) when a call can be made, else (None, error_dict)."""
+    try:
+        import anthropic as _anthropic  # noqa: F401
+    except ImportError:
+        return None, {"error": "claude_not_installed", "message": "anthropic package not installed. Run: pip install anthropic"}
+
+    from app.services.claude_config_service import get_active_config_sync
+    cfg = get_active_config_sync()
+
+    if not _key_pool.has_keys():
+        return None, {"error": "claude_no_key", "message": "Claude API key not set. Add it in Admin → Resources → Claude."}
+    return cfg, None
+
+
+def _json_request_kwargs(
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    active_model: str,
+    cache_prefix: Optional[str] = None,
+    schema: Optional[Dict] = None,
+) -> Dict:
+    kwargs = {
+        "model":       active_model,
+        "max_tokens":  min(max_tokens, 8192),
+        "temperature": min(temperature, 1.0),  # Claude max temp is 1.0
+        "messages":    [{"role": "user", "content": _prompt_content(prompt, cache_prefix)}],
+    }
+    if schema:
+        kwargs["tools"] = [_output_tool(schema)]
+        kwargs["tool_choice"] = {"type": "tool", "name": _OUTPUT_TOOL}
+    return kwargs
+
+
+def _json_attempt_result(response, attempt: int, feature: Optional[str] = None) -> Optional[Dict]:
+    """Record usage and parse one response. None means "retry"."""
+    try:
+        _accumulate_usage(response)
+    except Exception:
+        pass
+
+    for block in response.content:
+        if getattr(block, "type", None) == "tool_use" and block.name == _OUTPUT_TOOL and block.input:
+            _structured_stats.note(feature, "tool")
+            return block.input
+
+    raw_text = "".join(b.text for b in response.content if getattr(b, "type", None) == "text").strip()
+    cleaned = _clean_json(raw_text)
+
+    try:
+        result = json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        result = _repair_json(cleaned)
+        if result is not None:
+            logger.info(f"Claude JSON repaired locally ({feature or 'unlabelled'}): {e}")
+            _structured_stats.note(feature, "repaired")
+            return result
+        logger.warning(f"Claude JSON parse failed (attempt {attempt + 1})")
+        if attempt == _JSON_ATTEMPTS - 1:
+            _structured_stats.note(feature, "failed")
+            return {
+                "error": "invalid_json",
+                "message": "Claude output was not valid JSON",
+                "parse_error": str(e),
+                "raw_preview": cleaned[:2000],
+            }
+        _structured_stats.note(feature, "retried")
+        return None
+    _structured_stats.note(feature, "clean")
+    return result
+
+
+def _json_attempt_error(e: Exception, attempt: int, active_model: str) -> Optional[Dict]:
+    """Map an API exception to an error dict. None means "retry".
+    Throttling reaching here has already exhausted the limiter's backoff."""
+    err_msg = str(e)
+    if isinstance(e, AdmissionTimeout):
+        logger.error(err_msg)
+        return {"error": "claude_api_error", "message": err_msg}
+    if "rate_limit" in err_msg.lower() or "429" in err_msg or "overloaded" in err_msg.lower():
+        logger.error(f"Claude rate limit hit on model {active_model} after backoff.")
+        return {"error": "claude_api_error", "message": err_msg}
+    if attempt == _JSON_ATTEMPTS - 1:
+        logger.exception("Claude API call failed")
+        return {"error": "claude_api_error", "message": err_msg}
+    return None
+
+
 def call_claude(
     prompt: str,
     temperature: float = 1.0,
     max_tokens: int = 8192,
     model: Optional[str] = None,
+    cache_prefix: Optional[str] = None,
+    feature: Optional[str] = None,
+    schema: Optional[Dict] = None,
 ) -> Dict:
     """
     Single-turn Claude call — returns parsed JSON Dict.
+    cache_prefix: leading part of prompt that repeats across calls (e.g.
+    instructions + resume); marked with a prompt-cache breakpoint.
+    feature: routing-table / telemetry key (see _route).
+    schema: JSON schema of the answer; enforced through forced tool use.
     """
-    try:
-        import anthropic as _anthropic
-    except ImportError:
-        return {"error": "claude_not_installed", "message": "anthropic package not installed. Run: pip install anthropic"}
+    cfg, err = _json_call_preflight()
+    if err:
+        return err
 
-    from app.services.claude_config_service import get_active_config_sync
-    cfg = get_active_config_sync()
+    model, max_tokens = _route(feature, model, max_tokens)
+    active_model = model or cfg["model"]
+    kwargs = _json_request_kwargs(prompt, temperature, max_tokens, active_model, cache_prefix, schema)
 
-    if not cfg.get("api_key"):
-        return {"error": "claude_no_key", "message": "Claude API key not set. Add it in Admin → Resources → Claude."}
+    for attempt in range(_JSON_ATTEMPTS):
+        try:
+            response = _create_with_fallback_sync(kwargs, feature, attempt)
+            result = _json_attempt_result(response, attempt, feature)
+        except Exception as e:
+            result = _json_attempt_error(e, attempt, active_model)
+        if result is not None:
+            return result
 
+    return {"error": "unknown_error", "message": "Unexpected Claude failure"}
+
+
+async def call_claude_async(
+    prompt: str,
+    temperature: float = 1.0,
+    max_tokens: int = 8192,
+    model: Optional[str] = None,
+    cache_prefix: Optional[str] = None,
+    feature: Optional[str] = None,
+    schema: Optional[Dict] = None,
+) -> Dict:
+    """
+    Async single-turn Claude call — returns parsed JSON Dict.
+    Same retry / error / token semantics as call_claude(), without
+    blocking the event loop.
+    """
+    cfg, err = _json_call_preflight()
+    if err:
+        return err
+
+    model, max_tokens = _route(feature, model, max_tokens)
     active_model = model or cfg["model"]
+    kwargs = _json_request_kwargs(prompt, temperature, max_tokens, active_model, cache_prefix, schema)
 
-    for attempt in range(2):
+    for attempt in range(_JSON_ATTEMPTS):
         try:
-            client = _anthropic.Anthropic(api_key=cfg["api_key"])
-            response = client.messages.create(
-                model=active_model,
-                max_tokens=min(max_tokens, 8192),
-                temperature=min(temperature, 1.0),  # Claude max temp is 1.0
-                messages=[{"role": "user", "content": prompt}],
-            )
+            response = await _create_with_fallback_async(kwargs, feature, attempt)
+            result = _json_attempt_result(response, attempt, feature)
+        except Exception as e:
+            result = _json_attempt_error(e, attempt, active_model)
+        if result is not None:
+            return result
 
-            try:
-                _accumulate_tokens(
-                    getattr(response.usage, "input_tokens", 0) or 0,
-                    getattr(response.usage, "output_tokens", 0) or 0,
-                )
-            except Exception:
-                pass
+    return {"error": "unknown_error", "message": "Unexpected Claude failure"}
 
-            raw_text = response.content[0].text.strip()
-            cleaned = _clean_json(raw_text)
 
-            try:
-                return json.loads(cleaned)
-            except json.JSONDecodeError as e:
-                logger.warning(f"Claude JSON parse failed (attempt {attempt + 1})")
-                if attempt == 1:
-                    return {
-                        "error": "invalid_json",
-                        "message": "Claude output was not valid JSON",
-                        "parse_error": str(e),
-                        "raw_preview": cleaned[:2000],
-                    }
+# ─────────────────────────────────────────────────────────────
+# Message Batches (offline JSON prompts)
+# ─────────────────────────────────────────────────────────────
+# For work that can wait (the 6 AM job-feed refresh): submit every prompt
+# as one batch at the discounted batch rate, poll until it has ended and
+# parse each answer exactly like call_claude() does. Set claude_base_url to
+# a local stub (app/scripts/claude_stub_server.py) to run this offline.
 
+async def run_json_batch(
+    prompts: Dict[str, str],
+    temperature: float = 1.0,
+    max_tokens: int = 8192,
+    model: Optional[str] = None,
+    feature: Optional[str] = None,
+    schema: Optional[Dict] = None,
+) -> Dict[str, Dict]:
+    """
+    Run {custom_id: prompt} through the Message Batches API.
+    custom_id must match [a-zA-Z0-9_-]{1,64}.
+    Returns {custom_id: parsed JSON Dict or {"error": ...}}. Prompts the
+    batch did not answer (submit failed, expired, canceled, still running at
+    claude_batch_max_wait_seconds) are absent, so callers can fall back to
+    call_ai_async() for them.
+    """
+    if not prompts:
+        return {}
+    cfg, err = _json_call_preflight()
+    if err:
+        logger.warning(f"Claude batch skipped: {err['message']}")
+        return {}
+
+    model, max_tokens = _route(feature, model, max_tokens)
+    active_model = model or cfg["model"]
+    # The batch is created, polled and read back with one key
+    client = get_async_client(_key_pool.acquire(in_flight=False))
+    requests = [
+        {"custom_id": custom_id, "params": _json_request_kwargs(prompt, temperature, max_tokens, active_model, schema=schema)}
+        for custom_id, prompt in prompts.items()
+    ]
+
+    try:
+        batch = await client.messages.batches.create(requests=requests)
+    except Exception as e:
+        logger.warning(f"Claude batch submit failed ({len(requests)} prompts): {e}")
+        return {}
+    logger.info(f"Claude batch {batch.id} submitted: {len(requests)} prompts on {active_model}")
+
+    deadline = time.monotonic() + settings.claude_batch_max_wait_seconds
+    while batch.processing_status != "ended":
+        if time.monotonic() >= deadline:
+            logger.warning(f"Claude batch {batch.id} still {batch.processing_status} at deadline — cancelling")
+            try:
+                await client.messages.batches.cancel(batch.id)
+            except Exception as e:
+                logger.warning(f"Claude batch {batch.id} cancel failed: {e}")
+            return {}
+        await asyncio.sleep(settings.claude_batch_poll_seconds)
+        try:
+            batch = await client.messages.batches.retrieve(batch.id)
         except Exception as e:
-            err_msg = str(e)
-            if "rate_limit" in err_msg.lower() or "429" in err_msg or "overloaded" in err_msg.lower():
-                logger.error(f"Claude rate limit hit on model {active_model}.")
-                return {"error": "claude_api_error", "message": err_msg}
-            if attempt == 1:
-                logger.exception("Claude API call failed")
-                return {"error": "claude_api_error", "message": err_msg}
+            logger.warning(f"Claude batch {batch.id} poll failed (will retry): {e}")
 
-    return {"error": "unknown_error", "message": "Unexpected Claude failure"}
+    results: Dict[str, Dict] = {}
+    try:
+        async for entry in await client.messages.batches.results(batch.id):
+            outcome = entry.result
+            if outcome.type == "succeeded":
+                # Last-attempt semantics: bad JSON becomes an invalid_json error
+                results[entry.custom_id] = _json_attempt_result(outcome.message, _JSON_ATTEMPTS - 1, feature)
+            elif outcome.type == "errored":
+                results[entry.custom_id] = {"error": "claude_api_error", "message": str(outcome.error)}
+            # canceled / expired → left out for the caller's fallback
+    except Exception as e:
+        logger.warning(f"Claude batch {batch.id} results download failed: {e}")
+    logger.info(f"Claude batch {batch.id} ended: {len(results)}/{len(requests)} answered")
+    return results
 
 
 # ─────────────────────────────────────────────────────────────
@@ -179,12 +1921,70 @@ def call_ai(
     temperature: float = 1.0,
     max_tokens: int = 8192,
     model: Optional[str] = None,
+    cache: bool = False,
+    cache_prefix: Optional[str] = None,
+    feature: Optional[str] = None,
+    schema: Optional[Dict] = None,
 ) -> Dict:
     """
     Unified sync JSON call. Routes to Claude.
+    cache=True serves identical (model, prompt, temperature, max_tokens,
+    schema, cache_prefix) requests from the response cache. cache_prefix / feature / schema are
+    passed to call_claude(); feature also selects the model via the routing table.
+    Returns a parsed JSON Dict or {"error": ..., "message": ...}.
+    """
+    if not cache:
+        return call_claude(prompt, temperature=temperature, max_tokens=max_tokens, model=model,
+                           cache_prefix=cache_prefix, feature=feature, schema=schema)
+
+    model, max_tokens = _route(feature, model, max_tokens)
+    active_model = _resolve_model(model)
+    key = _ResponseCache.key(active_model, prompt, temperature, max_tokens, schema, cache_prefix)
+    hit = _cache_lookup_sync(key)
+    if hit is not None:
+        return hit
+    result = call_claude(prompt, temperature=temperature, max_tokens=max_tokens, model=active_model,
+                         cache_prefix=cache_prefix, feature=feature, schema=schema)
+    if _served_model_var.get() == active_model:  # never cache a fallback model's answer
+        _cache_store_sync(key, active_model, result)
+    return result
+
+
+# ─────────────────────────────────────────────────────────────
+# Unified async JSON call
+# ─────────────────────────────────────────────────────────────
+
+async def call_ai_async(
+    prompt: str,
+    temperature: float = 1.0,
+    max_tokens: int = 8192,
+    model: Optional[str] = None,
+    cache: bool = False,
+    cache_prefix: Optional[str] = None,
+    feature: Optional[str] = None,
+    schema: Optional[Dict] = None,
+) -> Dict:
+    """
+    Unified async JSON call. Use this from `async def` handlers — call_ai()
+    blocks the event loop for the whole generation and is kept for scripts
+    and thread pools only. cache / cache_prefix / feature / schema behave as in call_ai().
     Returns a parsed JSON Dict or {"error": ..., "message": ...}.
     """
-    return call_claude(prompt, temperature=temperature, max_tokens=max_tokens, model=model)
+    if not cache:
+        return await call_claude_async(prompt, temperature=temperature, max_tokens=max_tokens, model=model,
+                                       cache_prefix=cache_prefix, feature=feature, schema=schema)
+
+    model, max_tokens = _route(feature, model, max_tokens)
+    active_model = _resolve_model(model)
+    key = _ResponseCache.key(active_model, prompt, temperature, max_tokens, schema, cache_prefix)
+    hit = await _cache_lookup_async(key)
+    if hit is not None:
+        return hit
+    result = await call_claude_async(prompt, temperature=temperature, max_tokens=max_tokens, model=active_model,
+                                     cache_prefix=cache_prefix, feature=feature, schema=schema)
+    if _served_model_var.get() == active_model:  # never cache a fallback model's answer
+        await _cache_store_async(key, active_model, result)
+    return result
 
 
 # ─────────────────────────────────────────────────────────────
@@ -196,6 +1996,7 @@ async def call_ai_text_async(
     temperature: float = 0.1,
     max_tokens: int = 200,
     model: Optional[str] = None,
+    feature: Optional[str] = None,
 ) -> str:
     """
     Async text-only Claude call — returns raw string, not JSON.
@@ -208,23 +2009,20 @@ async def call_ai_text_async(
 
     from app.services.claude_config_service import get_active_config_sync
     cfg = get_active_config_sync()
-    if not cfg.get("api_key"):
+    if not _key_pool.has_keys():
         return ""
 
+    model, max_tokens = _route(feature, model, max_tokens)
     active_model = model or cfg["model"]
     try:
-        client = _anthropic.AsyncAnthropic(api_key=cfg["api_key"])
-        response = await client.messages.create(
-            model=active_model,
-            max_tokens=max_tokens,
-            temperature=min(temperature, 1.0),
-            messages=[{"role": "user", "content": prompt}],
-        )
+        response = await _create_with_fallback_async({
+            "model":       active_model,
+            "max_tokens":  max_tokens,
+            "temperature": min(temperature, 1.0),
+            "messages":    [{"role": "user", "content": prompt}],
+        }, feature)
         try:
-            _accumulate_tokens(
-                getattr(response.usage, "input_tokens", 0) or 0,
-                getattr(response.usage, "output_tokens", 0) or 0,
-            )
+            _accumulate_usage(response)
         except Exception:
             pass
         return response.content[0].text.strip()
@@ -244,6 +2042,7 @@ async def call_ai_chat_async(
     temperature: float = 0.7,
     max_tokens: int = 1024,
     model: Optional[str] = None,
+    feature: Optional[str] = None,
 ) -> str:
     """
     Async multi-turn Claude chat call.
@@ -258,9 +2057,10 @@ async def call_ai_chat_async(
 
     from app.services.claude_config_service import get_active_config_sync
     cfg = get_active_config_sync()
-    if not cfg.get("api_key"):
+    if not _key_pool.has_keys():
         return "Claude API key not set. Please add it in Admin → Resources → Claude."
 
+    model, max_tokens = _route(feature, model, max_tokens)
     active_model = model or cfg["model"]
 
     # Normalise history → Claude messages format
@@ -278,19 +2078,15 @@ async def call_ai_chat_async(
     messages.append({"role": "user", "content": user_message})
 
     try:
-        client = _anthropic.AsyncAnthropic(api_key=cfg["api_key"])
-        response = await client.messages.create(
-            model=active_model,
-            max_tokens=min(max_tokens, 8192),
-            temperature=min(temperature, 1.0),
-            system=system_instruction,
-            messages=messages,
-        )
+        response = await _create_with_fallback_async({
+            "model":       active_model,
+            "max_tokens":  min(max_tokens, 8192),
+            "temperature": min(temperature, 1.0),
+            "system":      system_instruction,
+            "messages":    messages,
+        }, feature)
         try:
-            _accumulate_tokens(
-                getattr(response.usage, "input_tokens", 0) or 0,
-                getattr(response.usage, "output_tokens", 0) or 0,
-            )
+            _accumulate_usage(response)
         except Exception:
             pass
         return response.content[0].text.strip()
@@ -325,23 +2121,33 @@ def _convert_tools_for_claude(tools: list) -> list:
 # ─────────────────────────────────────────────────────────────
 # Claude tool-calling implementation
 # ─────────────────────────────────────────────────────────────
+# The blocking (create) and streaming (stream) variants share request
+# building and response shaping so both return identical result dicts.
 
-async def _call_claude_with_tools_async(
-    system_prompt: str,
-    history: list,
-    message: str,
-    tools: list,
-) -> dict:
+_TOOLS_NOT_INSTALLED = {"type": "text", "text": "Claude not installed.", "input_tokens": 0, "output_tokens": 0, "provider_state": {}}
+_TOOLS_NO_KEY        = {"type": "text", "text": "Claude API key not configured.", "input_tokens": 0, "output_tokens": 0, "provider_state": {}}
+_TOOLS_FAILED        = {"type": "text", "text": "I'm having trouble right now. Please try again.", "input_tokens": 0, "output_tokens": 0, "provider_state": {"provider": "claude"}}
+
+
+def _tools_preflight() -> Tuple[Optional[Dict], Optional[Dict]]:
+    """Return (cfg, None) when a tool call can be made, else (None, fallback_result)."""
     try:
-        import anthropic as _anthropic
+        import anthropic as _anthropic  # noqa: F401
     except ImportError:
-        return {"type": "text", "text": "Claude not installed.", "input_tokens": 0, "output_tokens": 0, "provider_state": {}}
+        return None, dict(_TOOLS_NOT_INSTALLED)
 
     from app.services.claude_config_service import get_active_config_sync
     cfg = get_active_config_sync()
-    if not cfg.get("api_key"):
-        return {"type": "text", "text": "Claude API key not configured.", "input_tokens": 0, "output_tokens": 0, "provider_state": {}}
+    if not _key_pool.has_keys():
+        return None, dict(_TOOLS_NO_KEY)
+    return cfg, None
+
+
+# Nova's tool-calling turns share one routing-table / telemetry entry.
+_CHAT_FEATURE = "nova_chat"
+
 
+def _tools_request(cfg: Dict, system_prompt: str, history: list, message: str, tools: list) -> Dict:
     claude_tools = _convert_tools_for_claude(tools)
 
     messages = []
@@ -350,58 +2156,111 @@ async def _call_claude_with_tools_async(
         messages.append({"role": role, "content": m["content"]})
     while messages and messages[0]["role"] != "user":
         messages.pop(0)
-    messages.append({"role": "user", "content": message})
 
+    # Breakpoints: tools + system prompt are stable for the whole session;
+    # the current user turn lets send_tool_result_async() reuse this exact
+    # prefix for the follow-up round trip.
+    claude_tools = _cached_tools(claude_tools)
+    messages.append(_cached_user_turn(message))
+
+    model, max_tokens = _route(_CHAT_FEATURE, cfg["model"], 2048)
+    return {
+        "model":      model,
+        "max_tokens": max_tokens,
+        "system":     _cached_system(system_prompt),
+        "messages":   messages,
+        "tools":      claude_tools,
+    }
+
+
+def _tools_result(response, request: Dict) -> dict:
+    usage = _usage_tokens(response)
+    input_tokens  = usage["input"]
+    output_tokens = usage["output"]
+    cache_tokens  = {
+        "cache_read_tokens":     usage["cache_read"],
+        "cache_creation_tokens": usage["cache_creation"],
+    }
     try:
-        client = _anthropic.AsyncAnthropic(api_key=cfg["api_key"])
-        response = await client.messages.create(
-            model=cfg["model"],
-            max_tokens=2048,
-            system=system_prompt,
-            messages=messages,
-            tools=claude_tools,
-        )
-
-        input_tokens  = getattr(response.usage, "input_tokens",  0) or 0
-        output_tokens = getattr(response.usage, "output_tokens", 0) or 0
-        try:
-            _accumulate_tokens(input_tokens, output_tokens)
-        except Exception:
-            pass
+        _accumulate_tokens(input_tokens, output_tokens, usage["cache_read"], usage["cache_creation"])
+    except Exception:
+        pass
+
+    for block in response.content:
+        if getattr(block, "type", None) == "tool_use":
+            return {
+                "type":       "tool_call",
+                "tool_name":  block.name,
+                "tool_args":  block.input,
+                "raw_response": response,
+                "input_tokens":  input_tokens,
+                "output_tokens": output_tokens,
+                **cache_tokens,
+                "provider_state": {
+                    "provider":    "claude",
+                    "messages":    request["messages"],
+                    "claude_tools": request["tools"],
+                    "tool_use_id": block.id,
+                },
+            }
+
+    text = next(
+        (b.text for b in response.content if hasattr(b, "text")),
+        "I couldn't generate a response.",
+    )
+    return {
+        "type": "text",
+        "text": text.strip(),
+        "raw_response": response,
+        "input_tokens":  input_tokens,
+        "output_tokens": output_tokens,
+        **cache_tokens,
+        "provider_state": {"provider": "claude"},
+    }
 
-        for block in response.content:
-            if getattr(block, "type", None) == "tool_use":
-                return {
-                    "type":       "tool_call",
-                    "tool_name":  block.name,
-                    "tool_args":  block.input,
-                    "raw_response": response,
-                    "input_tokens":  input_tokens,
-                    "output_tokens": output_tokens,
-                    "provider_state": {
-                        "provider":    "claude",
-                        "messages":    messages,
-                        "claude_tools": claude_tools,
-                        "tool_use_id": block.id,
-                    },
-                }
 
-        text = next(
-            (b.text for b in response.content if hasattr(b, "text")),
-            "I couldn't generate a response.",
-        )
-        return {
-            "type": "text",
-            "text": text.strip(),
-            "raw_response": response,
-            "input_tokens":  input_tokens,
-            "output_tokens": output_tokens,
-            "provider_state": {"provider": "claude"},
-        }
+async def _call_claude_with_tools_async(
+    system_prompt: str,
+    history: list,
+    message: str,
+    tools: list,
+) -> dict:
+    cfg, fallback = _tools_preflight()
+    if fallback:
+        return fallback
 
+    request = _tools_request(cfg, system_prompt, history, message, tools)
+    try:
+        response = await _create_with_fallback_async(request, _CHAT_FEATURE)
+        return _tools_result(response, request)
     except Exception as e:
         logger.warning(f"Claude tool call failed: {e}")
-        return {"type": "text", "text": "I'm having trouble right now. Please try again.", "input_tokens": 0, "output_tokens": 0, "provider_state": {"provider": "claude"}}
+        return dict(_TOOLS_FAILED)
+
+
+async def _stream_claude_with_tools_async(
+    system_prompt: str,
+    history: list,
+    message: str,
+    tools: list,
+):
+    cfg, fallback = _tools_preflight()
+    if fallback:
+        yield {"type": "final", "result": fallback}
+        return
+
+    request = _tools_request(cfg, system_prompt, history, message, tools)
+    try:
+        async for event in _stream_with_fallback_async(request, _CHAT_FEATURE):
+            if event["type"] == "delta":
+                yield event
+            else:
+                response = event["response"]
+        result = _tools_result(response, request)
+    except Exception as e:
+        logger.warning(f"Claude tool stream failed: {e}")
+        result = dict(_TOOLS_FAILED)
+    yield {"type": "final", "result": result}
 
 
 # ─────────────────────────────────────────────────────────────
@@ -423,13 +2282,64 @@ async def call_ai_with_tools_async(
       tool_name     → str  (when type == "tool_call")
       tool_args     → dict (when type == "tool_call")
       raw_response  → provider's raw response object
-      input_tokens  → int
+      input_tokens  → int   (uncached input only)
       output_tokens → int
+      cache_read_tokens / cache_creation_tokens → int (prompt-cache usage)
       provider_state → dict  (needed by send_tool_result_async)
     """
     return await _call_claude_with_tools_async(system_prompt, history, message, tools)
 
 
+async def stream_ai_with_tools_async(
+    system_prompt: str,
+    history: list,
+    message: str,
+    tools: list,
+):
+    """
+    Streaming twin of call_ai_with_tools_async(). Async generator yielding
+      {"type": "delta", "text": str}    → text as it is generated
+      {"type": "final", "result": dict} → once, same dict as call_ai_with_tools_async()
+    Text Claude writes before deciding to call a tool is streamed too, as is
+    text of a stream that then fails: callers compare the deltas with the
+    final result and tell the client to reset (see process_message_stream).
+    """
+    async for event in _stream_claude_with_tools_async(system_prompt, history, message, tools):
+        yield event
+
+
+def _tool_result_request(
+    cfg: Dict,
+    system_prompt: str,
+    first_response_raw,
+    tool_result_summary: str,
+    provider_state: dict,
+) -> Dict:
+    messages = list(provider_state.get("messages", []))
+    messages.append({"role": "assistant", "content": first_response_raw.content})
+    messages.append({
+        "role": "user",
+        "content": [
+            {
+                "type":        "tool_result",
+                "tool_use_id": provider_state.get("tool_use_id", ""),
+                "content":     tool_result_summary,
+            }
+        ],
+    })
+
+    # claude_tools and messages already carry the breakpoints set by the
+    # first call, so everything up to the tool_use is a cache read.
+    model, max_tokens = _route(_CHAT_FEATURE, cfg["model"], 1024)
+    return {
+        "model":      model,
+        "max_tokens": max_tokens,
+        "system":     _cached_system(system_prompt),
+        "messages":   messages,
+        "tools":      provider_state.get("claude_tools", []),
+    }
+
+
 async def send_tool_result_async(
     system_prompt: str,
     history: list,
@@ -449,28 +2359,12 @@ async def send_tool_result_async(
         from app.services.claude_config_service import get_active_config_sync
         cfg = get_active_config_sync()
 
-        messages = list(provider_state.get("messages", []))
-        messages.append({"role": "assistant", "content": first_response_raw.content})
-        messages.append({
-            "role": "user",
-            "content": [
-                {
-                    "type":        "tool_result",
-                    "tool_use_id": provider_state.get("tool_use_id", ""),
-                    "content":     tool_result_summary,
-                }
-            ],
-        })
-
-        claude_tools = provider_state.get("claude_tools", [])
-        client   = _anthropic.AsyncAnthropic(api_key=cfg["api_key"])
-        response = await client.messages.create(
-            model=cfg["model"],
-            max_tokens=1024,
-            system=system_prompt,
-            messages=messages,
-            tools=claude_tools,
-        )
+        request  = _tool_result_request(cfg, system_prompt, first_response_raw, tool_result_summary, provider_state)
+        response = await _create_with_fallback_async(request, _CHAT_FEATURE)
+        try:
+            _accumulate_usage(response)
+        except Exception:
+            pass
         text = next(
             (b.text for b in response.content if hasattr(b, "text")),
             tool_result_summary,
@@ -480,3 +2374,49 @@ async def send_tool_result_async(
     except Exception as e:
         logger.warning(f"Claude tool result round-trip failed: {e}")
         return tool_result_summary
+
+
+async def stream_tool_result_async(
+    system_prompt: str,
+    history: list,
+    message: str,
+    first_response_raw,
+    tool_name: str,
+    tool_result_summary: str,
+    provider_state: dict,
+    tools: list = None,
+):
+    """
+    Streaming twin of send_tool_result_async(). Async generator yielding
+      {"type": "delta", "text": str}
+      {"type": "final", "text": str, "usage": dict}
+    The final text falls back to the summary if the round-trip fails — also
+    after deltas were sent, so callers check them against the final text.
+    """
+    streamed = False
+    try:
+        import anthropic as _anthropic
+        from app.services.claude_config_service import get_active_config_sync
+        cfg = get_active_config_sync()
+
+        request = _tool_result_request(cfg, system_prompt, first_response_raw, tool_result_summary, provider_state)
+        async for event in _stream_with_fallback_async(request, _CHAT_FEATURE):
+            if event["type"] == "delta":
+                streamed = True
+                yield event
+            else:
+                response = event["response"]
+    except Exception as e:
+        logger.warning(f"Claude tool result stream failed{' mid-stream' if streamed else ''}: {e}")
+        yield {"type": "final", "text": tool_result_summary, "usage": {}}
+        return
+
+    try:
+        usage = _accumulate_usage(response)
+    except Exception:
+        usage = {}
+    text = next(
+        (b.text for b in response.content if hasattr(b, "text")),
+        tool_result_summary,
+    )
+    yield {"type": "final", "text": text.strip(), "usage": usage}
@@ -0,0 +1,396 @@
+"""
+Local ATS scoring — the numeric half of analyze / ATS score / keyword
+distribution, computed in milliseconds without a Claude call.
+
+  1. Tokenize both texts; multi-word and punctuated skills ("node.js", "c++",
+     "machine learning") are folded onto one canonical name via SKILLS.
+  2. JD terms = every dictionary skill in the JD + the JD's recurring or
+     requirement-line keywords, weighted BM25-style (saturated tf, skills and
+     requirement lines boosted).
+  3. The resume is split into sections (headings in text, keys in JSON);
+     a sections × terms count matrix gives presence per section and, with
+     BM25 saturation and length normalization (so keyword stuffing and long
+     sections don't dominate), a TF-IDF cosine against the JD.
+
+Scores (0-100): keywords = weighted JD-term coverage, relevance = that
+cosine, structure = expected sections present, formatting = parse-hostile
+layout heuristics; atsScore blends the four.
+
+Exported callables:
+  score_resume(resume, job_description)     → Dict   (resume: text, JSON text or dict)
+  keyword_buckets(resume, job_description)  → Dict   ({"categories": [...]}, keyword_distribution shape)
+  section_scores(resume, job_description)   → List   (tailor sectionScores shape)
+  target_keywords(job_description, text)    → List   (JD terms that text can address, sorted)
+"""
+
+import re
+import json
+from collections import Counter
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+
+# ── Skill dictionary (canonical name → aliases; the name is an alias too) ──
+SKILLS: Dict[str, List[str]] = {
+    # Languages
+    "Python": ["python3", "py"], "Java": [], "JavaScript": ["js", "ecmascript", "es6"],
+    "TypeScript": ["ts"], "Go": ["golang"], "Rust": [], "C": [], "C++": ["cpp"], "C#": ["csharp", "c sharp"],
+    "Ruby": [], "PHP": [], "Kotlin": [], "Swift": [], "Scala": [], "R": [], "MATLAB": [], "Perl": [],
+    "Dart": [], "Elixir": [], "Haskell": [], "Objective-C": ["objective c"], "Bash": ["shell scripting"],
+    "SQL": [], "PL/SQL": ["plsql"], "HTML": ["html5"], "CSS": ["css3"], "Solidity": [],
+    # Frameworks & libraries
+    "React": ["react.js", "reactjs"], "Angular": ["angularjs", "angular.js"], "Vue.js": ["vue", "vuejs"],
+    "Next.js": ["nextjs"], "Svelte": [], "Redux": [], "jQuery": [], "Tailwind CSS": ["tailwind", "tailwindcss"],
+    "Bootstrap": [], "Node.js": ["node", "nodejs", "node js"], "Express.js": ["express", "expressjs"],
+    "NestJS": ["nest.js"], "Django": [], "Flask": [], "FastAPI": [], "Spring": [], "Spring Boot": ["springboot"],
+    "Hibernate": [], "Ruby on Rails": ["rails", "ror"], "Laravel": [], ".NET": ["dotnet", "asp.net", ".net core"],
+    "GraphQL": [], "REST APIs": ["rest", "restful", "rest api", "restful apis", "restful api"], "gRPC": [],
+    "React Native": [], "Flutter": [], "Android": [], "iOS": [], "Celery": [], "Pandas": [], "NumPy": [],
+    "SciPy": [], "scikit-learn": ["sklearn", "scikit learn"], "TensorFlow": [], "PyTorch": ["torch"],
+    "Keras": [], "Hugging Face": ["huggingface", "transformers"], "LangChain": [], "Spark": ["apache spark", "pyspark"],
+    "Hadoop": [], "Airflow": ["apache airflow"], "Kafka": ["apache kafka"], "RabbitMQ": [], "dbt": [],
+    # Data stores
+    "PostgreSQL": ["postgres", "postgresql"], "MySQL": [], "MongoDB": ["mongo"], "Redis": [], "SQLite": [],
+    "Oracle": [], "SQL Server": ["mssql", "ms sql"], "Cassandra": [], "DynamoDB": [], "Elasticsearch": ["elastic search", "opensearch"],
+    "Snowflake": [], "BigQuery": [], "Redshift": [], "Firebase": [], "Neo4j": [],
+    # Cloud & infrastructure
+    "AWS": ["amazon web services"], "Azure": ["microsoft azure"], "GCP": ["google cloud", "google cloud platform"],
+    "Docker": [], "Kubernetes": ["k8s"], "Terraform": [], "Ansible": [], "Jenkins": [], "GitHub Actions": [],
+    "GitLab CI": [], "CI/CD": ["ci cd", "continuous integration", "continuous delivery", "continuous deployment"],
+    "Linux": ["unix"], "Nginx": [], "Serverless": ["aws lambda"], "Microservices": ["microservice", "micro services"],
+    "Prometheus": [], "Grafana": [], "Datadog": [], "Helm": [], "Git": ["github", "gitlab", "bitbucket"],
+    # Practices & domains
+    "Machine Learning": ["ml"], "Deep Learning": ["dl"], "NLP": ["natural language processing"],
+    "Computer Vision": [], "Generative AI": ["genai", "gen ai", "llm", "llms", "large language models"],
+    "Data Analysis": ["data analytics", "analytics"], "Data Engineering": ["etl", "data pipelines", "data pipeline"],
+    "Data Science": [], "Statistics": [], "A/B Testing": ["ab testing", "a b testing"],
+    "System Design": ["distributed systems"], "Agile": ["scrum", "kanban"], "TDD": ["test driven development", "unit testing"],
+    "DevOps": [], "SRE": ["site reliability"], "Security": ["cybersecurity", "appsec"], "OAuth": ["oauth2", "jwt"],
+    "Tableau": [], "Power BI": ["powerbi"], "Excel": ["ms excel", "microsoft excel"], "Looker": [],
+    "Figma": [], "Jira": [], "Selenium": [], "Cypress": [], "Jest": [], "Pytest": [], "Postman": [],
+    "SEO": [], "Salesforce": [], "SAP": [], "Product Management": [], "Project Management": ["pmp"],
+    "Stakeholder Management": [], "Leadership": ["team leadership", "people management", "mentoring"],
+    "Communication": ["communication skills"],
+}
+
+_STOPWORDS = frozenset("""
+a about above across after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each either etc every few for from
+further had has have having he her here hers him his how i if in into is it its itself just least less
+like made make many may me more most much must my need needs no nor not of off on once one only or other
+our ours out over own per plus same she should so some such than that the their them then there these
+they this those through to too under until up upon us use used using very via was we well were what when
+where which while who whom why will with within without would yet you your yours
+ability able apply applicants benefits best candidate candidates company companies day days degree
+deliver demonstrated environment equivalent excellent experience experienced familiarity familiar good
+great help highly ideal including join knowledge looking new opportunity plus preferred proven
+related required requirement requirements responsibilities responsible role salary skills strong
+team teams understanding work working world year years job jobs position including looking across
+build building develop developing drive ensure high based within various well-versed
+let get want hire hiring looking seeking offer offers fast paced
+""".split())
+
+# Lines that state what the role needs boost their terms
+_REQUIREMENT_LINE = re.compile(r"\b(require|must|need|minimum|qualification|proficien|experience (with|in)|hands-on|expert)", re.I)
+_TOKEN = re.compile(r"\.net\b|[a-z0-9][a-z0-9+#]*(?:[./-][a-z0-9+#]+)*", re.I)
+# Skills that are also everyday words or letters count only as written
+_CASE_SENSITIVE = {"go": "Go", "c": "C", "r": "R", "rest": "REST", "swift": "Swift", "spring": "Spring",
+                   "express": "Express", "rust": "Rust", "dart": "Dart", "git": "Git", "ts": "TS", "ml": "ML"}
+_EMAIL_OR_PHONE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+|\+?\d[\d\s().-]{8,}\d")
+
+_MAX_NGRAM = 3
+_MAX_KEYWORDS = 20          # non-dictionary JD keywords kept
+_MAX_BUCKETED = 25          # keywords in keyword_buckets(), heaviest first
+_K1, _B = 1.2, 0.75         # BM25
+_SKILL_BOOST = 2.0
+_REQUIREMENT_BOOST = 1.5
+_RELEVANCE_FULL = 0.75      # TF-IDF cosine treated as a perfect match
+
+SECTIONS = ["summary", "skills", "experience", "projects", "education", "other"]
+_EXPECTED_SECTIONS = ["summary", "skills", "experience", "education"]
+_BUCKETS = [  # (keyword_distribution category, resume sections it covers), first match wins
+    ("Skills Relevant", {"skills"}),
+    ("Experience Relevant", {"experience"}),
+    ("Projects Relevant", {"projects"}),
+    ("Others Relevant", {"summary", "education", "other"}),
+]
+
+_HEADINGS = {
+    "summary": ["summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about", "about me", "overview"],
+    "skills": ["skills", "technical skills", "key skills", "core skills", "core competencies", "competencies",
+               "technologies", "tech stack", "tools", "skills and tools", "skills & tools", "technical expertise"],
+    "experience": ["experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "career history", "relevant experience"],
+    "projects": ["projects", "personal projects", "key projects", "academic projects", "side projects"],
+    "education": ["education", "academic background", "academics", "qualifications", "education and training"],
+    "other": ["certifications", "certificates", "awards", "achievements", "publications", "languages",
+              "interests", "hobbies", "volunteering", "volunteer experience", "activities", "contact",
+              "custom sections", "customsections"],
+}
+_HEADING_SECTION = {h: s for s, names in _HEADINGS.items() for h in names}
+# JSON keys (tailored / extracted resume dicts), compared without case or separators
+_KEY_SECTION = {
+    **{h.replace(" ", ""): s for h, s in _HEADING_SECTION.items()},
+    "technicalskills": "skills", "workexperience": "experience", "certifications": "other",
+}
+
+
+# Keys of tailor / extract results that describe the job or the run, not the resume
+_NOT_RESUME_KEYS = {"jobTitle", "company", "creditsUsed", "optimizationNotes", "keywordsAdded",
+                    "keywordsPresent", "sectionScores", "estimatedATSScore", "originalAtsScore", "error"}
+
+
+def _tokens(text: str) -> List[str]:
+    """Tokens as written (lower-case them for lookups); "python/django" splits, "ci/cd" doesn't."""
+    out = []
+    for token in _TOKEN.findall(text):
+        if "/" in token and token.lower() not in _ALIASES:
+            out.extend(t for t in token.split("/") if t)
+        else:
+            out.append(token)
+    return out
+
+
+_ALIASES: Dict[str, str] = {}
+for _name, _aliases in SKILLS.items():
+    for _alias in [_name, *_aliases]:
+        _ALIASES[_alias.lower()] = _name  # single-token form, e.g. "node.js"
+for _alias, _name in list(_ALIASES.items()):
+    _ALIASES.setdefault(" ".join(_tokens(_alias)).lower(), _name)
+
+
+def _terms(text: str) -> List[str]:
+    """Canonical skills (greedy longest phrase) and plain keywords, in text order."""
+    written = _tokens(text)
+    tokens = [t.lower() for t in written]
+    out, i = [], 0
+    while i < len(tokens):
+        for n in range(min(_MAX_NGRAM, len(tokens) - i), 0, -1):
+            key = " ".join(tokens[i:i + n])
+            skill = _ALIASES.get(key)
+            if skill and (n > 1 or _CASE_SENSITIVE.get(key, written[i]) == written[i]):
+                out.append(skill)
+                i += n
+                break
+        else:
+            token = tokens[i]
+            if len(token) >= 3 and token.isalpha() and token not in _STOPWORDS:
+                out.append(token)
+            i += 1
+    return out
+
+
+def _is_skill(term: str) -> bool:
+    return term in SKILLS
+
+
+# ── Resume sections ─────────────────────────────────────────
+def _flatten(value) -> str:
+    if isinstance(value, dict):
+        return "\n".join(_flatten(v) for v in value.values())
+    if isinstance(value, list):
+        return "\n".join(_flatten(v) for v in value)
+    return "" if value is None else str(value)
+
+
+def _dict_sections(resume: Dict) -> Dict[str, str]:
+    sections: Dict[str, List[str]] = {}
+    for key, value in resume.items():
+        section = _KEY_SECTION.get(re.sub(r"[\s_-]", "", str(key).lower()))
+        if section is None:
+            if key in _NOT_RESUME_KEYS:
+                continue
+            section = "other"
+        sections.setdefault(section, []).append(_flatten(value))
+    return {s: "\n".join(parts) for s, parts in sections.items()}
+
+
+def _text_sections(resume: str) -> Dict[str, str]:
+    sections: Dict[str, List[str]] = {}
+    current = "other"
+    for line in resume.splitlines():
+        stripped = line.strip().strip("#*").strip()
+        head, _, rest = stripped.partition(":")
+        section = _HEADING_SECTION.get(re.sub(r"\s+", " ", head.strip().lower()))
+        if section and len(head) <= 40:
+            current = section
+            line = rest
+        sections.setdefault(current, []).append(line)
+    return {s: "\n".join(parts) for s, parts in sections.items() if "".join(parts).strip()}
+
+
+def _sections(resume: Union[str, Dict]) -> Tuple[Dict[str, str], bool]:
+    """({section: text}, is_structured)"""
+    if isinstance(resume, dict):
+        return _dict_sections(resume), True
+    stripped = resume.strip()
+    if stripped.startswith("{"):
+        try:
+            parsed = json.loads(stripped)
+            if isinstance(parsed, dict):
+                return _dict_sections(parsed), True
+        except ValueError:
+            pass
+    return _text_sections(resume), False
+
+
+# ── JD terms ────────────────────────────────────────────────
+def _jd_weights(job_description: str) -> Dict[str, float]:
+    counts: Counter = Counter()
+    required: set = set()
+    for line in job_description.splitlines():
+        terms = _terms(line)
+        counts.update(terms)
+        if _REQUIREMENT_LINE.search(line):
+            required.update(terms)
+
+    def weight(term: str) -> float:
+        tf = counts[term]
+        w = tf * (_K1 + 1) / (tf + _K1)
+        if _is_skill(term):
+            w *= _SKILL_BOOST
+        if term in required:
+            w *= _REQUIREMENT_BOOST
+        return w
+
+    skills = {t: weight(t) for t in counts if _is_skill(t)}
+    keywords = sorted(
+        ((t, weight(t)) for t in counts if not _is_skill(t) and (counts[t] >= 2 or t in required)),
+        key=lambda kv: -kv[1],
+    )[:_MAX_KEYWORDS]
+    return {**skills, **dict(keywords)}
+
+
+# ── Scores ──────────────────────────────────────────────────
+def _formatting_score(text: str, structured: bool) -> int:
+    words = len(text.split())
+    score = 100
+    if words < 250:
+        score -= 20
+    elif words > 1200:
+        score -= 15
+    if not structured:
+        lines = [l for l in text.splitlines() if l.strip()]
+        if lines and sum(len(l) > 200 for l in lines) / len(lines) > 0.3:
+            score -= 10  # paragraph walls instead of bullets
+        if text.count("|") > 10 or text.count("\t") > 10:
+            score -= 10  # tables / columns that ATS parsers scramble
+        if text and sum(ord(c) > 0x2FFF for c in text) / len(text) > 0.02:
+            score -= 10  # icon fonts and symbol glyphs
+    return max(40, score)
+
+
+def _structure_score(sections: Dict[str, str], text: str, structured: bool) -> int:
+    present = sum(1 for s in _EXPECTED_SECTIONS if sections.get(s, "").strip()) / len(_EXPECTED_SECTIONS)
+    if structured:  # tailored / extracted dicts carry contact separately
+        return round(100 * present)
+    return round(85 * present + (15 if _EMAIL_OR_PHONE.search(text) else 0))
+
+
+def _analyze(resume: Union[str, Dict], job_description: str) -> Dict:
+    sections, structured = _sections(resume)
+    names = [s for s in SECTIONS if s in sections]
+    weights = _jd_weights(job_description)
+    vocab = list(weights)
+    index = {t: i for i, t in enumerate(vocab)}
+    w = np.array([weights[t] for t in vocab], dtype=float)
+
+    # sections × terms counts
+    counts = np.zeros((len(names), len(vocab)))
+    lengths = np.zeros(len(names))
+    for row, name in enumerate(names):
+        terms = _terms(sections[name])
+        lengths[row] = max(1, len(terms))
+        for term in terms:
+            col = index.get(term)
+            if col is not None:
+                counts[row, col] += 1
+
+    present = counts > 0
+    found = present.any(axis=0)
+    bm25 = np.zeros_like(counts)
+    if len(names):
+        norm = _K1 * (1 - _B + _B * lengths / lengths.mean())
+        bm25 = counts * (_K1 + 1) / (counts + norm[:, None])
+
+    # TF-IDF cosine, documents = JD + resume sections
+    jd_tf = np.zeros(len(vocab))
+    for term in _terms(job_description):
+        if term in index:
+            jd_tf[index[term]] += 1
+    idf = np.log((2 + len(names)) / (1 + present.sum(axis=0) + (jd_tf > 0))) + 1
+    a, b = jd_tf * idf, bm25.sum(axis=0) * idf
+    denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+    cosine = float(a @ b) / denom if denom else 0.0
+
+    skill_mask = np.array([_is_skill(t) for t in vocab], dtype=bool)
+
+    def coverage(mask) -> float:
+        total = float(w[mask].sum())
+        return float(w[mask & found].sum()) / total if total else 0.0
+
+    text = _flatten(resume) if isinstance(resume, dict) else resume
+    everything = np.ones(len(vocab), dtype=bool)
+    breakdown = {
+        "formatting": _formatting_score(text, structured),
+        "keywords": round(100 * coverage(everything)),
+        "structure": _structure_score(sections, text, structured),
+        "relevance": round(100 * min(1.0, cosine / _RELEVANCE_FULL)),
+    }
+    skill_cov = coverage(skill_mask) if skill_mask.any() else coverage(everything)
+    by_weight = sorted(range(len(vocab)), key=lambda c: -w[c])
+    return {
+        "atsScore": round(0.45 * breakdown["keywords"] + 0.25 * breakdown["relevance"]
+                          + 0.15 * breakdown["structure"] + 0.15 * breakdown["formatting"]),
+        "matchPercentage": round(100 * (0.7 * skill_cov + 0.3 * coverage(everything))),
+        "scoreBreakdown": breakdown,
+        "matchedSkills": [vocab[c] for c in by_weight if skill_mask[c] and found[c]],
+        "missingSkills": [vocab[c] for c in by_weight if skill_mask[c] and not found[c]],
+        "matchedKeywords": [vocab[c] for c in by_weight if not skill_mask[c] and found[c]],
+        "missingKeywords": [vocab[c] for c in by_weight if not skill_mask[c] and not found[c]],
+        "_order": [vocab[c] for c in by_weight],
+        "_sections": {vocab[c]: {names[r] for r in np.flatnonzero(present[:, c])} for c in range(len(vocab))},
+        "_by_section": {
+            names[r]: (float(w[present[r]].sum()) / float(w.sum()) if w.sum() else 0.0, int(present[r].sum()))
+            for r in range(len(names))
+        },
+    }
+
+
+def score_resume(resume: Union[str, Dict], job_description: str) -> Dict:
+    """
+    {"atsScore", "matchPercentage", "scoreBreakdown": {formatting, keywords,
+    structure, relevance}, "matchedSkills", "missingSkills", "matchedKeywords",
+    "missingKeywords"} — skills/keywords heaviest JD weight first.
+    """
+    result = _analyze(resume, job_description)
+    return {k: v for k, v in result.items() if not k.startswith("_")}
+
+
+def keyword_buckets(resume: Union[str, Dict], job_description: str) -> Dict:
+    """JD keywords by where the resume has them: skills, else experience, else projects, else anywhere (keyword_distribution shape)."""
+    result = _analyze(resume, job_description)
+    buckets: Dict[str, List[str]] = {name: [] for name, _ in _BUCKETS}
+    buckets["Not Relevant"] = []
+    for term in result["_order"][:_MAX_BUCKETED]:
+        found_in = result["_sections"][term]
+        name = next((n for n, covered in _BUCKETS if found_in & covered), "Not Relevant")
+        buckets[name].append(term)
+    return {"categories": [{"name": n, "value": len(k), "keywords": k} for n, k in buckets.items()]}
+
+
+def section_scores(resume: Union[str, Dict], job_description: str) -> List[Dict]:
+    """[{"section", "score", "jdKeywordsFound", "jdKeywordsTotal"}] for each resume section with content."""
+    result = _analyze(resume, job_description)
+    total = len(result["_order"])
+    return [
+        {"section": name.title(), "score": round(100 * cov), "jdKeywordsFound": found, "jdKeywordsTotal": total}
+        for name, (cov, found) in result["_by_section"].items() if name != "other"
+    ]
+
+
+def target_keywords(job_description: str, text: str) -> List[str]:
+    """The JD's weighted terms that also occur in text — what a rewrite of text can target."""
+    return sorted(set(_jd_weights(job_description)) & set(_terms(text)))
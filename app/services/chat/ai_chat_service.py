@@ -12,16 +12,19 @@ from app.services.job_recommendation_service import (
 )
 from app.config import settings
 from app.services.lead_finder import LeadFinder
-from app.services.resume_processor import tailor_resume as do_tailor_resume
+from app.services.resume_processor import tailor_resume_async as do_tailor_resume
+from app.services.tailor_sections import stream_tailor_resume
 from app.services.mongo import mongo
 from app.models.chat.schemas import ChatMessage
 from app.services.ai_provider_service import (
-    call_ai,
+    call_ai_async,
     call_ai_text_async,
     call_ai_with_tools_async,
     send_tool_result_async,
+    stream_ai_with_tools_async,
+    stream_tool_result_async,
 )
-from typing import List, Dict, Any, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -221,29 +224,25 @@ def _merge_tailored_resume(result: dict, orig: dict) -> dict:
 
 
 async def _get_user_resume_text(user_id: str) -> str:
-    """Fetch and flatten the user's latest resume from incoming_resumes."""
-    doc = await mongo.incoming_resumes.find_one(
-        {"user_id": user_id},
-        sort=[("created_at", -1)],
-    )
-    if not doc:
+    """The user's resume as prompt text (materialized context in incoming_resumes)."""
+    from app.services.incoming_resume_service import IncomingResumeService
+    context = await IncomingResumeService.get_context(user_id)
+    if context is None:
         raise ValueError("no_resume")
+    return context["prompt_text"]
 
-    extracted = doc.get("extracted_data")
-    if extracted and isinstance(extracted, dict):
-        parts = []
-        for key, val in extracted.items():
-            if val:
-                if isinstance(val, list):
-                    parts.append(f"{key}: {', '.join(str(v) for v in val)}")
-                elif isinstance(val, dict):
-                    parts.append(f"{key}: {json.dumps(val)}")
-                else:
-                    parts.append(f"{key}: {val}")
-        if parts:
-            return "\n".join(parts)
 
-    return doc.get("raw_text") or doc.get("text") or ""
+async def _tailor_events(resume_text: str, orig_struct: dict, job_description: str) -> AsyncIterator[Dict]:
+    """
+    Tailoring for the chat / tailor-for-job flows: {"type": "section", ...}
+    per finished section (settings.tailor_mode "sections" with an extracted
+    resume), then {"type": "done", "result": <tailor_resume result>}.
+    """
+    if settings.tailor_mode == "sections" and orig_struct:
+        async for event in stream_tailor_resume(orig_struct, job_description):
+            yield event
+    else:
+        yield {"type": "done", "result": await do_tailor_resume(resume_text, job_description)}
 
 
 async def _get_user_resume_text_safe(user_id: str) -> str:
@@ -340,6 +339,8 @@ class AIChatService:
                         description="Nova conversation turn",
                         input_tokens=result.get("input_tokens", 0),
                         output_tokens=result.get("output_tokens", 0),
+                        cache_read_tokens=result.get("cache_read_tokens", 0),
+                        cache_creation_tokens=result.get("cache_creation_tokens", 0),
                     )
                 return {
                     "response":    result["text"],
@@ -374,6 +375,8 @@ class AIChatService:
                     description=f"Nova tool: {tool_name}",
                     input_tokens=result.get("input_tokens", 0),
                     output_tokens=result.get("output_tokens", 0),
+                    cache_read_tokens=result.get("cache_read_tokens", 0),
+                    cache_creation_tokens=result.get("cache_creation_tokens", 0),
                 )
 
             return {
@@ -404,8 +407,12 @@ class AIChatService:
         message: str,
         session_history: List[ChatMessage],
     ):
-        """Async generator that yields SSE-ready dicts for streaming responses."""
+        """Async generator that yields SSE-ready dicts for streaming responses.
+        A {"type": "reset"} event tells the client to drop the text streamed so
+        far (it was not the reply — e.g. written before a tool call, or cut off
+        by a failed stream); the done event's response is the reply."""
         timestamp = datetime.utcnow().isoformat()
+        streamed: List[str] = []
         try:
             user_doc = await mongo.users.find_one({"_id": ObjectId(user_id)})
             if not user_doc:
@@ -420,9 +427,30 @@ class AIChatService:
                 role = "user" if msg.role.value == "user" else "assistant"
                 history.append({"role": role, "content": msg.content})
 
-            result = await call_ai_with_tools_async(system, history, message, NOVA_TOOLS)
+            # Forward text deltas as they arrive; the done event still carries
+            # the full reply (it is what gets persisted).
+            result = None
+            async for event in stream_ai_with_tools_async(system, history, message, NOVA_TOOLS):
+                if event["type"] == "delta":
+                    streamed.append(event["text"])
+                    yield {"type": "delta", "text": event["text"]}
+                else:
+                    result = event["result"]
+            if streamed and (result["type"] != "text" or "".join(streamed).strip() != result["text"].strip()):
+                streamed.clear()
+                yield {"type": "reset"}
 
             if result["type"] == "text":
+                if (result.get("input_tokens") or 0) > 0:
+                    await CreditsService.log_deduction(
+                        user_id=user_id, amount=0, feature="ai_chat",
+                        function_name="nova_chat",
+                        description="Nova conversation turn",
+                        input_tokens=result.get("input_tokens", 0),
+                        output_tokens=result.get("output_tokens", 0),
+                        cache_read_tokens=result.get("cache_read_tokens", 0),
+                        cache_creation_tokens=result.get("cache_creation_tokens", 0),
+                    )
                 yield {"type": "done", "response": result["text"], "intent": "general_chat",
                        "action_type": None, "action_data": None, "timestamp": timestamp}
                 return
@@ -548,10 +576,13 @@ class AIChatService:
                        "step": 2, "total_steps": 3,
                        "step_label": "Tailoring resume for maximum ATS compatibility…"}
 
-                loop   = asyncio.get_event_loop()
-                result = await loop.run_in_executor(
-                    None, lambda: do_tailor_resume(resume_text, job_description)
-                )
+                orig_struct = await self._get_user_resume_structured(user_id)
+                result: Dict = {}
+                async for event in _tailor_events(resume_text, orig_struct, job_description):
+                    if event["type"] == "section":
+                        yield {**event, "action_type": "tailored_resume"}
+                    else:
+                        result = event["result"]
 
                 yield {"type": "progress", "action_type": "tailored_resume",
                        "step": 3, "total_steps": 3,
@@ -560,7 +591,6 @@ class AIChatService:
                 ats_score   = result.get("estimatedATSScore", 0)
                 notes       = result.get("optimizationNotes", [])
                 notes_md    = "\n".join(f"- {n}" for n in notes[:6])
-                orig_struct = await self._get_user_resume_structured(user_id)
                 tailored    = _build_tailored_text(result)
                 resume_data = _merge_tailored_resume(result, orig_struct)
                 score_bd    = result.get("scoreBreakdown", {})
@@ -583,14 +613,34 @@ class AIChatService:
             # ── All other tools: run normally, single done event ───────────
             else:
                 tool_result = await self._execute_tool(tool_name, tool_args, user_id)
-                final_text  = await send_tool_result_async(
+                final_text  = ""
+                async for event in stream_tool_result_async(
                     system_prompt=system, history=history, message=message,
                     first_response_raw=result["raw_response"], tool_name=tool_name,
                     tool_result_summary=tool_result.get("summary", tool_result.get("response", "")),
                     provider_state=result.get("provider_state", {}), tools=NOVA_TOOLS,
-                )
+                ):
+                    if event["type"] == "delta":
+                        streamed.append(event["text"])
+                        yield {"type": "delta", "text": event["text"]}
+                    else:
+                        final_text = event["text"]
+                response = final_text or tool_result.get("response", "done.")
+                if streamed and "".join(streamed).strip() != response.strip():
+                    streamed.clear()
+                    yield {"type": "reset"}  # the round trip failed mid-stream
+                if (result.get("input_tokens") or 0) > 0:
+                    await CreditsService.log_deduction(
+                        user_id=user_id, amount=0, feature="ai_chat",
+                        function_name="nova_tool_call",
+                        description=f"Nova tool: {tool_name}",
+                        input_tokens=result.get("input_tokens", 0),
+                        output_tokens=result.get("output_tokens", 0),
+                        cache_read_tokens=result.get("cache_read_tokens", 0),
+                        cache_creation_tokens=result.get("cache_creation_tokens", 0),
+                    )
                 yield {"type": "done",
-                       "response":    final_text or tool_result.get("response", "done."),
+                       "response":    response,
                        "intent":      tool_name,
                        "action_type": tool_result.get("action_type"),
                        "action_data": tool_result.get("action_data"),
@@ -599,6 +649,8 @@ class AIChatService:
         except Exception as e:
             print(f"process_message_stream error: {e}")
             import traceback; traceback.print_exc()
+            if streamed:
+                yield {"type": "reset"}
             yield {"type": "done", "response": "i'm having trouble right now. please try again.",
                    "intent": "error", "action_type": None, "action_data": None, "timestamp": timestamp}
 
@@ -853,7 +905,7 @@ class AIChatService:
                         for i, j in enumerate(jobs_base)
                     )
                 )
-                raw_text = await call_ai_text_async(pitch_prompt, temperature=0.5, max_tokens=800)
+                raw_text = await call_ai_text_async(pitch_prompt, temperature=0.5, max_tokens=800, feature="find_jobs_pitch")
                 raw_text = raw_text.strip()
                 if raw_text.startswith("```"):
                     lines    = raw_text.split("\n")
@@ -994,7 +1046,7 @@ class AIChatService:
                 f"3. A single punchy cold outreach opening line you would use\n\n"
                 f"Be direct. No bullet points. Plain prose."
             )
-            analysis = await call_ai_text_async(prompt, temperature=0.6, max_tokens=250)
+            analysis = await call_ai_text_async(prompt, temperature=0.6, max_tokens=250, feature="analyze_lead")
             return (analysis.strip(), None, None)
         except Exception as e:
             print(f"analyze_lead handler error: {e}")
@@ -1004,7 +1056,7 @@ class AIChatService:
 
     async def _get_user_resume_structured(self, user_id: str) -> dict:
         doc = await mongo.incoming_resumes.find_one(
-            {"user_id": user_id}, sort=[("created_at", -1)]
+            {"user_id": user_id}, {"extracted_data": 1}, sort=[("created_at", -1)]
         )
         return (doc or {}).get("extracted_data") or {}
 
@@ -1032,11 +1084,14 @@ class AIChatService:
                 if not ok:
                     return (f"not enough credits to tailor your resume. {msg}\n\nvisit /pricing to top up.", None, None)
 
-            result      = do_tailor_resume(resume_text, job_description)
+            orig_struct = await self._get_user_resume_structured(user_id)
+            result: Dict = {}
+            async for event in _tailor_events(resume_text, orig_struct, job_description):
+                if event["type"] == "done":
+                    result = event["result"]
             ats_score   = result.get("estimatedATSScore", 0)
             notes       = result.get("optimizationNotes", [])
             notes_md    = "\n".join(f"- {n}" for n in notes[:6])
-            orig_struct = await self._get_user_resume_structured(user_id)
             tailored    = _build_tailored_text(result)
             resume_data = _merge_tailored_resume(result, orig_struct)
             score_bd    = result.get("scoreBreakdown", {})
@@ -1121,7 +1176,7 @@ Return JSON:
   ]
 }}"""
 
-            result = call_ai(prompt, temperature=0.2, max_tokens=1200)
+            result = await call_ai_async(prompt, temperature=0.2, max_tokens=1200, feature="job_evaluate")
             if "error" in result:
                 await CreditsService.refund_credits(user_id, cost, "Job eval via chat AI failed")
                 return ("job evaluation failed. please try again.", None, None)
@@ -1204,7 +1259,7 @@ Return ONLY valid JSON:
   "linkedinDraft": "LinkedIn message (strictly max 300 characters)"
 }}"""
 
-            result = call_ai(prompt, temperature=0.4, max_tokens=600)
+            result = await call_ai_async(prompt, temperature=0.4, max_tokens=600, feature="followup_generate")
             if "error" in result:
                 await CreditsService.refund_credits(user_id, cost, "Follow-up via chat AI failed")
                 return ("follow-up generation failed. please try again.", None, None)
@@ -1256,7 +1311,7 @@ Return ONLY valid JSON (no markdown, no extra text):
 }}
 Each section: 2-3 specific, actionable bullets."""
 
-            result = call_ai(prompt, temperature=0.4, max_tokens=1200)
+            result = await call_ai_async(prompt, temperature=0.4, max_tokens=1200, feature="company_research")
             if "error" in result:
                 await CreditsService.refund_credits(user_id, cost, "Company research via chat AI failed")
                 return ("company research failed. try [interview prep](/interview-prep) for the full experience.", None, None)
@@ -1297,7 +1352,7 @@ Context: {context[:500]}
 Keep it professional, specific, and strictly under 300 characters (LinkedIn limit).
 Return ONLY valid JSON: {{"message": "...", "characterCount": 250}}"""
 
-            result = call_ai(prompt, temperature=0.4, max_tokens=200)
+            result = await call_ai_async(prompt, temperature=0.4, max_tokens=200, feature="outreach_generate")
             if "error" in result:
                 await CreditsService.refund_credits(user_id, cost, "Outreach via chat AI failed")
                 return ("outreach message generation failed. please try again.", None, None)
@@ -1404,20 +1459,33 @@ Return ONLY valid JSON: {{"message": "...", "characterCount": 250}}"""
         self, resume_text: str, user_id: str
     ) -> Tuple[str, Optional[Dict], Optional[str]]:
         try:
-            from app.services.resume_processor import extract_resume_from_text
+            from app.services.resume_processor import (
+                prepare_resume_text_async,
+                resume_fingerprint,
+                extract_resume_from_prepared_text_async,
+            )
             from app.services.incoming_resume_service import IncomingResumeService
 
             if not resume_text.strip():
                 return ("the resume text was empty — please try attaching the file again.", None, None)
 
-            extracted = extract_resume_from_text(resume_text)
-            if "error" in extracted:
+            text, err = await prepare_resume_text_async(resume_text)
+            if err:
                 return ("couldn't parse that resume — make sure it's a valid PDF, DOCX, or TXT.", None, None)
+            fingerprint = resume_fingerprint(text)
+
+            # Same resume as the stored one → keep its extraction, skip Claude
+            extracted = await IncomingResumeService.find_by_fingerprint(user_id, fingerprint)
+            if extracted is None:
+                extracted = await extract_resume_from_prepared_text_async(text)
+                if "error" in extracted:
+                    return ("couldn't parse that resume — make sure it's a valid PDF, DOCX, or TXT.", None, None)
 
             await IncomingResumeService.save_or_update(
                 user_id=user_id,
                 raw_input=resume_text,
                 extracted_data=extracted,
+                fingerprint=fingerprint,
             )
 
             # Auto-save contact URLs
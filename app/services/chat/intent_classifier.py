@@ -71,7 +71,7 @@ Message: "{message}"
 
 Respond with ONLY the intent name, nothing else. Intent:"""
 
-        intent = await call_ai_text_async(prompt, temperature=0.1, max_tokens=50)
+        intent = await call_ai_text_async(prompt, temperature=0.1, max_tokens=50, feature="classify_intent")
         intent = intent.lower().strip()
 
         # Clean up the response and validate
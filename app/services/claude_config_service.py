@@ -3,12 +3,21 @@ DB-backed Claude configuration with a 60-second in-memory cache.
 
 Allows the admin UI to update the active API key / model at runtime
 without restarting the server. Falls back to .env values if no DB override is set.
+
+Besides the primary api_key the config holds a pool of extra keys
+(api_keys: [{"label", "key", "enabled"}]); ai_provider_service spreads calls
+across every enabled key by observed rate-limit headroom.
+
+Also holds the per-feature routing table (admin_settings "claude_routing"):
+feature name → model / max_tokens / fallback chain, read by ai_provider_service
+on every call.
 """
 
 import time
+import hashlib
 import logging
 from datetime import datetime
-from typing import Dict
+from typing import Dict, List, Optional
 
 from app.config import settings
 from app.services.mongo import mongo
@@ -17,6 +26,12 @@ logger = logging.getLogger(__name__)
 
 # ── Available Claude models ───────────────────────────────────
 AVAILABLE_MODELS = [
+    {
+        "id": "claude-opus-4-7",
+        "name": "Claude Opus 4.7",
+        "context_window": 200_000,
+        "recommended": False,
+    },
     {
         "id": "claude-opus-4-6",
         "name": "Claude Opus 4.6",
@@ -62,6 +77,7 @@ _CACHE_TTL = 60  # seconds
 def _default_config() -> Dict:
     return {
         "api_key":     settings.claude_api_key,
+        "api_keys":    _env_key_pool(),
         "model":       settings.claude_model,
         "temperature": 0.2,
         "max_tokens":  4096,
@@ -95,6 +111,7 @@ async def get_claude_config() -> Dict:
 
     cfg = {
         "api_key":     (doc.get("api_key")   if doc and doc.get("api_key")  else None) or settings.claude_api_key,
+        "api_keys":    (doc.get("api_keys")  if doc and doc.get("api_keys") else None) or _env_key_pool(),
         "model":       (doc.get("model")     if doc and doc.get("model")    else None) or settings.claude_model,
         "temperature":  doc.get("temperature", 0.2) if doc else 0.2,
         "max_tokens":   doc.get("max_tokens",  4096) if doc else 4096,
@@ -112,19 +129,29 @@ async def init_claude_config() -> None:
     """
     Called once at startup (main.py → startup_event).
     Loads config from DB so all features use the correct key/model
-    from the very first request. Claude uses per-call client instantiation.
+    from the very first request. Clients are pooled per api_key in
+    ai_provider_service and built lazily on first use.
     """
     global _active_config
     cfg = await get_claude_config()
     _active_config = cfg
-    logger.info(f"✅ Claude config loaded: model={cfg['model']}, key_set={bool(cfg['api_key'])}")
+    logger.info(
+        f"✅ Claude config loaded: model={cfg['model']}, key_set={bool(cfg['api_key'])}, "
+        f"key_pool={len(get_api_key_pool_sync())}"
+    )
+
+    routes = await get_feature_routes()
+    pinned = {f: r["model"] for f, r in routes["routes"].items() if r["model"]}
+    logger.info(f"✅ Claude routing loaded: {pinned}")
 
 
 async def save_claude_config(data: Dict, admin_email: str) -> None:
     global _active_config, _cache_time
 
-    allowed_keys = {"api_key", "model", "temperature", "max_tokens"}
+    allowed_keys = {"api_key", "api_keys", "model", "temperature", "max_tokens"}
     update = {k: v for k, v in data.items() if k in allowed_keys}
+    if "api_keys" in update:
+        update["api_keys"] = validate_api_keys(update["api_keys"], get_active_config_sync().get("api_keys"))
     update["updated_at"] = datetime.utcnow()
     update["updated_by"] = admin_email
 
@@ -138,4 +165,221 @@ async def save_claude_config(data: Dict, admin_email: str) -> None:
     _active_config = {**_active_config, **update}
     _cache_time = 0.0  # invalidate async cache too
 
+    # Drop pooled clients so a rotated key never reuses the old connections
+    from app.services.ai_provider_service import reset_client_registry
+    reset_client_registry()
+
     logger.info(f"Claude config saved by {admin_email}: {list(update.keys())}, active immediately")
+
+
+# ── API key pool ──────────────────────────────────────────────
+# Keys are identified by a short hash everywhere outside this module, so the
+# admin UI and telemetry never need the secret itself.
+
+def api_key_id(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:10]
+
+
+def _env_key_pool() -> List[Dict]:
+    return [
+        {"label": f"env-{n + 1}", "key": key, "enabled": True}
+        for n, key in enumerate(settings.claude_api_key_pool) if key
+    ]
+
+
+def get_api_key_pool_sync() -> List[Dict]:
+    """
+    Enabled keys as [{"id", "label", "key"}], primary api_key first, duplicates
+    dropped. Called by ai_provider_service when picking a key — no DB hit.
+    """
+    cfg = get_active_config_sync()
+    entries = [{"label": "primary", "key": cfg.get("api_key"), "enabled": True}] + list(cfg.get("api_keys") or [])
+    pool: List[Dict] = []
+    seen = set()
+    for entry in entries:
+        key = entry.get("key")
+        if not key or not entry.get("enabled", True) or key in seen:
+            continue
+        seen.add(key)
+        pool.append({"id": api_key_id(key), "label": entry.get("label") or api_key_id(key), "key": key})
+    return pool
+
+
+def validate_api_keys(entries: List[Dict], current: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    Normalises an admin update of the key pool. An entry may carry "id" instead
+    of "key" to keep a stored key without resending the secret.
+    Raises ValueError on unknown ids, missing keys or duplicate labels.
+    """
+    known = {api_key_id(e["key"]): e["key"] for e in (current or []) if e.get("key")}
+    clean: List[Dict] = []
+    labels = set()
+    for n, entry in enumerate(entries):
+        key = (entry.get("key") or "").strip()
+        if not key and entry.get("id"):
+            key = known.get(entry["id"], "")
+            if not key:
+                raise ValueError(f"Unknown api key id: {entry['id']}")
+        if not key:
+            raise ValueError(f"api_keys[{n}] needs a key or the id of a stored key")
+        label = (entry.get("label") or f"key-{n + 1}").strip()
+        if label in labels:
+            raise ValueError(f"Duplicate api key label: {label}")
+        labels.add(label)
+        clean.append({"label": label, "key": key, "enabled": bool(entry.get("enabled", True))})
+    return clean
+
+
+# ── Per-feature model routing ─────────────────────────────────
+# Every AI call site passes a feature name. A route pins that feature's
+# model and/or max_tokens; None keeps the call site's own default (and,
+# for the model, the active config model above). Routes win over call-site
+# arguments so a feature can be moved between tiers from the admin UI.
+#
+# fallbacks: models tried in order when the one before is overloaded (529),
+# has no admission slot, or misses deadline_seconds (every model but the
+# last gets that long). The model that answered lands in credits_log.
+_OPUS_FALLBACKS = ["claude-sonnet-4-6", "claude-haiku-4-5-20251001"]
+
+FEATURE_ROUTE_DEFAULTS: Dict[str, Dict] = {
+    # Resume
+    "extract_resume":        {"model": "claude-opus-4-7", "max_tokens": None,
+                              "fallbacks": _OPUS_FALLBACKS, "deadline_seconds": 90},
+    "tailor_resume":         {"model": "claude-opus-4-7", "max_tokens": None,
+                              "fallbacks": _OPUS_FALLBACKS, "deadline_seconds": 90},
+    "tailor_section":        {"model": "claude-opus-4-7", "max_tokens": None,
+                              "fallbacks": _OPUS_FALLBACKS, "deadline_seconds": 45},
+    "analyze_resume":        {"model": None, "max_tokens": None},
+    "ats_score":             {"model": None, "max_tokens": None},
+    "analyze_and_tailor":    {"model": None, "max_tokens": None},
+    "parse_job_description": {"model": None, "max_tokens": None},
+    "cover_letter":          {"model": None, "max_tokens": None},
+    "skills_roadmap":        {"model": None, "max_tokens": None},
+    "keyword_distribution":  {"model": None, "max_tokens": None},
+    "custom_sections":       {"model": None, "max_tokens": None},
+    "resume_completeness":   {"model": None, "max_tokens": None},
+    "enhance_resume":        {"model": None, "max_tokens": None},
+    "resume_keywords":       {"model": None, "max_tokens": None},
+    # Jobs & applications
+    "job_ranking":           {"model": None, "max_tokens": None},
+    "job_evaluate":          {"model": None, "max_tokens": None},
+    "application_insights":  {"model": None, "max_tokens": None},
+    "followup_generate":     {"model": None, "max_tokens": None},
+    "star_stories":          {"model": None, "max_tokens": None},
+    "compensation":          {"model": None, "max_tokens": None},
+    "company_research":      {"model": None, "max_tokens": None},
+    # Outreach & leads
+    "outreach_generate":     {"model": None, "max_tokens": None},
+    "analyze_lead":          {"model": None, "max_tokens": None},
+    # Nova chat
+    "nova_chat":             {"model": None, "max_tokens": None},
+    "classify_intent":       {"model": None, "max_tokens": None},
+    "find_jobs_pitch":       {"model": None, "max_tokens": None},
+}
+
+_MAX_ROUTE_TOKENS = 8192
+_MAX_ROUTE_DEADLINE_SECONDS = 600
+_EMPTY_ROUTE: Dict = {"model": None, "max_tokens": None, "fallbacks": [], "deadline_seconds": None}
+_ROUTE_FIELDS = tuple(_EMPTY_ROUTE)
+
+_active_routes: Dict[str, Dict] = {}
+_routes_meta: Dict = {"updated_at": None, "updated_by": None}
+
+
+def get_feature_route_sync(feature: str) -> Dict:
+    """
+    Synchronous accessor for one feature's route
+    ({"model", "max_tokens", "fallbacks", "deadline_seconds"}).
+    Called by ai_provider_service on every call — no DB hit. Unknown
+    features get an empty route (call-site defaults apply).
+    """
+    routes = _active_routes or FEATURE_ROUTE_DEFAULTS
+    return routes.get(feature) or {}
+
+
+def _merge_routes(overrides: Optional[Dict]) -> Dict[str, Dict]:
+    merged = {f: {**_EMPTY_ROUTE, **r} for f, r in FEATURE_ROUTE_DEFAULTS.items()}
+    for feature, route in (overrides or {}).items():
+        if feature in merged and isinstance(route, dict):
+            merged[feature].update({k: route.get(k) for k in _ROUTE_FIELDS if k in route})
+    return merged
+
+
+async def get_feature_routes() -> Dict:
+    """Reads the routing table from DB, refreshes the sync copy, returns it with metadata."""
+    global _active_routes, _routes_meta
+
+    try:
+        doc = await mongo.admin_settings.find_one({"_id": "claude_routing"})
+    except Exception as e:
+        logger.warning(f"Could not read claude_routing from DB: {e}")
+        doc = None
+
+    _active_routes = _merge_routes(doc.get("routes") if doc else None)
+    _routes_meta = {
+        "updated_at": doc.get("updated_at") if doc else None,
+        "updated_by": doc.get("updated_by") if doc else None,
+    }
+    return {"routes": _active_routes, **_routes_meta}
+
+
+def validate_feature_routes(routes: Dict[str, Dict]) -> Dict[str, Dict]:
+    """
+    Normalises an admin update. Raises ValueError on unknown features/models.
+    fallbacks / deadline_seconds left as None keep their current value;
+    [] / 0 clear them.
+    """
+    model_ids = {m["id"] for m in AVAILABLE_MODELS}
+    clean: Dict[str, Dict] = {}
+    for feature, route in routes.items():
+        if feature not in FEATURE_ROUTE_DEFAULTS:
+            raise ValueError(f"Unknown feature: {feature}")
+        current = get_feature_route_sync(feature)
+        model = route.get("model") or None
+        max_tokens = route.get("max_tokens") or None
+        fallbacks = route.get("fallbacks")
+        fallbacks = list(current.get("fallbacks") or []) if fallbacks is None else list(fallbacks)
+        deadline = route.get("deadline_seconds")
+        deadline = current.get("deadline_seconds") if deadline is None else (deadline or None)
+        if model is not None and model not in model_ids:
+            raise ValueError(f"Unknown model for {feature}: {model}")
+        if max_tokens is not None and not (1 <= int(max_tokens) <= _MAX_ROUTE_TOKENS):
+            raise ValueError(f"max_tokens for {feature} must be between 1 and {_MAX_ROUTE_TOKENS}")
+        unknown = [m for m in fallbacks if m not in model_ids]
+        if unknown:
+            raise ValueError(f"Unknown fallback model for {feature}: {', '.join(unknown)}")
+        if len(set(fallbacks)) != len(fallbacks) or (model and model in fallbacks):
+            raise ValueError(f"Fallback chain for {feature} repeats a model")
+        if deadline is not None and not (1 <= float(deadline) <= _MAX_ROUTE_DEADLINE_SECONDS):
+            raise ValueError(f"deadline_seconds for {feature} must be between 1 and {_MAX_ROUTE_DEADLINE_SECONDS}")
+        clean[feature] = {
+            "model":            model,
+            "max_tokens":       int(max_tokens) if max_tokens else None,
+            "fallbacks":        fallbacks,
+            "deadline_seconds": float(deadline) if deadline else None,
+        }
+    return clean
+
+
+async def save_feature_routes(routes: Dict[str, Dict], admin_email: str) -> Dict:
+    """Upserts the given feature routes (others keep their current value); active immediately."""
+    global _active_routes, _routes_meta
+
+    clean = validate_feature_routes(routes)
+    now = datetime.utcnow()
+    await mongo.admin_settings.update_one(
+        {"_id": "claude_routing"},
+        {"$set": {
+            **{f"routes.{feature}": route for feature, route in clean.items()},
+            "updated_at": now,
+            "updated_by": admin_email,
+        }},
+        upsert=True,
+    )
+
+    base = _active_routes or _merge_routes(None)
+    _active_routes = {**base, **clean}
+    _routes_meta = {"updated_at": now, "updated_by": admin_email}
+
+    logger.info(f"Claude routing saved by {admin_email}: {clean}, active immediately")
+    return {"routes": _active_routes, **_routes_meta}
@@ -141,29 +141,58 @@ class CreditsService:
                 "created_at":    datetime.utcnow(),
             })
 
+    @staticmethod
+    def current_log_id() -> Optional[ObjectId]:
+        """credits_log _id of this request's last deduction (for work handed to a background job)."""
+        return _current_log_id_var.get()
+
+    @staticmethod
+    def bind_log(log_id: Optional[ObjectId]) -> None:
+        """
+        Attribute the AI tokens spent from here on to log_id — a deduction
+        made by another request (background jobs, see ai_jobs.py).
+        """
+        from app.services.ai_provider_service import reset_request_tokens
+
+        _current_log_id_var.set(log_id)
+        reset_request_tokens()
+
     @staticmethod
     async def commit_ai_tokens() -> None:
         """
         Persist the tokens accumulated by call_claude() during this request
         onto the credits_log entry created by the matching deduct_credits().
         Safe to call when no AI call happened — it's a no-op then.
+        Calls served from the response cache spent no tokens; they are
+        recorded as ai_cache_hits so the log shows why the counts are 0.
+        ai_model / ai_models record which model(s) answered, ai_fallbacks how
+        many calls a fallback model served.
         """
-        from app.services.ai_provider_service import get_request_tokens, reset_request_tokens
+        from app.services.ai_provider_service import get_request_tokens, get_request_models, reset_request_tokens
 
         log_id = _current_log_id_var.get()
         tokens = get_request_tokens()
+        served = get_request_models()
         if log_id is None:
             return
-        if not tokens["input"] and not tokens["output"]:
+        if not any(tokens.values()):
             return
+        update = {
+            "input_tokens":          tokens["input"],
+            "output_tokens":         tokens["output"],
+            "cache_read_tokens":     tokens["cache_read"],
+            "cache_creation_tokens": tokens["cache_creation"],
+        }
+        if tokens["cache_hits"]:
+            update["ai_cache_hits"] = tokens["cache_hits"]
+        if served["models"]:
+            # Model(s) that actually answered — differs from the route when a fallback served
+            update["ai_model"] = max(served["models"], key=served["models"].get)
+            update["ai_models"] = served["models"]
+            if served["fallbacks"]:
+                update["ai_fallbacks"] = served["fallbacks"]
         try:
-            await mongo.credits_log.update_one(
-                {"_id": log_id},
-                {"$set": {
-                    "input_tokens":  tokens["input"],
-                    "output_tokens": tokens["output"],
-                }},
-            )
+            await mongo.credits_log.update_one({"_id": log_id}, {"$set": update})
         except Exception as e:
             logger.warning(f"commit_ai_tokens failed for log {log_id}: {e}")
         finally:
@@ -180,6 +209,8 @@ class CreditsService:
         input_tokens:  int = 0,
         output_tokens: int = 0,
         provider:      str = None,
+        cache_read_tokens:     int = 0,
+        cache_creation_tokens: int = 0,
     ) -> None:
         from app.services.ai_provider_service import get_active_provider_sync
 
@@ -201,6 +232,8 @@ class CreditsService:
             "provider":      provider or get_active_provider_sync(),
             "input_tokens":  input_tokens or 0,
             "output_tokens": output_tokens or 0,
+            "cache_read_tokens":     cache_read_tokens or 0,
+            "cache_creation_tokens": cache_creation_tokens or 0,
             "created_at":    datetime.utcnow(),
         })
 
@@ -5,6 +5,11 @@ Runs once daily (via APScheduler at 6 AM IST).
 For every user, determines their job interests and fetches fresh jobs,
 storing results in the `daily_job_feed` collection (TTL: 25 hours).
 
+Ranking: with daily_refresh_batch_mode (default) every interest is scraped
+first and all ranking prompts go out as one Claude Message Batch; results
+are fanned back into job_lists / daily_job_feed. Otherwise each interest is
+ranked inline, one call at a time.
+
 Interest priority:
   1. job_preferences embedded in user doc (desired_role + preferred_location)
   2. Last 3 distinct searches from job_lists
@@ -13,10 +18,23 @@ Interest priority:
 
 import asyncio
 from datetime import datetime, timezone
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
+from app.config import settings
 from app.services.mongo import mongo
-from app.services.job_recommendation_service import job_recommendation_service
+from app.services.ai_provider_service import (
+    set_ai_user,
+    PRIORITY_BACKGROUND,
+    call_ai_async,
+    run_json_batch,
+)
+from app.services.job_recommendation_service import (
+    job_recommendation_service,
+    _ranking_prompt,
+    _apply_ranking,
+    RANKING_TEMPERATURE,
+    RANKING_MAX_TOKENS,
+)
 from app.models.job.listed_job import JobRecommendRequest
 
 
@@ -76,11 +94,44 @@ async def _get_user_interests(user: dict) -> List[Tuple[str, str, str]]:
     return results
 
 
+def _build_payload(search_term: str, location: str, work_type: str) -> JobRecommendRequest:
+    is_remote = True if work_type == "remote" else (False if work_type == "on-site" else None)
+    return JobRecommendRequest(
+        search_term=search_term,
+        location=location,
+        sites=["indeed", "linkedin", "google"],
+        is_remote=is_remote,
+        results_per_site=15,
+        hours_old=24,
+        include_naukri=True,
+        naukri_pages=1,
+        top_n=10,
+    )
+
+
+async def _store_feed(user_id: str, search_term: str, location: str, jobs: list):
+    # Delete existing feed entry for this user+search to avoid duplicates
+    await mongo.daily_job_feed.delete_many({
+        "user_id": user_id,
+        "search_term": search_term,
+        "location": location,
+    })
+
+    # Insert fresh results
+    await mongo.daily_job_feed.insert_one({
+        "user_id": user_id,
+        "search_term": search_term,
+        "location": location,
+        "jobs": jobs,
+        "created_at": datetime.now(timezone.utc),
+    })
+
+    print(f"[DailyCron] Stored {len(jobs)} jobs for user {user_id} — '{search_term}' in {location}")
+
+
 async def _fetch_and_store(user_id: str, search_term: str, location: str, work_type: str):
     """Scrape + rank jobs for one (user, search_term, location) and store in daily_job_feed."""
     try:
-        is_remote = True if work_type == "remote" else (False if work_type == "on-site" else None)
-
         # Get resume_id for this user
         try:
             resume_id = await job_recommendation_service.get_resume_id_for_user(user_id)
@@ -88,58 +139,91 @@ async def _fetch_and_store(user_id: str, search_term: str, location: str, work_t
             print(f"[DailyCron] No resume for user {user_id}, skipping")
             return
 
-        payload = JobRecommendRequest(
-            search_term=search_term,
-            location=location,
-            sites=["indeed", "linkedin", "google"],
-            is_remote=is_remote,
-            results_per_site=15,
-            hours_old=24,
-            include_naukri=True,
-            naukri_pages=1,
-            top_n=10,
-        )
-
         result = await job_recommendation_service.recommend_jobs(
             user_id=user_id,
             resume_id=resume_id,
-            payload=payload,
+            payload=_build_payload(search_term, location, work_type),
         )
 
         jobs = result.get("jobs", [])
         if not jobs:
             return
 
-        # Delete existing feed entry for this user+search to avoid duplicates
-        await mongo.daily_job_feed.delete_many({
-            "user_id": user_id,
-            "search_term": search_term,
-            "location": location,
-        })
+        await _store_feed(user_id, search_term, location, jobs)
 
-        # Insert fresh results
-        await mongo.daily_job_feed.insert_one({
-            "user_id": user_id,
-            "search_term": search_term,
-            "location": location,
-            "jobs": jobs,
-            "created_at": datetime.now(timezone.utc),
-        })
+    except Exception as e:
+        print(f"[DailyCron] Error for user {user_id} / '{search_term}': {e}")
 
-        print(f"[DailyCron] Stored {len(jobs)} jobs for user {user_id} — '{search_term}' in {location}")
 
+async def _collect(user_id: str, search_term: str, location: str, work_type: str) -> Optional[dict]:
+    """Batch mode step 1: scrape one interest and build its ranking prompt."""
+    try:
+        try:
+            resume_id = await job_recommendation_service.get_resume_id_for_user(user_id)
+        except Exception:
+            print(f"[DailyCron] No resume for user {user_id}, skipping")
+            return None
+
+        payload = _build_payload(search_term, location, work_type)
+        resume_text, candidates, total_scraped = await job_recommendation_service.collect_candidates(
+            user_id, resume_id, payload,
+        )
+        if not candidates:
+            return None
+
+        prompt, compact = _ranking_prompt(resume_text, candidates)
+        return {
+            "user_id": user_id, "resume_id": resume_id, "payload": payload,
+            "search_term": search_term, "location": location,
+            "total_scraped": total_scraped, "prompt": prompt, "compact": compact,
+        }
     except Exception as e:
-        print(f"[DailyCron] Error for user {user_id} / '{search_term}': {e}")
+        print(f"[DailyCron] Error collecting for user {user_id} / '{search_term}': {e}")
+        return None
+
+
+async def _rank_batched(items: List[dict]):
+    """Batch mode steps 2-3: one Message Batch for every prompt, then fan out.
+    Prompts the batch didn't answer fall back to a normal (background) call."""
+    prompts = {f"rank-{i}": item["prompt"] for i, item in enumerate(items)}
+    results = await run_json_batch(
+        prompts,
+        temperature=RANKING_TEMPERATURE,
+        max_tokens=RANKING_MAX_TOKENS,
+        feature="job_ranking",
+    )
+    print(f"[DailyCron] Batch answered {len(results)}/{len(prompts)} ranking prompts")
+
+    for custom_id, item in zip(prompts, items):
+        user_id, search_term = item["user_id"], item["search_term"]
+        try:
+            data = results.get(custom_id)
+            if data is None:
+                set_ai_user(user_id, PRIORITY_BACKGROUND)
+                data = await call_ai_async(
+                    item["prompt"], temperature=RANKING_TEMPERATURE,
+                    max_tokens=RANKING_MAX_TOKENS, cache=True, feature="job_ranking",
+                )
+            jobs = _apply_ranking(data, item["compact"], item["payload"].top_n)
+            await job_recommendation_service.store_ranked(
+                user_id, item["resume_id"], item["payload"], jobs, item["total_scraped"],
+            )
+            if jobs:
+                await _store_feed(user_id, search_term, item["location"], jobs)
+        except Exception as e:
+            print(f"[DailyCron] Error ranking for user {user_id} / '{search_term}': {e}")
 
 
 async def run_daily_job_refresh():
     """Main entry point — called by APScheduler at 6 AM IST every day."""
     print("[DailyCron] Starting daily job refresh...")
     start = datetime.now(timezone.utc)
+    batch_mode = settings.daily_refresh_batch_mode
+    batch_items: List[dict] = []
 
     try:
         users = await mongo.users.find({}).to_list(None)
-        print(f"[DailyCron] Processing {len(users)} users")
+        print(f"[DailyCron] Processing {len(users)} users ({'batch' if batch_mode else 'sequential'} ranking)")
 
         for user in users:
             user_id = str(user["_id"])
@@ -148,11 +232,21 @@ async def run_daily_job_refresh():
             if not interests:
                 continue
 
+            # Cron ranking yields Claude slots to interactive traffic
+            set_ai_user(user_id, PRIORITY_BACKGROUND)
             for search_term, location, work_type in interests:
-                await _fetch_and_store(user_id, search_term, location, work_type)
+                if batch_mode:
+                    item = await _collect(user_id, search_term, location, work_type)
+                    if item:
+                        batch_items.append(item)
+                else:
+                    await _fetch_and_store(user_id, search_term, location, work_type)
                 # Small delay to avoid hammering external APIs
                 await asyncio.sleep(2)
 
+        if batch_items:
+            await _rank_batched(batch_items)
+
     except Exception as e:
         print(f"[DailyCron] Fatal error: {e}")
 
@@ -1,36 +1,177 @@
 # app/services/incoming_resume_service.py
-from app.services.mongo import mongo
+"""
+The user's current resume: extracted_data lives in incoming_resumes, the
+original upload (base64 PDF or plain text, often megabytes — or the PDF
+itself for multipart uploads) in the resume_files GridFS bucket, referenced
+by raw_input_id. Readers that only need extracted fields never pull the file.
+
+Prompt builders read `context` (see resume_context.py) — the flattened text,
+summary and skill set computed once per saved version — via get_context().
+"""
+import os
+import base64
+import logging
 from datetime import datetime
-from typing import Dict, Optional
+from typing import BinaryIO, Dict, Optional
+
+from bson import ObjectId
+from gridfs.errors import NoFile
+
+from app.services.mongo import mongo
+from app.services.resume_context import build_resume_context, is_current
+
+logger = logging.getLogger(__name__)
+
+# What GET /api/incoming-resume returns — not the upload (GridFS, opt-in via
+# get_raw_input) nor internals (raw_input_id, fingerprint, context)
+PUBLIC_PROJECTION = {"user_id": 1, "extracted_data": 1, "raw_input_size": 1, "created_at": 1, "updated_at": 1}
+
+# Plain-text fields of older documents, used when there is no extracted_data
+_TEXT_FIELDS = ["raw_text", "extracted_text", "content", "full_text", "text"]
 
 
 class IncomingResumeService:
+    @staticmethod
+    async def _store_raw_input(user_id: str, raw_input: str, fingerprint: Optional[str]) -> ObjectId:
+        is_pdf = raw_input.lstrip()[:30].startswith(("data:application/pdf", "JVBER", "[PDF_FILE_BASE64]"))
+        return await mongo.resume_files.upload_from_stream(
+            f"{user_id}.{'pdf.b64' if is_pdf else 'txt'}",
+            raw_input.encode("utf-8"),
+            metadata={
+                "user_id": user_id,
+                "fingerprint": fingerprint,
+                "content_type": "application/pdf;base64" if is_pdf else "text/plain",
+            },
+        )
+
+    @staticmethod
+    async def _store_raw_file(user_id: str, raw_file: BinaryIO, fingerprint: Optional[str]) -> ObjectId:
+        """A PDF uploaded as a file (resume_upload.py): streamed into GridFS as-is."""
+        return await mongo.resume_files.upload_from_stream(
+            f"{user_id}.pdf",
+            raw_file,
+            metadata={"user_id": user_id, "fingerprint": fingerprint, "content_type": "application/pdf"},
+        )
+
+    @staticmethod
+    async def _delete_raw_input(file_id: Optional[ObjectId]) -> None:
+        if not file_id:
+            return
+        try:
+            await mongo.resume_files.delete(file_id)
+        except Exception as e:  # gridfs.errors.NoFile, or a transient error — orphan is harmless
+            logger.warning(f"Could not delete resume file {file_id}: {e}")
+
     @staticmethod
     async def save_or_update(
         user_id: str,
-        raw_input: str,
-        extracted_data: Dict
+        raw_input: Optional[str],
+        extracted_data: Dict,
+        fingerprint: Optional[str] = None,
+        raw_file: Optional[BinaryIO] = None,
     ) -> None:
+        """raw_input is the upload as sent in JSON; raw_file an uploaded PDF file (then raw_input is None)."""
         now = datetime.utcnow()
 
+        previous = await mongo.incoming_resumes.find_one({"user_id": user_id}, {"raw_input_id": 1})
+        if raw_file is not None:
+            raw_input_id = await IncomingResumeService._store_raw_file(user_id, raw_file, fingerprint)
+            raw_input_size = os.fstat(raw_file.fileno()).st_size
+        else:
+            raw_input_id = await IncomingResumeService._store_raw_input(user_id, raw_input, fingerprint)
+            raw_input_size = len(raw_input)
+
         await mongo.incoming_resumes.update_one(  # ← use the new property
             {"user_id": user_id},
             {
                 "$set": {
-                    "raw_input": raw_input,
+                    "raw_input_id": raw_input_id,
+                    "raw_input_size": raw_input_size,
                     "extracted_data": extracted_data,
+                    "fingerprint": fingerprint,
+                    "context": build_resume_context(extracted_data),
                     "updated_at": now
                 },
+                "$unset": {"raw_input": ""},
                 "$setOnInsert": {
                     "created_at": now
                 }
             },
             upsert=True
         )
+        await IncomingResumeService._delete_raw_input((previous or {}).get("raw_input_id"))
 
     @staticmethod
-    async def get_latest(user_id: str) -> Optional[Dict]:
-        return await mongo.incoming_resumes.find_one(  # ← same property
+    async def get_latest(user_id: str, include_raw: bool = False) -> Optional[Dict]:
+        """The user's resume in its public shape; include_raw adds the original upload as raw_input."""
+        doc = await mongo.incoming_resumes.find_one(  # ← same property
             {"user_id": user_id},
+            PUBLIC_PROJECTION,
             sort=[("updated_at", -1)]
-        )
\ No newline at end of file
+        )
+        if doc and include_raw:
+            doc["raw_input"] = await IncomingResumeService.get_raw_input(user_id)
+        return doc
+
+    @staticmethod
+    async def get_raw_input(user_id: str) -> Optional[str]:
+        """
+        The original upload, from GridFS (or inline on pre-GridFS documents).
+        PDFs uploaded as files come back as a base64 data URI, like JSON uploads.
+        None when the file is gone (a concurrent save_or_update replaced it).
+        """
+        doc = await mongo.incoming_resumes.find_one({"user_id": user_id}, {"raw_input_id": 1, "raw_input": 1})
+        if not doc:
+            return None
+        if not doc.get("raw_input_id"):
+            return doc.get("raw_input")
+        try:
+            stream = await mongo.resume_files.open_download_stream(doc["raw_input_id"])
+            data = await stream.read()
+        except NoFile:
+            logger.warning(f"Resume file {doc['raw_input_id']} of {user_id} is gone")
+            return None
+        if (stream.metadata or {}).get("content_type") == "application/pdf":
+            return "data:application/pdf;base64," + base64.b64encode(data).decode("ascii")
+        return data.decode("utf-8")
+
+    @staticmethod
+    async def find_by_fingerprint(user_id: str, fingerprint: str) -> Optional[Dict]:
+        """The user's stored extraction if it was made from the same resume text."""
+        doc = await mongo.incoming_resumes.find_one(
+            {"user_id": user_id, "fingerprint": fingerprint},
+            {"extracted_data": 1},
+        )
+        return doc.get("extracted_data") if doc else None
+
+    @staticmethod
+    async def get_context(user_id: str, resume_id: Optional[ObjectId] = None) -> Optional[Dict]:
+        """
+        The materialized resume context of the user's resume (or of resume_id).
+        Documents saved before contexts existed, or with an older
+        CONTEXT_VERSION, get theirs built and stored on first read.
+        """
+        query: Dict = {"user_id": user_id}
+        if resume_id is not None:
+            query["_id"] = resume_id
+        doc = await mongo.incoming_resumes.find_one(query, {"context": 1, "updated_at": 1}, sort=[("updated_at", -1)])
+        if not doc:
+            return None
+        if is_current(doc.get("context")):
+            return doc["context"]
+
+        source = await mongo.incoming_resumes.find_one(
+            {"_id": doc["_id"]},
+            {"extracted_data": 1, **{field: 1 for field in _TEXT_FIELDS}},
+        ) or {}
+        raw_text = next(
+            (str(source[f]) for f in _TEXT_FIELDS if source.get(f) and not str(source[f]).startswith("[PDF_FILE")),
+            "",
+        )
+        context = build_resume_context(source.get("extracted_data"), raw_text)
+        # Guarded on updated_at so a concurrent save_or_update is never overwritten
+        await mongo.incoming_resumes.update_one(
+            {"_id": doc["_id"], "updated_at": doc.get("updated_at")},
+            {"$set": {"context": context}},
+        )
+        return context
@@ -4,7 +4,7 @@ import csv as csv_module
 import json
 import asyncio
 import requests
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timezone, timedelta
 from functools import partial
 
@@ -14,6 +14,8 @@ from bs4 import BeautifulSoup
 from bson import ObjectId
 from app.config import settings
 from app.services.mongo import mongo
+from app.services.incoming_resume_service import IncomingResumeService
+from app.services.prompt_budget import fit_resume, fit_job_description
 
 MAX_DESC_CHARS     = 800
 MAX_JOBS_TO_AI = 20
@@ -312,14 +314,14 @@ def _scrape_naukri_raw_sync(
 # ─────────────────────────────────────────
 # AI RANKING + SUMMARIZATION
 # ─────────────────────────────────────────
-def _rank_and_summarize_sync(
+def _ranking_prompt(
     resume_text: str,
     jobs:        List[Dict[str, Any]],
-    top_n:       int,
-) -> List[Dict[str, Any]]:
-
-    from app.services.ai_provider_service import call_ai
-
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """Build the ranking prompt. Returns (prompt, compact job list keyed by id).
+    Ranking needs skills + recent roles, not the whole resume; job descriptions
+    lose their boilerplate before being cut to the per-job budget."""
+    resume_text, _ = fit_resume(resume_text, settings.prompt_budget_ranking_resume_tokens)
     compact = []
     for i, j in enumerate(jobs, start=1):
         compact.append({
@@ -334,7 +336,9 @@ def _rank_and_summarize_sync(
             "site":        j.get("site", ""),
             "job_url":     j.get("job_url", ""),
             "date_posted": j.get("date_posted", ""),
-            "description": j.get("description", "")[:MAX_DESC_CHARS],
+            "description": fit_job_description(
+                j.get("description", ""), settings.prompt_budget_ranking_job_tokens,
+            )[0],
         })
 
     prompt = f"""
@@ -380,8 +384,20 @@ CANDIDATE RESUME:
 JOBS LIST:
 {json.dumps(compact, ensure_ascii=False)}
 """.strip()
+    return prompt, compact
+
 
-    data = call_ai(prompt, temperature=0.2, max_tokens=4096)
+# Shared by the interactive path and the daily-cron batch path
+RANKING_TEMPERATURE = 0.2
+RANKING_MAX_TOKENS  = 4096
+
+
+def _apply_ranking(
+    data:    Dict[str, Any],
+    compact: List[Dict[str, Any]],
+    top_n:   int,
+) -> List[Dict[str, Any]]:
+    """Merge the model's ranking back onto the compact jobs, best first."""
     if "error" in data:
         raise RuntimeError(f"AI ranking failed: {data.get('message', 'unknown error')}")
 
@@ -398,6 +414,19 @@ JOBS LIST:
     return enriched[:top_n]
 
 
+def _rank_and_summarize_sync(
+    resume_text: str,
+    jobs:        List[Dict[str, Any]],
+    top_n:       int,
+) -> List[Dict[str, Any]]:
+
+    from app.services.ai_provider_service import call_ai
+
+    prompt, compact = _ranking_prompt(resume_text, jobs)
+    data = call_ai(prompt, temperature=RANKING_TEMPERATURE, max_tokens=RANKING_MAX_TOKENS, cache=True, feature="job_ranking")
+    return _apply_ranking(data, compact, top_n)
+
+
 # ─────────────────────────────────────────
 # ASYNC SERVICE CLASS
 # ─────────────────────────────────────────
@@ -407,6 +436,7 @@ class JobRecommendationService:
     async def get_resume_id_for_user(self, user_id: str) -> str:
         doc = await mongo.incoming_resumes.find_one(
             {"user_id": user_id},
+            {"_id": 1},
             sort=[("created_at", -1)]
         )
         if not doc:
@@ -418,37 +448,14 @@ class JobRecommendationService:
         print(f"[Resume] Auto-fetched resume_id={resume_id} for user={user_id}")
         return resume_id
 
-    # ── Fetch resume text from MongoDB ────────────────
+    # ── Fetch resume text (materialized context) ──────
     async def _get_resume_text(self, resume_id: str, user_id: str) -> str:
-        doc = await mongo.incoming_resumes.find_one({
-            "_id":     ObjectId(resume_id),
-            "user_id": user_id,
-        })
-        if not doc:
+        context = await IncomingResumeService.get_context(user_id, ObjectId(resume_id))
+        if context is None:
             raise ValueError(f"Resume {resume_id} not found for user {user_id}")
-
-        extracted = doc.get("extracted_data")
-        if extracted and isinstance(extracted, dict):
-            parts = []
-            for key, val in extracted.items():
-                if val:
-                    if isinstance(val, list):
-                        parts.append(f"{key}: {', '.join(str(v) for v in val)}")
-                    elif isinstance(val, dict):
-                        parts.append(f"{key}: {json.dumps(val)}")
-                    else:
-                        parts.append(f"{key}: {val}")
-            if parts:
-                return "\n".join(parts)
-
-        for field in ["raw_text", "extracted_text", "content", "full_text", "text"]:
-            if doc.get(field) and not str(doc[field]).startswith("[PDF_FILE"):
-                return str(doc[field])
-
-        raise ValueError(
-            f"Resume {resume_id} has no extractable text. "
-            f"Available fields: {list(doc.keys())}"
-        )
+        if not context["prompt_text"]:
+            raise ValueError(f"Resume {resume_id} has no extractable text.")
+        return context["prompt_text"]
 
     # ── Save to DB ────────────────────────────────────
     async def save_results(
@@ -513,6 +520,34 @@ class JobRecommendationService:
         payload:   Any,
     ) -> Dict[str, Any]:
 
+        resume_text, filtered, total_scraped = await self.collect_candidates(user_id, resume_id, payload)
+        if total_scraped == 0:
+            return {
+                "success":        False,
+                "list_id":        "",
+                "total_scraped":  0,
+                "total_returned": 0,
+                "jobs":           [],
+            }
+
+        # 5. Rank + summarize with Claude (to_thread copies the context, so the
+        #    call is scheduled as this user's / the cron's work)
+        top_jobs = await asyncio.to_thread(
+            _rank_and_summarize_sync, resume_text, filtered, payload.top_n
+        )
+
+        return await self.store_ranked(user_id, resume_id, payload, top_jobs, total_scraped)
+
+    # ── Steps 1-4: resume text + scrape + dedupe ──────
+    async def collect_candidates(
+        self,
+        user_id:   str,
+        resume_id: str,
+        payload:   Any,
+    ) -> Tuple[str, List[Dict[str, Any]], int]:
+        """Returns (resume_text, jobs to rank, total scraped). Used directly by
+        the daily cron, which ranks all users' candidates in one batch."""
+
         # 1. Get resume text
         resume_text = await self._get_resume_text(resume_id, user_id)
 
@@ -573,13 +608,7 @@ class JobRecommendationService:
         )
 
         if total_scraped == 0:
-            return {
-                "success":        False,
-                "list_id":        "",
-                "total_scraped":  0,
-                "total_returned": 0,
-                "jobs":           [],
-            }
+            return resume_text, [], 0
 
         # 4. Pre-filter: deduplicate by URL + cap to MAX_JOBS_TO_AI
         seen_urls = set()
@@ -592,12 +621,17 @@ class JobRecommendationService:
 
         filtered = filtered[:MAX_JOBS_TO_AI]
         print(f"[JobRecommend] Sending {len(filtered)} jobs to Claude (capped from {total_scraped})")
+        return resume_text, filtered, total_scraped
 
-        # 5. Rank + summarize with Claude
-        top_jobs = await loop.run_in_executor(
-            None,
-            partial(_rank_and_summarize_sync, resume_text, filtered, payload.top_n)
-        )
+    # ── Step 6: persist ranked jobs ───────────────────
+    async def store_ranked(
+        self,
+        user_id:       str,
+        resume_id:     str,
+        payload:       Any,
+        top_jobs:      List[Dict[str, Any]],
+        total_scraped: int,
+    ) -> Dict[str, Any]:
 
         # 6. Save to MongoDB
         list_id = await self.save_results(
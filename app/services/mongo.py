@@ -1,4 +1,4 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
 from app.config import settings
 
 
@@ -7,6 +7,7 @@ class MongoService:
     def __init__(self):
         self.client = None
         self.db     = None
+        self._resume_files = None
 
     async def connect(self):
         try:
@@ -50,6 +51,30 @@ class MongoService:
             await self.db.chat_sessions.create_index([("user_id", 1), ("updated_at", -1)])
             print("✅ Chat sessions indexes created")
 
+            # ── Incoming resumes (one per user; files in GridFS resume_files) ──
+            await self.db.incoming_resumes.create_index([("user_id", 1), ("created_at", -1)])
+            print("✅ Incoming resume indexes created")
+
+            # ── Tailored-section cache (services/tailor_sections.py) ──
+            await self.db.tailor_section_cache.create_index([("section_hash", 1), ("model", 1), ("created_at", -1)])
+            await self.db.tailor_section_cache.create_index(
+                [("created_at", 1)], expireAfterSeconds=settings.ai_cache_ttl_seconds
+            )
+
+            # ── Background AI jobs (services/ai_jobs.py) ──
+            await self.db.ai_jobs.create_index([("status", 1), ("created_at", 1)])
+            await self.db.ai_jobs.create_index([("user_id", 1), ("created_at", -1)])
+            await self.db.ai_jobs.create_index(
+                [("created_at", 1)], expireAfterSeconds=settings.ai_job_ttl_seconds
+            )
+            print("✅ AI job indexes created")
+
+            # ── AI response cache (keyed by _id = prompt hash) ──
+            await self.db.ai_response_cache.create_index(
+                [("created_at", 1)], expireAfterSeconds=settings.ai_cache_ttl_seconds
+            )
+            print("✅ AI response cache indexes created")
+
         except Exception as e:
             print(f"MongoDB connection failed: {str(e)}")
             raise
@@ -110,6 +135,13 @@ class MongoService:
     def incoming_resumes(self):
         return self.db.incoming_resumes
 
+    @property
+    def resume_files(self):
+        """GridFS bucket with the original uploads behind incoming_resumes.raw_input_id."""
+        if self._resume_files is None:
+            self._resume_files = AsyncIOMotorGridFSBucket(self.db, bucket_name="resume_files")
+        return self._resume_files
+
     @property
     def listed_jobs(self):
         return self.db.listed_jobs
@@ -174,5 +206,17 @@ class MongoService:
     def star_stories(self):
         return self.db.star_stories
 
+    @property
+    def ai_response_cache(self):
+        return self.db.ai_response_cache
+
+    @property
+    def tailor_section_cache(self):
+        return self.db.tailor_section_cache
+
+    @property
+    def ai_jobs(self):
+        return self.db.ai_jobs
+
 
 mongo = MongoService()
@@ -0,0 +1,272 @@
+"""
+PDF → text for resume uploads, off the event loop and page-parallel.
+
+Pages are split into contiguous ranges and extracted in a process pool
+(pdf_extract_workers, default one per core), so a large upload neither
+blocks other requests nor holds the GIL of the API process.
+
+Per page:
+  1. pypdfium2 text extraction      (fast path, ~10× pdfplumber)
+  2. pdfplumber extract_text()      (fallback when pdfium's text looks broken —
+                                     empty, replacement characters, glued words —
+                                     or always with pdf_extract_engine="pdfplumber")
+then the spacing fixes for glued tokens ("SeniorEngineer2021" → "Senior Engineer 2021").
+
+The PDF is given as bytes or as the path of a file on disk (multipart
+uploads spooled by resume_upload.py); with a path each worker opens the file
+itself, so the document is never copied into the pool.
+
+Exported callables:
+  start_pdf_workers()            → sync  → None   (startup: spawn + warm the pool)
+  shutdown_pdf_workers()         → sync  → None   (shutdown)
+  extract_pdf_text(pdf)          → async → Dict   (pdf = bytes or file path)
+  extract_pdf_text_sync(pdf)     → sync  → Dict   (scripts / thread pools)
+
+Dict = {"text": str, "pages": [{"page", "engine", "chars", "ms"}], "ms": float}
+"""
+
+import io
+import os
+import re
+import time
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple, Union
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PdfSource = Union[bytes, str]  # the document, or the path of a PDF file
+
+
+# ── Worker side (runs in the pool processes) ─────────────────
+_SPACING_FIXES = [
+    (re.compile(r"([a-z])([A-Z])"), r"\1 \2"),
+    (re.compile(r"([a-zA-Z])(\()"), r"\1 \2"),
+    (re.compile(r"(\))([a-zA-Z])"), r"\1 \2"),
+    (re.compile(r"([a-zA-Z])(\d)"), r"\1 \2"),
+    (re.compile(r"(\d)([a-zA-Z])"), r"\1 \2"),
+]
+
+
+def _normalize(text: str) -> str:
+    for pattern, repl in _SPACING_FIXES:
+        text = pattern.sub(repl, text)
+    return text
+
+
+def _looks_broken(text: str) -> bool:
+    """pdfium text that pdfplumber's layout analysis usually gets right."""
+    stripped = text.strip()
+    if not stripped:
+        return True
+    if stripped.count("�") > len(stripped) * 0.01:
+        return True
+    # Positioned glyphs without space characters come out as one long word
+    return len(stripped) > 200 and sum(c.isspace() for c in stripped) < len(stripped) * 0.05
+
+
+def _plumber_open(source: PdfSource):
+    import pdfplumber
+    return pdfplumber.open(source if isinstance(source, str) else io.BytesIO(source))
+
+
+def _pdfium_pages(source: PdfSource, start: int, stop: int) -> List[str]:
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(source)
+    try:
+        out = []
+        for index in range(start, stop):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            out.append(textpage.get_text_range().replace("\r\n", "\n").replace("\r", "\n"))
+            textpage.close()
+            page.close()
+        return out
+    finally:
+        pdf.close()
+
+
+def _extract_range(source: PdfSource, start: int, stop: int, engine: str) -> List[Dict]:
+    """Pages [start, stop) → [{"page", "engine", "text", "chars", "ms"}]. Pool entry point."""
+    fast: List[str] = []
+    fast_ms = 0.0
+    if engine != "pdfplumber":
+        started = time.perf_counter()
+        try:
+            fast = _pdfium_pages(source, start, stop)
+        except Exception:
+            fast = []  # pdfium can't open it — every page goes to pdfplumber
+        fast_ms = (time.perf_counter() - started) * 1000 / max(1, stop - start)
+
+    pages = []
+    plumber = None  # opened on the first fallback page, once per range
+    try:
+        for offset, index in enumerate(range(start, stop)):
+            started = time.perf_counter()
+            text, used = (fast[offset], "pdfium") if offset < len(fast) else ("", "pdfplumber")
+            if used == "pdfium" and _looks_broken(text):
+                used = "pdfplumber"
+            if used == "pdfplumber":
+                if plumber is None:
+                    plumber = _plumber_open(source)
+                text = plumber.pages[index].extract_text() or ""
+            text = _normalize(text.strip())
+            ms = (time.perf_counter() - started) * 1000 + (fast_ms if offset < len(fast) else 0.0)
+            pages.append({"page": index + 1, "engine": used, "text": text, "chars": len(text), "ms": round(ms, 1)})
+    finally:
+        if plumber is not None:
+            plumber.close()
+    return pages
+
+
+def _page_count(source: PdfSource) -> int:
+    try:
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(source)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    except Exception:
+        with _plumber_open(source) as pdf:
+            return len(pdf.pages)
+
+
+def _warm() -> bool:
+    import pdfplumber  # noqa: F401 — pay the import once per worker, not per upload
+    try:
+        import pypdfium2  # noqa: F401
+    except ImportError:
+        pass
+    return True
+
+
+# ── API process side ─────────────────────────────────────────
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+
+
+def _workers() -> int:
+    return settings.pdf_extract_workers or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _pool_size
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool_size = _workers()
+                # spawn: forking a process that runs an event loop + Mongo threads is unsafe
+                _pool = ProcessPoolExecutor(max_workers=_pool_size, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _reset_pool(broken: ProcessPoolExecutor, kill: bool = False) -> None:
+    """Replace the pool. kill=True also terminates its workers — shutdown() alone
+    lets a worker stuck in a pathological PDF keep parsing (and holding its slot)."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    processes = list((getattr(broken, "_processes", None) or {}).values()) if kill else []
+    broken.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+def start_pdf_workers() -> None:
+    """Spawn the pool at startup so the first upload doesn't pay for it."""
+    pool = _get_pool()
+    for _ in range(_pool_size):
+        pool.submit(_warm)
+    logger.info(f"✅ PDF extraction pool started: {_pool_size} workers")
+
+
+def shutdown_pdf_workers() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _ranges(pages: int) -> List[Tuple[int, int]]:
+    """Contiguous page ranges, one per worker (each worker re-opens the document)."""
+    chunks = max(1, min(_pool_size or _workers(), pages))
+    size = -(-pages // chunks)
+    return [(start, min(start + size, pages)) for start in range(0, pages, size)]
+
+
+def _assemble(pages: List[Dict], started: float) -> Dict:
+    pages.sort(key=lambda p: p["page"])
+    text = "\n\n".join(t for t in (p.pop("text") for p in pages) if t)
+    result = {"text": text, "pages": pages, "ms": round((time.perf_counter() - started) * 1000, 1)}
+    timings = ", ".join(f"p{p['page']} {p['engine']} {p['ms']}ms" for p in pages)
+    logger.info(f"PDF text: {len(pages)} pages, {len(text)} chars in {result['ms']}ms ({timings})")
+    return result
+
+
+async def _extract_in(pool: ProcessPoolExecutor, pdf: PdfSource, engine: str) -> List[List[Dict]]:
+    loop = asyncio.get_running_loop()
+    pages = await loop.run_in_executor(pool, _page_count, pdf)
+    return await asyncio.gather(*(
+        loop.run_in_executor(pool, _extract_range, pdf, start, stop, engine)
+        for start, stop in _ranges(pages)
+    ))
+
+
+async def extract_pdf_text(pdf: PdfSource) -> Dict:
+    """
+    Text of every page, extracted in the worker pool (raises on unreadable PDFs).
+    pdf_extract_timeout_seconds covers the page count and every range; on
+    timeout the pool is recycled so the stuck workers stop parsing.
+    """
+    started = time.perf_counter()
+    engine = settings.pdf_extract_engine
+    for attempt in range(2):
+        pool = _get_pool()
+        try:
+            chunks = await asyncio.wait_for(_extract_in(pool, pdf, engine), settings.pdf_extract_timeout_seconds)
+            break
+        except asyncio.TimeoutError:
+            logger.warning(f"PDF extraction timed out after {settings.pdf_extract_timeout_seconds}s — recycling the pool")
+            _reset_pool(pool, kill=True)
+            raise
+        except BrokenProcessPool:
+            _reset_pool(pool)
+            if attempt:
+                raise
+            # Most often another upload's timeout recycled the pool under us — retry once
+    return _assemble([page for chunk in chunks for page in chunk], started)
+
+
+def extract_pdf_text_sync(pdf: PdfSource) -> Dict:
+    """Blocking twin of extract_pdf_text() for sync callers."""
+    started = time.perf_counter()
+    pool = _get_pool()
+    engine = settings.pdf_extract_engine
+    deadline = time.monotonic() + settings.pdf_extract_timeout_seconds
+
+    def remaining() -> float:
+        return max(0.0, deadline - time.monotonic())
+
+    try:
+        pages = pool.submit(_page_count, pdf).result(timeout=remaining())
+        futures = [pool.submit(_extract_range, pdf, start, stop, engine) for start, stop in _ranges(pages)]
+        chunks = [f.result(timeout=remaining()) for f in futures]
+    except FuturesTimeoutError:
+        logger.warning(f"PDF extraction timed out after {settings.pdf_extract_timeout_seconds}s — recycling the pool")
+        _reset_pool(pool, kill=True)
+        raise
+    except BrokenProcessPool:
+        _reset_pool(pool)
+        raise
+    return _assemble([page for chunk in chunks for page in chunk], started)
@@ -0,0 +1,350 @@
+"""
+Local token budgeting + compaction for prompt inputs (resumes, job descriptions).
+
+Counts tokens locally (no API round trip) and shrinks inputs that exceed a
+budget, cheapest loss first:
+  1. whitespace normalisation            (lossless — always applied)
+  2. JD boilerplate removal              (EEO / privacy / "apply now" / repeated lines)
+  3. per-section truncation              (resumes keep contact, skills and the most
+                                          recent experience longest: sections are cut
+                                          to their floors, then below them, lowest
+                                          priority first)
+  4. hard cut at the budget              (last resort — job descriptions)
+
+JSON resumes stay valid JSON: low-value sections and the oldest entries are
+left out first, then long text is shortened. What was left out is reported
+so a tailoring can put it back into its result unchanged.
+
+Exported callables:
+  count_tokens(text)                     → int   (local estimate, ~±10% of Claude's tokenizer)
+  fit_resume(text, max_tokens)           → (text, report)
+  fit_job_description(text, max_tokens)  → (text, report)
+  get_prompt_budget_stats()              → Dict  (per-kind tokens saved since startup)
+
+report = {"tokens_before", "tokens_after", "tokens_saved", "steps": [...]}
+         + "dropped": {"sections": {key: value}, "entries": {key: [entries]}} for JSON resumes
+"""
+
+import re
+import json
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# ── Token estimate ───────────────────────────────────────────
+# Claude's tokenizer isn't available offline. Words cost ~1 token per 4
+# letters, digit runs ~1 per 3 digits, and every other symbol ~1 token.
+_TOKEN_RE = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_+")
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    n = 0
+    for m in _TOKEN_RE.finditer(text):
+        piece = m.group()
+        if piece[0].isdigit():
+            n += (len(piece) + 2) // 3
+        elif piece[0].isalpha():
+            n += (len(piece) + 3) // 4
+        else:
+            n += 1
+    return n
+
+
+# ── Lossless clean-up ────────────────────────────────────────
+_ZERO_WIDTH = re.compile(r"[​‌‍⁠﻿]")
+_INLINE_WS = re.compile(r"[ \t\f\v\xa0]+")
+_BLANK_RUNS = re.compile(r"\n{3,}")
+
+
+def _normalize_whitespace(text: str) -> str:
+    text = _ZERO_WIDTH.sub("", text.replace("\r\n", "\n").replace("\r", "\n"))
+    text = "\n".join(_INLINE_WS.sub(" ", line).strip() for line in text.split("\n"))
+    return _BLANK_RUNS.sub("\n\n", text).strip()
+
+
+# ── JD boilerplate ───────────────────────────────────────────
+# Sentences that never change a match or a tailoring decision.
+_JD_BOILERPLATE = re.compile(
+    r"equal (employment )?opportunit|\beeo\b|affirmative action|without regard to"
+    r"|reasonable accommodation|protected (veteran|characteristic|status)"
+    r"|e-?verify|privacy (policy|notice)|cookie|\bgdpr\b"
+    r"|recruitment fraud|never ask (you )?for (payment|money)"
+    r"|apply (now|today)|easy apply|share this job|similar jobs|report this job"
+    r"|save (this )?job|sign in to|follow us|click here|view all jobs",
+    re.I,
+)
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+def _strip_jd_boilerplate(text: str) -> str:
+    kept: List[str] = []
+    seen = set()
+    for line in text.split("\n"):
+        if not line:
+            kept.append(line)
+            continue
+        key = line.lower()
+        if len(key) > 20 and key in seen:
+            continue  # scraped pages repeat headers / footers
+        seen.add(key)
+        if _JD_BOILERPLATE.search(line):
+            line = " ".join(s for s in _SENTENCE_SPLIT.split(line) if not _JD_BOILERPLATE.search(s))
+            if not line:
+                continue
+        kept.append(line)
+    return _BLANK_RUNS.sub("\n\n", "\n".join(kept)).strip()
+
+
+# ── Truncation ───────────────────────────────────────────────
+_TRUNCATED = "[…]"
+
+
+def _truncate_lines(text: str, max_tokens: int) -> str:
+    """Keep whole leading lines within max_tokens (head = most recent on a resume)."""
+    if max_tokens <= 0:
+        return ""
+    out: List[str] = []
+    used = 0
+    for line in text.split("\n"):
+        cost = count_tokens(line) + 1
+        if used + cost > max_tokens:
+            if not out:  # a single huge line — cut by characters
+                out.append(line[: max_tokens * 4])
+            out.append(_TRUNCATED)
+            break
+        out.append(line)
+        used += cost
+    return "\n".join(out)
+
+
+# ── Resume sections ──────────────────────────────────────────
+# (pattern, priority, floor) — lower priority is cut first; floor is the
+# share of the section kept while cutting other sections to their floors
+# is enough. Past that, sections are cut below it (or dropped), still
+# lowest priority first.
+_RESUME_SECTIONS = [
+    (r"skills?|technical skills|core competencies|technologies|tech stack", 90, 1.0),
+    (r"summary|profile|objective|about me",                                 80, 0.5),
+    (r"(work |professional )?experience|employment( history)?|work history", 70, 0.4),
+    (r"education|academics?",                                              60, 0.3),
+    (r"projects?|personal projects|key projects",                          50, 0.2),
+    (r"certifications?|licen[cs]es",                                       40, 0.0),
+    (r"achievements?|awards?|honou?rs|accomplishments",                    35, 0.0),
+    (r"publications?|papers|talks",                                        20, 0.0),
+    (r"volunteer(ing)?|activities|extracurriculars?",                      15, 0.0),
+    (r"interests|hobbies|languages|references",                            10, 0.0),
+]
+_SECTION_HEADER = [
+    (re.compile(rf"^\W*({pattern})\W*$", re.I), priority, floor)
+    for pattern, priority, floor in _RESUME_SECTIONS
+]
+_MIN_CUT_TOKENS = 50  # sections smaller than this aren't worth mangling
+
+
+def _split_sections(text: str) -> List[Dict]:
+    """Contact block first (never cut), then one entry per recognised header."""
+    sections = [{"priority": 1000, "floor": 1.0, "lines": []}]
+    for line in text.split("\n"):
+        if 0 < len(line) <= 40:
+            match = next(((p, f) for rx, p, f in _SECTION_HEADER if rx.match(line)), None)
+            if match:
+                sections.append({"priority": match[0], "floor": match[1], "lines": [line]})
+                continue
+        sections[-1]["lines"].append(line)
+    for s in sections:
+        s["text"] = "\n".join(s["lines"]).strip("\n")
+        s["tokens"] = count_tokens(s["text"])
+    return sections
+
+
+def _cut_section(s: Dict, keep: int, steps: List[str]) -> int:
+    """Cut section s to ~keep tokens (dropped when little would be left); returns tokens freed."""
+    header, _, body = s["text"].partition("\n") if s["priority"] < 1000 else ("", "", s["text"])
+    name = header or "contact"
+    body_budget = keep - count_tokens(header) - count_tokens(_TRUNCATED)
+    if body_budget < _MIN_CUT_TOKENS // 2:
+        freed, s["text"], s["tokens"] = s["tokens"], "", 0
+        steps.append(f"dropped section '{name}'")
+        return freed
+    body = _truncate_lines(body, body_budget)
+    s["text"] = f"{header}\n{body}".strip("\n") if header else body
+    new_tokens = count_tokens(s["text"])
+    steps.append(f"truncated section '{name}' {s['tokens']}→{new_tokens}")
+    freed, s["tokens"] = s["tokens"] - new_tokens, new_tokens
+    return freed
+
+
+def _compact_text_resume(text: str, max_tokens: int, steps: List[str]) -> str:
+    sections = _split_sections(text)
+    by_priority = sorted(sections, key=lambda s: s["priority"])
+    over = sum(s["tokens"] for s in sections) - max_tokens
+    # 1. down to the floors
+    for s in by_priority:
+        if over <= 0:
+            break
+        keep = max(int(s["tokens"] * s["floor"]), s["tokens"] - over)
+        if keep >= s["tokens"] or s["tokens"] < _MIN_CUT_TOKENS:
+            continue
+        over -= _cut_section(s, keep, steps)
+    # 2. floors weren't enough: below them, still lowest priority first — a
+    # section is only cut once every lower-priority one is gone
+    for s in by_priority:
+        if over <= 0:
+            break
+        if s["tokens"]:
+            over -= _cut_section(s, s["tokens"] - over, steps)
+    return "\n\n".join(s["text"] for s in sections if s["text"])
+
+
+# Structured resume keys, highest priority last (as in _RESUME_SECTIONS).
+# Keys not listed (languages, volunteering, …) are left out first.
+_JSON_PRIORITY = ["hobbies", "publications", "achievements", "certifications", "customSections",
+                  "projects", "education", "experience", "summary", "skills", "contact"]
+# Left out whole, cheapest first
+_JSON_DROP_SECTIONS = ("hobbies", "publications", "achievements", "certifications", "customSections")
+# (key, entries that stay) — lists end with the oldest entries
+_JSON_DROP_ENTRIES = (("projects", 0), ("education", 0), ("experience", 1))
+_JSON_MIN_STRING = 40
+
+
+def _string_leaves(value, path: Tuple) -> List[Tuple[Tuple, str]]:
+    if isinstance(value, str):
+        return [(path, value)]
+    if isinstance(value, dict):
+        return [leaf for k, v in value.items() for leaf in _string_leaves(v, path + (k,))]
+    if isinstance(value, list):
+        return [leaf for i, v in enumerate(value) for leaf in _string_leaves(v, path + (i,))]
+    return []
+
+
+def _set_path(data, path: Tuple, value) -> None:
+    for part in path[:-1]:
+        data = data[part]
+    data[path[-1]] = value
+
+
+def _shorten_strings(data: Dict, key: str, over: Callable[[], bool], steps: List[str]) -> None:
+    """Halve the longest text under data[key] until within budget (lossy — last resort)."""
+    cuts = 0
+    while over():
+        leaves = [leaf for leaf in _string_leaves(data.get(key), (key,)) if len(leaf[1]) > _JSON_MIN_STRING]
+        if not leaves:
+            break
+        path, text = max(leaves, key=lambda leaf: len(leaf[1]))
+        _set_path(data, path, f"{text[: len(text) // 2].rsplit(' ', 1)[0]} {_TRUNCATED}")
+        cuts += 1
+    if cuts:
+        steps.append(f"shortened '{key}' text ({cuts}×)")
+
+
+def _compact_json_resume(data: Dict, max_tokens: int, steps: List[str], dropped: Dict) -> str:
+    """
+    Structured resumes, cheapest loss first: leave out low-value sections,
+    then the oldest projects / education / roles (all recorded in dropped, so
+    callers can restore them), then shorten long text, lowest priority first.
+    """
+    dump = lambda: json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    over = lambda: count_tokens(dump()) > max_tokens
+
+    unknown = [k for k in data if k not in _JSON_PRIORITY]
+    for key in unknown + list(_JSON_DROP_SECTIONS):
+        if not over():
+            return dump()
+        if data.get(key):
+            dropped["sections"][key] = data.pop(key)
+            steps.append(f"dropped '{key}'")
+    for key, min_entries in _JSON_DROP_ENTRIES:
+        count = 0
+        while over() and isinstance(data.get(key), list) and len(data[key]) > min_entries:
+            dropped["entries"].setdefault(key, []).insert(0, data[key].pop())
+            count += 1
+        if count:
+            steps.append(f"dropped {count} oldest '{key}' entries")
+    for key in _JSON_PRIORITY:
+        if not over():
+            return dump()
+        if key in data:
+            _shorten_strings(data, key, over, steps)
+    # Still over (a resume of nothing but huge lists): whole keys, lowest priority first
+    for key in [k for k in _JSON_PRIORITY if k in data]:
+        if not over():
+            break
+        dropped["sections"][key] = data.pop(key)
+        steps.append(f"dropped '{key}'")
+    return dump()
+
+
+# ── Public API ───────────────────────────────────────────────
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _record(kind: str, before: int, after: int) -> None:
+    with _stats_lock:
+        s = _stats.setdefault(kind, {"calls": 0, "compacted": 0, "tokens_before": 0, "tokens_saved": 0})
+        s["calls"] += 1
+        s["tokens_before"] += before
+        if after < before:
+            s["compacted"] += 1
+            s["tokens_saved"] += before - after
+
+
+def _report(kind: str, before: int, text: str, steps: List[str], dropped: Optional[Dict] = None) -> Tuple[str, Dict]:
+    after = count_tokens(text)
+    _record(kind, before, after)
+    if steps:
+        logger.info(f"Prompt budget [{kind}]: {before}→{after} tokens ({'; '.join(steps)})")
+    report = {"tokens_before": before, "tokens_after": after, "tokens_saved": before - after, "steps": steps}
+    if dropped is not None:
+        report["dropped"] = dropped
+    return text, report
+
+
+def fit_resume(text: str, max_tokens: int) -> Tuple[str, Dict]:
+    """Resume text (plain or JSON) within max_tokens. JSON input stays valid JSON."""
+    before = count_tokens(text)
+    steps: List[str] = []
+    stripped = text.strip()
+    if stripped.startswith("{"):
+        try:
+            data = json.loads(stripped)
+        except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict):
+            dropped: Dict = {"sections": {}, "entries": {}}
+            out = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+            if count_tokens(out) > max_tokens:
+                out = _compact_json_resume(data, max_tokens, steps, dropped)
+            return _report("resume", before, out, steps, dropped)
+
+    out = _normalize_whitespace(text)
+    if count_tokens(out) > max_tokens:
+        out = _compact_text_resume(out, max_tokens, steps)
+    if count_tokens(out) > max_tokens:
+        out = _truncate_lines(out, max_tokens)
+        steps.append("hard cut")
+    return _report("resume", before, out, steps)
+
+
+def fit_job_description(text: str, max_tokens: int) -> Tuple[str, Dict]:
+    """Job description without boilerplate, within max_tokens (head kept)."""
+    before = count_tokens(text)
+    steps: List[str] = []
+    normalized = _normalize_whitespace(text)
+    out = _strip_jd_boilerplate(normalized)
+    if out != normalized:
+        steps.append("removed boilerplate")
+    if count_tokens(out) > max_tokens:
+        out = _truncate_lines(out, max_tokens)
+        steps.append("hard cut")
+    return _report("job_description", before, out, steps)
+
+
+def get_prompt_budget_stats() -> Dict[str, Dict[str, int]]:
+    with _stats_lock:
+        return {kind: dict(s) for kind, s in _stats.items()}
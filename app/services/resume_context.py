@@ -0,0 +1,109 @@
+"""
+Materialized resume context — the prompt-ready forms of a resume, computed
+once when extracted_data is saved and stored on incoming_resumes.context.
+
+  prompt_text  canonical "section: value" flattening used in every prompt
+  summary      compact (≤ SUMMARY_MAX_CHARS) name / headline / skills / roles
+  skills       normalized skill set (lower-case, de-duplicated, in resume order)
+  tokens       local token estimate of prompt_text (prompt_budget.count_tokens)
+  hash         content hash of prompt_text
+  version      CONTEXT_VERSION — bump it when the format changes; older
+               contexts are rebuilt on first read
+
+Exported callables:
+  build_resume_context(extracted_data, raw_text="")  → Dict
+  is_current(context)                                → bool
+"""
+
+import json
+import hashlib
+import re
+from typing import Dict, List, Optional
+
+from app.services.prompt_budget import count_tokens
+
+CONTEXT_VERSION = 1
+SUMMARY_MAX_CHARS = 1500
+_SUMMARY_SKILLS = 30
+_SUMMARY_ROLES = 4
+
+# Pipeline bookkeeping that is not resume content
+_SKIP_KEYS = {"creditsUsed"}
+_SKILL_SPLIT = re.compile(r"\s*[,;|•]\s*")
+
+
+def _value_text(val) -> str:
+    if isinstance(val, dict):
+        return json.dumps(val, ensure_ascii=False, separators=(",", ":"))
+    return str(val)
+
+
+def _prompt_text(extracted: Dict) -> str:
+    parts = []
+    for key, val in extracted.items():
+        if not val or key in _SKIP_KEYS:
+            continue
+        if isinstance(val, list):
+            parts.append(f"{key}: {', '.join(_value_text(v) for v in val if v)}")
+        else:
+            parts.append(f"{key}: {_value_text(val)}")
+    return "\n".join(parts)
+
+
+def _skills(extracted: Dict) -> List[str]:
+    seen: Dict[str, None] = {}
+    for item in extracted.get("skills") or []:
+        for skill in _SKILL_SPLIT.split(str(item)):
+            skill = " ".join(skill.lower().split())
+            if skill:
+                seen.setdefault(skill, None)
+    return list(seen)
+
+
+def _role(entry) -> Optional[str]:
+    if not isinstance(entry, dict):
+        return str(entry) if entry else None
+    title, company = entry.get("title"), entry.get("company")
+    dates = " – ".join(d for d in (entry.get("startDate"), entry.get("endDate")) if d)
+    text = " at ".join(x for x in (title, company) if x)
+    return f"{text} ({dates})" if text and dates else text or None
+
+
+def _summary(extracted: Dict, skills: List[str]) -> str:
+    contact = extracted.get("contact") or {}
+    lines = []
+    if isinstance(contact, dict) and (contact.get("name") or contact.get("location")):
+        lines.append(" — ".join(x for x in (contact.get("name"), contact.get("location")) if x))
+    if extracted.get("summary"):
+        lines.append(f"summary: {extracted['summary']}")
+    if skills:
+        lines.append(f"skills: {', '.join(skills[:_SUMMARY_SKILLS])}")
+    roles = [r for r in (_role(e) for e in (extracted.get("experience") or [])[:_SUMMARY_ROLES]) if r]
+    if roles:
+        lines.append(f"experience: {'; '.join(roles)}")
+    degrees = [
+        " — ".join(x for x in (e.get("degree"), e.get("field"), e.get("institution")) if x)
+        for e in extracted.get("education") or [] if isinstance(e, dict)
+    ]
+    if any(degrees):
+        lines.append(f"education: {'; '.join(d for d in degrees if d)}")
+    return "\n".join(lines)[:SUMMARY_MAX_CHARS]
+
+
+def build_resume_context(extracted_data: Optional[Dict], raw_text: str = "") -> Dict:
+    """Context for one resume version. raw_text is used when nothing was extracted."""
+    extracted = extracted_data if isinstance(extracted_data, dict) else {}
+    prompt_text = _prompt_text(extracted) or raw_text or ""
+    skills = _skills(extracted)
+    return {
+        "version":     CONTEXT_VERSION,
+        "prompt_text": prompt_text,
+        "summary":     _summary(extracted, skills) or prompt_text[:SUMMARY_MAX_CHARS],
+        "skills":      skills,
+        "tokens":      count_tokens(prompt_text),
+        "hash":        hashlib.sha256(prompt_text.encode("utf-8")).hexdigest(),
+    }
+
+
+def is_current(context: Optional[Dict]) -> bool:
+    return bool(context) and context.get("version") == CONTEXT_VERSION
@@ -16,9 +16,9 @@ from app.config import settings
 logger = logging.getLogger(__name__)
 
 
-def _call_ai(prompt, temperature=1.0, max_tokens=8192):
-    from app.services.ai_provider_service import call_ai
-    return call_ai(prompt, temperature=temperature, max_tokens=max_tokens)
+async def _call_ai_async(prompt, temperature=1.0, max_tokens=8192, feature=None):
+    from app.services.ai_provider_service import call_ai_async
+    return await call_ai_async(prompt, temperature=temperature, max_tokens=max_tokens, feature=feature)
 
 class ResumeGenerator:
     """
@@ -245,7 +245,7 @@ class ResumeGenerator:
     """
 
         try:
-            improved = _call_ai(prompt, temperature=0.25, max_tokens=3000)
+            improved = await _call_ai_async(prompt, temperature=0.25, max_tokens=3000, feature="enhance_resume")
             improved_content = improved.get("content", improved)  # in case model returns flat dict
 
             # Merge back (preserve original structure where possible)
@@ -277,7 +277,7 @@ class ResumeGenerator:
     Job: {job_description}
     """
 
-        keywords_data = _call_ai(parse_prompt, temperature=0.1, max_tokens=600)
+        keywords_data = await _call_ai_async(parse_prompt, temperature=0.1, max_tokens=600, feature="resume_keywords")
         keywords = set(keywords_data.get("keywords", []) + keywords_data.get("must_have_skills", []))
 
         # Now enhance content with keywords
@@ -4,28 +4,96 @@ SEPARATE from resume_generator.py (PDF only).
 """
 
 import json
+import asyncio
+import hashlib
 import logging
 import base64
-import io
-from typing import Dict, Optional
-import re
-
-import pdfplumber
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
 
 from app.config import settings
+from app.models.resume_ai.schemas import (
+    AnalyzeResumeProse,
+    AnalyzeResumeResponse,
+    AtsImprovementsProse,
+    AtsScoreResponse,
+    ExtractResumeResponse,
+    TailorResumeResponse,
+    output_schema,
+)
+from app.services.prompt_budget import fit_resume, fit_job_description
+from app.services.pdf_text_service import extract_pdf_text, extract_pdf_text_sync
+from app.services.ats_engine import score_resume, keyword_buckets
 
 logger = logging.getLogger(__name__)
 
 
 # Lazy import to avoid circular imports — used by call_ai() in ai_provider_service.
 # Every prompt routes through call_ai → call_claude.
-def _call_ai(prompt, temperature=1.0, max_tokens=8192, model=None):
+# cache=True is for deterministic prompts only (extraction, parsing, keyword buckets).
+# cache_prefix marks the stable head of the prompt for Anthropic prompt caching.
+# feature selects the model / max_tokens from the admin routing table.
+# schema (a response model) makes Claude answer through forced tool use, so
+# long outputs can't come back as malformed JSON.
+def _call_ai(prompt, temperature=1.0, max_tokens=8192, model=None, cache=False, cache_prefix=None, feature=None,
+             schema=None):
     from app.services.ai_provider_service import call_ai
-    return call_ai(prompt, temperature=temperature, max_tokens=max_tokens, model=model)
+    return call_ai(prompt, temperature=temperature, max_tokens=max_tokens, model=model,
+                   cache=cache, cache_prefix=cache_prefix, feature=feature,
+                   schema=output_schema(schema) if schema else None)
+
+
+# Async twin for request handlers — every `foo()` below has a `foo_async()`
+# that shares the prompt builder and awaits the model instead of blocking.
+async def _call_ai_async(prompt, temperature=1.0, max_tokens=8192, model=None, cache=False, cache_prefix=None,
+                         feature=None, schema=None):
+    from app.services.ai_provider_service import call_ai_async
+    return await call_ai_async(prompt, temperature=temperature, max_tokens=max_tokens, model=model,
+                               cache=cache, cache_prefix=cache_prefix, feature=feature,
+                               schema=output_schema(schema) if schema else None)
+
+
+def _resume_prefix(prompt: str, resume: str) -> Optional[str]:
+    """Instructions + resume — the head of a resume/JD prompt that repeats
+    when one resume is matched against several job descriptions."""
+    end = prompt.find(resume) if resume else -1
+    return prompt[:end + len(resume)] if end >= 0 else None
+
+
+def _budget(resume: str, job_description: str) -> Tuple[str, str]:
+    """Resume + JD compacted to the prompt budgets (see prompt_budget)."""
+    resume, _ = fit_resume(resume, settings.prompt_budget_resume_tokens)
+    job_description, _ = fit_job_description(job_description, settings.prompt_budget_jd_tokens)
+    return resume, job_description
 
 
-# Safety limits
-MAX_INPUT_CHARS = 100_000        # ~100k chars is ample for any resume/JD
+def _budget_tailor(resume: str, job_description: str) -> Tuple[str, str, Dict]:
+    """_budget() plus what fit_resume left out of a JSON resume (for _restore_budget_drops)."""
+    resume, report = fit_resume(resume, settings.prompt_budget_resume_tokens)
+    job_description, _ = fit_job_description(job_description, settings.prompt_budget_jd_tokens)
+    return resume, job_description, report.get("dropped") or {}
+
+
+def _restore_budget_drops(result: Dict, dropped: Dict) -> None:
+    """
+    Put what the prompt budget left out back into a tailored result, as it was:
+    the model never saw those sections / older entries, so they stay untailored
+    instead of disappearing from the user's resume.
+    """
+    if not dropped or not isinstance(result, dict) or "error" in result:
+        return
+    for key, value in (dropped.get("sections") or {}).items():
+        if not result.get(key):
+            result[key] = value
+    for key, entries in (dropped.get("entries") or {}).items():
+        current = result.get(key) if isinstance(result.get(key), list) else []
+        seen = {json.dumps(e, sort_keys=True, ensure_ascii=False).lower() for e in current}
+        result[key] = current + [
+            e for e in entries if json.dumps(e, sort_keys=True, ensure_ascii=False).lower() not in seen
+        ]
+        logger.info(f"Tailor: restored {len(result[key]) - len(current)} '{key}' entries left out of the prompt")
+
+
+# Safety limits — input size is governed by the prompt_budget_* settings
 DEFAULT_MAX_OUTPUT_TOKENS = 8000
 
 
@@ -48,67 +116,111 @@ def clean_json_response(text: str) -> str:
 # ─────────────────────────────────────────────────────────────
 # Resume Extraction
 # ─────────────────────────────────────────────────────────────
-def extract_resume_from_text(document_text: str) -> Dict:
-    # Step 1: Detect if input is base64 PDF
-    is_base64_pdf = False
-    original_input = document_text  # for logging
-
+def _decode_pdf_input(document_text: str) -> Tuple[Optional[bytes], Optional[Dict]]:
+    """PDF bytes if the input is a base64 PDF, else (None, None); (None, error_dict) on a bad PDF."""
     document_text = document_text.strip()
-
-    if (
+    if not (
         document_text.startswith("data:application/pdf")
         or document_text.startswith("JVBER")
         or document_text.startswith("[PDF_FILE_BASE64]")
     ):
-        is_base64_pdf = True
-        try:
-            # ✅ REMOVE custom prefix FIRST
-            if document_text.startswith("[PDF_FILE_BASE64]"):
-                document_text = document_text.replace("[PDF_FILE_BASE64]", "", 1)
-
-            # ✅ Remove data URI prefix if present
-            if document_text.startswith("data:application/pdf"):
-                document_text = document_text.split(",", 1)[1]
-
-            # ✅ Decode safely
-            pdf_bytes = base64.b64decode(document_text, validate=True)
+        return None, None
+    try:
+        # ✅ REMOVE custom prefix FIRST
+        if document_text.startswith("[PDF_FILE_BASE64]"):
+            document_text = document_text.replace("[PDF_FILE_BASE64]", "", 1)
 
-            # ✅ Validate real PDF header
-            if pdf_bytes[:4] != b"%PDF":
-                return {"error": "invalid_pdf", "message": "Decoded file is not a valid PDF"}
+        # ✅ Remove data URI prefix if present
+        if document_text.startswith("data:application/pdf"):
+            document_text = document_text.split(",", 1)[1]
 
-            pdf_stream = io.BytesIO(pdf_bytes)
+        # ✅ Decode safely
+        pdf_bytes = base64.b64decode(document_text, validate=True)
+    except Exception as e:
+        logger.exception("PDF decoding failed")
+        return None, {"error": "pdf_processing_failed", "message": str(e)}
 
-            extracted_text = ""
-            with pdfplumber.open(pdf_stream) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        extracted_text += page_text + "\n\n"
+    # ✅ Validate real PDF header
+    if pdf_bytes[:4] != b"%PDF":
+        return None, {"error": "invalid_pdf", "message": "Decoded file is not a valid PDF"}
+    return pdf_bytes, None
 
-            if not extracted_text.strip():
-                return {"error": "pdf_text_empty", "message": "No readable text found in PDF"}
 
-            document_text = extracted_text.strip()
-            document_text = re.sub(r'([a-z])([A-Z])', r'\1 \2', document_text)
-            document_text = re.sub(r'([a-zA-Z])(\()', r'\1 \2', document_text)
-            document_text = re.sub(r'(\))([a-zA-Z])', r'\1 \2', document_text)
-            document_text = re.sub(r'([a-zA-Z])(\d)', r'\1 \2', document_text)
-            document_text = re.sub(r'(\d)([a-zA-Z])', r'\1 \2', document_text)
+def _pdf_text_result(extracted: Dict) -> Tuple[Optional[str], Optional[Dict]]:
+    if not extracted["text"].strip():
+        return None, {"error": "pdf_text_empty", "message": "No readable text found in PDF"}
+    return extracted["text"], None
 
-        except Exception as e:
-            logger.exception("PDF decoding/extraction failed")
-            return {"error": "pdf_processing_failed", "message": str(e)}
 
-    if len(document_text) > MAX_INPUT_CHARS:
-        logger.warning("Resume text truncated due to size limit")
-        document_text = document_text[:MAX_INPUT_CHARS]
+def _finish_resume_text(document_text: str, is_pdf: bool) -> str:
+    """Fit the extraction budget and log what goes to Claude."""
+    document_text, budget = fit_resume(document_text.strip(), settings.prompt_budget_extract_tokens)
+    if budget["steps"]:
+        logger.warning(f"Resume text compacted to fit the extraction budget: {budget['steps']}")
 
     # Log what we're actually sending to Claude
-    logger.info(f"Input type: {'base64 PDF → extracted text' if is_base64_pdf else 'plain text'}")
+    logger.info(f"Input type: {'base64 PDF → extracted text' if is_pdf else 'plain text'}")
     logger.info(f"Text length sent to Claude: {len(document_text)} chars")
     logger.info(f"First 400 chars:\n{document_text[:400]}...")
+    return document_text
+
+
+def _prepare_resume_text(document_text: str) -> Tuple[Optional[str], Optional[Dict]]:
+    """Decode a base64 PDF (if that's what we got) and normalize the text.
+    Returns (text, None) or (None, error_dict). Pages are extracted in the
+    PDF worker pool (pdf_text_service)."""
+    pdf_bytes, err = _decode_pdf_input(document_text)
+    if err:
+        return None, err
+    if pdf_bytes is not None:
+        try:
+            document_text, err = _pdf_text_result(extract_pdf_text_sync(pdf_bytes))
+        except Exception as e:
+            logger.exception("PDF text extraction failed")
+            return None, {"error": "pdf_processing_failed", "message": str(e)}
+        if err:
+            return None, err
+    return _finish_resume_text(document_text, pdf_bytes is not None), None
+
+
+async def prepare_resume_text_async(document_text: str) -> Tuple[Optional[str], Optional[Dict]]:
+    """Async twin: base64 decoding and budgeting in a thread, page extraction
+    in the worker pool — nothing CPU-bound on the event loop."""
+    pdf_bytes, err = await asyncio.to_thread(_decode_pdf_input, document_text)
+    if err:
+        return None, err
+    if pdf_bytes is not None:
+        try:
+            document_text, err = _pdf_text_result(await extract_pdf_text(pdf_bytes))
+        except Exception as e:
+            logger.exception("PDF text extraction failed")
+            return None, {"error": "pdf_processing_failed", "message": str(e) or type(e).__name__}
+        if err:
+            return None, err
+    return await asyncio.to_thread(_finish_resume_text, document_text, pdf_bytes is not None), None
+
 
+async def prepare_resume_pdf_file_async(path: str) -> Tuple[Optional[str], Optional[Dict]]:
+    """prepare_resume_text_async() for a PDF spooled to disk (resume_upload):
+    the worker pool reads the file by path, no base64 and no copy in this process."""
+    try:
+        document_text, err = _pdf_text_result(await extract_pdf_text(path))
+    except Exception as e:
+        logger.exception("PDF text extraction failed")
+        return None, {"error": "pdf_processing_failed", "message": str(e) or type(e).__name__}
+    if err:
+        return None, err
+    return await asyncio.to_thread(_finish_resume_text, document_text, True), None
+
+
+def resume_fingerprint(text: str) -> str:
+    """Content hash of prepared resume text — case and whitespace don't count,
+    so the same PDF uploaded from the web app, the extension or Telegram matches."""
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _extract_resume_prompt(document_text: str) -> str:
     # Step 2: Send clean text to Claude (Opus) for high-fidelity structured extraction.
     # Extraction quality matters: any section dropped here propagates to the tailor
     # output as a missing section. So we ask for every section the user might have
@@ -149,15 +261,35 @@ Notes:
 Raw resume text:
 {document_text}
 """
+    return prompt
+
 
-    return _call_ai(prompt, temperature=0.0, max_tokens=8192, model="claude-opus-4-7")
+def extract_resume_from_text(document_text: str) -> Dict:
+    text, err = _prepare_resume_text(document_text)
+    if err:
+        return err
+    return _call_ai(_extract_resume_prompt(text), temperature=0.0, max_tokens=8192, cache=True,
+                    feature="extract_resume", schema=ExtractResumeResponse)
+
+
+async def extract_resume_from_text_async(document_text: str) -> Dict:
+    text, err = await prepare_resume_text_async(document_text)
+    if err:
+        return err
+    return await extract_resume_from_prepared_text_async(text)
+
+
+async def extract_resume_from_prepared_text_async(text: str) -> Dict:
+    """Claude extraction of text that already went through prepare_resume_text_async()."""
+    return await _call_ai_async(_extract_resume_prompt(text), temperature=0.0, max_tokens=8192, cache=True,
+                                feature="extract_resume", schema=ExtractResumeResponse)
 
 
 # ─────────────────────────────────────────────────────────────
 # All 7 Processing Functions (UNCHANGED PROMPTS)
 # ─────────────────────────────────────────────────────────────
 
-def analyze_resume_match(resume: str, job_description: str) -> Dict:
+def _analyze_resume_match_prompt(resume: str, job_description: str) -> str:
     prompt = f"""You are a senior technical recruiter and ATS expert.
 Compare the resume and job description.
 Return **only valid JSON** with **no extra text or markdown** using these exact keys:
@@ -178,10 +310,97 @@ Resume:
 Job Description:
 {job_description}
 """
-    return _call_ai(prompt, temperature=0.15)
+    return prompt
 
 
-def tailor_resume(resume: str, job_description: str) -> Dict:
+# ── Local numbers + Claude prose (settings.ats_local_scoring) ──
+# The scores, matched/missing skills and keyword buckets come from
+# ats_engine; Claude only writes strengths / weaknesses / suggestions and
+# improvements, given the computed findings after the resume + JD.
+
+def _local_findings(local: Dict) -> str:
+    return (
+        f"Keyword analysis (already computed — do not recompute or contradict it):\n"
+        f"ATS score: {local['atsScore']}/100 (keywords {local['scoreBreakdown']['keywords']}, "
+        f"relevance {local['scoreBreakdown']['relevance']}, structure {local['scoreBreakdown']['structure']}, "
+        f"formatting {local['scoreBreakdown']['formatting']})\n"
+        f"Matched skills: {', '.join(local['matchedSkills']) or 'none'}\n"
+        f"Missing skills: {', '.join(local['missingSkills']) or 'none'}\n"
+        f"Missing keywords: {', '.join(local['missingKeywords']) or 'none'}"
+    )
+
+
+def _analyze_resume_prose_prompt(resume: str, job_description: str, local: Dict) -> str:
+    prompt = f"""You are a senior technical recruiter and ATS expert.
+Compare the resume and job description.
+Return **only valid JSON** with **no extra text or markdown** using these exact keys:
+
+{{
+  "strengths": array of strings (2-5 items),
+  "weaknesses": array of strings (2-5 items),
+  "suggestions": array of strings (actionable improvements)
+}}
+
+Resume:
+{resume}
+
+Job Description:
+{job_description}
+
+{_local_findings(local)}
+"""
+    return prompt
+
+
+def _local_match(local: Dict) -> Dict:
+    # JDs without dictionary skills: the weighted JD keywords stand in
+    if local["matchedSkills"] or local["missingSkills"]:
+        matched, missing = local["matchedSkills"], local["missingSkills"]
+    else:
+        matched, missing = local["matchedKeywords"], local["missingKeywords"]
+    return {
+        "matchPercentage": local["matchPercentage"],
+        "atsScore": local["atsScore"],
+        "matchedSkills": matched,
+        "missingSkills": missing,
+    }
+
+
+def _merge_prose(numbers: Dict, prose: Dict) -> Dict:
+    return prose if "error" in prose else {**prose, **numbers}
+
+
+def analyze_resume_match(resume: str, job_description: str) -> Dict:
+    local = score_resume(resume, job_description) if settings.ats_local_scoring else None
+    resume, job_description = _budget(resume, job_description)
+    if local is None:
+        prompt = _analyze_resume_match_prompt(resume, job_description)
+        return _call_ai(prompt, temperature=0.15, cache_prefix=_resume_prefix(prompt, resume),
+                        feature="analyze_resume", schema=AnalyzeResumeResponse)
+    prompt = _analyze_resume_prose_prompt(resume, job_description, local)
+    prose = _call_ai(prompt, temperature=0.15, cache_prefix=_resume_prefix(prompt, resume),
+                     feature="analyze_resume", schema=AnalyzeResumeProse)
+    return _merge_prose(_local_match(local), prose)
+
+
+async def analyze_resume_match_async(resume: str, job_description: str) -> Dict:
+    local = score_resume(resume, job_description) if settings.ats_local_scoring else None
+    resume, job_description = _budget(resume, job_description)
+    return await _analyze_budgeted_async(resume, job_description, local)
+
+
+async def _analyze_budgeted_async(resume: str, job_description: str, local: Optional[Dict]) -> Dict:
+    if local is None:
+        prompt = _analyze_resume_match_prompt(resume, job_description)
+        return await _call_ai_async(prompt, temperature=0.15, cache_prefix=_resume_prefix(prompt, resume),
+                                    feature="analyze_resume", schema=AnalyzeResumeResponse)
+    prompt = _analyze_resume_prose_prompt(resume, job_description, local)
+    prose = await _call_ai_async(prompt, temperature=0.15, cache_prefix=_resume_prefix(prompt, resume),
+                                 feature="analyze_resume", schema=AnalyzeResumeProse)
+    return _merge_prose(_local_match(local), prose)
+
+
+def tailor_resume_guard(resume: str) -> Optional[Dict]:
     # B2 — Defensive guard: refuse to tailor if the input resume is empty/stub.
     # The frontend now always extracts pasted text via /api/extract-resume before
     # calling this endpoint, so a payload with no name + no experience + no skills
@@ -203,7 +422,10 @@ def tailor_resume(resume: str, job_description: str) -> Dict:
                 "error": "empty_resume",
                 "message": "Resume payload is empty — extract structured data from the user's text first before calling tailor.",
             }
+    return None
+
 
+def _tailor_resume_prompt(resume: str, job_description: str) -> str:
     prompt = f"""You are an expert ATS optimization specialist and professional resume writer.
 Your goal is to tailor this resume for MAXIMUM ATS compatibility against the given job description.
 
@@ -333,42 +555,89 @@ Original Resume (the source of truth — every field below comes from this):
 Job Description (used ONLY for keyword targeting — never copy text from here into the resume):
 {job_description}
 """
+    return prompt
+
+
+def _tailored_plain_text(result: Dict) -> str:
+    """Rebuild plain text from a tailored result for the objective ATS re-score."""
+    plain_parts = []
+    if result.get("summary"):
+        plain_parts.append(result["summary"])
+    if result.get("skills"):
+        plain_parts.append(" ".join(result["skills"]))
+    for exp in result.get("experience", []):
+        plain_parts.append(f"{exp.get('title', '')} {exp.get('company', '')}")
+        plain_parts.extend(exp.get("description", []))
+    for proj in result.get("projects", []):
+        plain_parts.append(f"{proj.get('title', '')} {proj.get('description', '')}")
+    for sec_name, sec_body in (result.get("customSections") or {}).items():
+        plain_parts.append(f"{sec_name} {sec_body}")
+    for c in result.get("certifications", []) or []:
+        plain_parts.append(c)
+    return "\n".join(plain_parts)
+
+
+def apply_ats_cross_check(result: Dict, ats_result: Dict) -> None:
+    if ats_result.get("atsScore") is not None:
+        result["estimatedATSScore"] = ats_result["atsScore"]
+    if ats_result.get("scoreBreakdown"):
+        result["scoreBreakdown"] = ats_result["scoreBreakdown"]
+
+
+def tailor_resume(resume: str, job_description: str) -> Dict:
+    guard = tailor_resume_guard(resume)
+    if guard:
+        return guard
+
+    resume, job_description, dropped = _budget_tailor(resume, job_description)
+
     # B3 — strongest model + max tokens + zero temperature for accuracy.
     # Per user guidance: "use claude best for best resume optimisation, don't
     # hesitate to use Claude costs". Opus is ~5x Sonnet pricing but the user
     # explicitly approved this trade-off for resume tailoring quality.
-    result = _call_ai(prompt, temperature=0.0, max_tokens=8192, model="claude-opus-4-7")
+    # The model is pinned by the "tailor_resume" route (claude_config_service).
+    prompt = _tailor_resume_prompt(resume, job_description)
+    result = _call_ai(prompt, temperature=0.0, max_tokens=8192,
+                      cache_prefix=_resume_prefix(prompt, resume), feature="tailor_resume",
+                      schema=TailorResumeResponse)
+    _restore_budget_drops(result, dropped)
+
+    # Cross-validate the overall ATS score by re-scoring the tailored resume objectively
+    try:
+        if settings.ats_local_scoring:
+            apply_ats_cross_check(result, score_resume(result, job_description))
+        else:
+            apply_ats_cross_check(result, calculate_ats_score(_tailored_plain_text(result), job_description))
+    except Exception:
+        pass  # keep model's self-reported score as fallback
+
+    return result
+
+
+async def tailor_resume_async(resume: str, job_description: str) -> Dict:
+    guard = tailor_resume_guard(resume)
+    if guard:
+        return guard
+
+    resume, job_description, dropped = _budget_tailor(resume, job_description)
+    prompt = _tailor_resume_prompt(resume, job_description)
+    result = await _call_ai_async(prompt, temperature=0.0, max_tokens=8192,
+                                  cache_prefix=_resume_prefix(prompt, resume), feature="tailor_resume",
+                                  schema=TailorResumeResponse)
+    _restore_budget_drops(result, dropped)
 
-    # Cross-validate the overall ATS score by rebuilding plain text and re-scoring objectively
     try:
-        plain_parts = []
-        if result.get("summary"):
-            plain_parts.append(result["summary"])
-        if result.get("skills"):
-            plain_parts.append(" ".join(result["skills"]))
-        for exp in result.get("experience", []):
-            plain_parts.append(f"{exp.get('title', '')} {exp.get('company', '')}")
-            plain_parts.extend(exp.get("description", []))
-        for proj in result.get("projects", []):
-            plain_parts.append(f"{proj.get('title', '')} {proj.get('description', '')}")
-        for sec_name, sec_body in (result.get("customSections") or {}).items():
-            plain_parts.append(f"{sec_name} {sec_body}")
-        for c in result.get("certifications", []) or []:
-            plain_parts.append(c)
-        tailored_plain_text = "\n".join(plain_parts)
-
-        ats_result = calculate_ats_score(tailored_plain_text, job_description)
-        if ats_result.get("atsScore") is not None:
-            result["estimatedATSScore"] = ats_result["atsScore"]
-        if ats_result.get("scoreBreakdown"):
-            result["scoreBreakdown"] = ats_result["scoreBreakdown"]
+        if settings.ats_local_scoring:
+            apply_ats_cross_check(result, score_resume(result, job_description))
+        else:
+            apply_ats_cross_check(result, await calculate_ats_score_async(_tailored_plain_text(result), job_description))
     except Exception:
         pass  # keep model's self-reported score as fallback
 
     return result
 
 
-def calculate_ats_score(resume: str, job_description: str) -> Dict:
+def _calculate_ats_score_prompt(resume: str, job_description: str) -> str:
     prompt = f"""You are an ATS optimization specialist.
 Analyze this resume against the job description for ATS compatibility.
 
@@ -401,10 +670,76 @@ Resume:
 Job Description:
 {job_description}
 """
-    return _call_ai(prompt, temperature=0.15)
+    return prompt
 
 
-def parse_job_description(job_description: str) -> Dict:
+def _ats_improvements_prompt(resume: str, job_description: str, local: Dict) -> str:
+    prompt = f"""You are an ATS optimization specialist.
+Analyze this resume against the job description for ATS compatibility.
+
+Return ONLY valid JSON:
+
+{{
+  "improvements": [
+    {{"issue": "short description", "suggestion": "how to fix", "impact": "+5-8 points"}}
+  ]
+}}
+
+Resume:
+{resume}
+
+Job Description:
+{job_description}
+
+{_local_findings(local)}
+"""
+    return prompt
+
+
+def _local_ats(local: Dict) -> Dict:
+    return {
+        "atsScore": local["atsScore"],
+        "scoreBreakdown": local["scoreBreakdown"],
+        "topMissingKeywords": local["missingSkills"][:10],
+    }
+
+
+def calculate_ats_score(resume: str, job_description: str) -> Dict:
+    local = score_resume(resume, job_description) if settings.ats_local_scoring else None
+    resume, job_description = _budget(resume, job_description)
+    if local is None:
+        prompt = _calculate_ats_score_prompt(resume, job_description)
+        return _call_ai(prompt, temperature=0.15, cache_prefix=_resume_prefix(prompt, resume),
+                        feature="ats_score", schema=AtsScoreResponse)
+    prompt = _ats_improvements_prompt(resume, job_description, local)
+    prose = _call_ai(prompt, temperature=0.15, cache_prefix=_resume_prefix(prompt, resume),
+                     feature="ats_score", schema=AtsImprovementsProse)
+    return _merge_prose(_local_ats(local), prose)
+
+
+async def calculate_ats_score_async(resume: str, job_description: str) -> Dict:
+    local = score_resume(resume, job_description) if settings.ats_local_scoring else None
+    resume, job_description = _budget(resume, job_description)
+    return await _ats_budgeted_async(resume, job_description, local)
+
+
+async def _ats_budgeted_async(resume: str, job_description: str, local: Optional[Dict]) -> Dict:
+    if local is None:
+        prompt = _calculate_ats_score_prompt(resume, job_description)
+        return await _call_ai_async(prompt, temperature=0.15, cache_prefix=_resume_prefix(prompt, resume),
+                                    feature="ats_score", schema=AtsScoreResponse)
+    prompt = _ats_improvements_prompt(resume, job_description, local)
+    prose = await _call_ai_async(prompt, temperature=0.15, cache_prefix=_resume_prefix(prompt, resume),
+                                 feature="ats_score", schema=AtsImprovementsProse)
+    return _merge_prose(_local_ats(local), prose)
+
+
+def quick_ats_score(resume: str, job_description: str) -> Dict:
+    """The local ATS pre-pass alone — milliseconds, no Claude call."""
+    return score_resume(resume, job_description)
+
+
+def _parse_job_description_prompt(job_description: str) -> str:
     prompt = f"""Extract structured information from this job posting. Read carefully and pull out the ACTUAL values — do not use placeholder text.
 
 Return ONLY this JSON (null if a field is genuinely missing):
@@ -429,10 +764,20 @@ IMPORTANT: Extract the REAL values from the text. Never use "Job Position", "Com
 Job posting:
 {job_description}
 """
-    return _call_ai(prompt, temperature=0.1)
+    return prompt
 
 
-def generate_cover_letter(resume: str, job_description: str) -> Dict:
+def parse_job_description(job_description: str) -> Dict:
+    job_description, _ = fit_job_description(job_description, settings.prompt_budget_jd_tokens)
+    return _call_ai(_parse_job_description_prompt(job_description), temperature=0.1, cache=True, feature="parse_job_description")
+
+
+async def parse_job_description_async(job_description: str) -> Dict:
+    job_description, _ = fit_job_description(job_description, settings.prompt_budget_jd_tokens)
+    return await _call_ai_async(_parse_job_description_prompt(job_description), temperature=0.1, cache=True, feature="parse_job_description")
+
+
+def _generate_cover_letter_prompt(resume: str, job_description: str) -> str:
     prompt = f"""You are a professional cover letter writer.
 Write a compelling, concise cover letter (300–450 words) tailored to the job.
 
@@ -460,10 +805,22 @@ Resume:
 Job Description:
 {job_description}
 """
-    return _call_ai(prompt, temperature=0.35)
+    return prompt
 
 
-def generate_skills_roadmap(resume: str, job_description: str) -> Dict:
+def generate_cover_letter(resume: str, job_description: str) -> Dict:
+    resume, job_description = _budget(resume, job_description)
+    prompt = _generate_cover_letter_prompt(resume, job_description)
+    return _call_ai(prompt, temperature=0.35, cache_prefix=_resume_prefix(prompt, resume), feature="cover_letter")
+
+
+async def generate_cover_letter_async(resume: str, job_description: str) -> Dict:
+    resume, job_description = _budget(resume, job_description)
+    prompt = _generate_cover_letter_prompt(resume, job_description)
+    return await _call_ai_async(prompt, temperature=0.35, cache_prefix=_resume_prefix(prompt, resume), feature="cover_letter")
+
+
+def _generate_skills_roadmap_prompt(resume: str, job_description: str) -> str:
     prompt = f"""You are a career coach. Identify the top 2 skill gaps between this resume and job description, then generate a practical week-by-week learning roadmap for each.
 
 Return ONLY valid JSON (no markdown, no extra text):
@@ -497,15 +854,26 @@ Resume:
 Job Description:
 {job_description}
 """
-    return _call_ai(prompt, temperature=0.3)
+    return prompt
 
 
-def keyword_distribution(resume: str, job_description: str) -> Dict:
-    """
-    Categorize JD keywords by where they best match in the resume.
-    Returns 5 fixed categories: Skills / Experience / Projects / Others / Not Relevant.
-    Provider-agnostic via _call_ai().
-    """
+def generate_skills_roadmap(resume: str, job_description: str) -> Dict:
+    resume, job_description = _budget(resume, job_description)
+    prompt = _generate_skills_roadmap_prompt(resume, job_description)
+    return _call_ai(prompt, temperature=0.3, cache_prefix=_resume_prefix(prompt, resume), feature="skills_roadmap")
+
+
+async def generate_skills_roadmap_async(resume: str, job_description: str) -> Dict:
+    resume, job_description = _budget(resume, job_description)
+    return await _skills_roadmap_budgeted_async(resume, job_description)
+
+
+async def _skills_roadmap_budgeted_async(resume: str, job_description: str) -> Dict:
+    prompt = _generate_skills_roadmap_prompt(resume, job_description)
+    return await _call_ai_async(prompt, temperature=0.3, cache_prefix=_resume_prefix(prompt, resume), feature="skills_roadmap")
+
+
+def _keyword_distribution_prompt(resume: str, job_description: str) -> str:
     prompt = f"""You are an ATS keyword analyzer.
 
 Read the resume and job description below. Extract the most important keywords from the job
@@ -542,15 +910,35 @@ Resume:
 Job Description:
 {job_description}
 """
-    return _call_ai(prompt, temperature=0.2)
+    return prompt
 
 
-def analyze_and_tailor(page_text: str, resume_json: dict, configured_sections: list) -> dict:
+def keyword_distribution(resume: str, job_description: str) -> Dict:
     """
-    Single combined Claude call: extract job data + tailor resume + ATS score.
-    Mirrors the main branch's analyzeJobAndTailorResume single-prompt approach.
-    Optional second call for custom sections.
+    Categorize JD keywords by where they best match in the resume.
+    Returns 5 fixed categories: Skills / Experience / Projects / Others / Not Relevant.
+    Provider-agnostic via _call_ai(); local (ats_engine) with settings.ats_local_scoring.
     """
+    if settings.ats_local_scoring:
+        return keyword_buckets(resume, job_description)
+    resume, job_description = _budget(resume, job_description)
+    prompt = _keyword_distribution_prompt(resume, job_description)
+    return _call_ai(prompt, temperature=0.2, cache=True, cache_prefix=_resume_prefix(prompt, resume), feature="keyword_distribution")
+
+
+async def keyword_distribution_async(resume: str, job_description: str) -> Dict:
+    if settings.ats_local_scoring:
+        return keyword_buckets(resume, job_description)
+    resume, job_description = _budget(resume, job_description)
+    return await _keyword_distribution_budgeted_async(resume, job_description)
+
+
+async def _keyword_distribution_budgeted_async(resume: str, job_description: str) -> Dict:
+    prompt = _keyword_distribution_prompt(resume, job_description)
+    return await _call_ai_async(prompt, temperature=0.2, cache=True, cache_prefix=_resume_prefix(prompt, resume), feature="keyword_distribution")
+
+
+def _analyze_and_tailor_prompt(page_text: str, resume_json: dict) -> str:
     import json as _json
 
     # Serialize resume to compact readable format for the prompt
@@ -606,14 +994,11 @@ Job posting:
 
 Resume:
 {resume_str}"""
+    return prompt
 
-    result = _call_ai(prompt, temperature=0.0, max_tokens=8192)
-
-    if "error" in result:
-        return result
 
-    # Normalize fields
-    out = {
+def _normalize_analyze_and_tailor(result: dict) -> dict:
+    return {
         "jobTitle": result.get("jobTitle", ""),
         "company": result.get("company", ""),
         "location": result.get("location", ""),
@@ -633,23 +1018,23 @@ Resume:
         "customSections": {},
     }
 
-    # Optional second call: batch generate custom sections
-    if configured_sections:
-        job_title = out["jobTitle"]
-        job_company = out["company"]
-        job_skills = ", ".join(out["skills"][:10])
-        candidate_name = resume_json.get("contact", {}).get("name", "Candidate")
-        experience_summary = " | ".join(
-            f"{e.get('title','')} at {e.get('company','')}"
-            for e in resume_json.get("experience", [])[:4]
-        )
-
-        sections_template = ", ".join(
-            f'"{s}": "3-4 sentences relevant to {job_title}"'
-            for s in configured_sections
-        )
-
-        custom_prompt = f"""Generate compelling custom resume sections for this job opportunity.
+
+def _custom_sections_prompt(out: dict, resume_json: dict, configured_sections: list) -> str:
+    job_title = out["jobTitle"]
+    job_company = out["company"]
+    job_skills = ", ".join(out["skills"][:10])
+    candidate_name = resume_json.get("contact", {}).get("name", "Candidate")
+    experience_summary = " | ".join(
+        f"{e.get('title','')} at {e.get('company','')}"
+        for e in resume_json.get("experience", [])[:4]
+    )
+
+    sections_template = ", ".join(
+        f'"{s}": "3-4 sentences relevant to {job_title}"'
+        for s in configured_sections
+    )
+
+    custom_prompt = f"""Generate compelling custom resume sections for this job opportunity.
 
 Job: {job_title} at {job_company}
 Skills needed: {job_skills}
@@ -666,18 +1051,58 @@ Return ONLY valid JSON:
 }}
 
 Each section: specific, substantial (3-4 sentences), aligned with job requirements."""
+    return custom_prompt
+
+
+def _merge_custom_sections(out: dict, custom_result: dict) -> None:
+    if "error" not in custom_result and custom_result.get("sections"):
+        for name, content in custom_result["sections"].items():
+            content_str = str(content).strip()
+            if content_str and content_str != "null":
+                out["customSections"][name] = content_str
+
+
+def analyze_and_tailor(page_text: str, resume_json: dict, configured_sections: list) -> dict:
+    """
+    Single combined Claude call: extract job data + tailor resume + ATS score.
+    Mirrors the main branch's analyzeJobAndTailorResume single-prompt approach.
+    Optional second call for custom sections.
+    """
+    page_text, _ = fit_job_description(page_text, settings.prompt_budget_jd_tokens)
+    result = _call_ai(_analyze_and_tailor_prompt(page_text, resume_json), temperature=0.0, max_tokens=8192,
+                      feature="analyze_and_tailor")
 
-        custom_result = _call_ai(custom_prompt, temperature=0.1, max_tokens=4096)
-        if "error" not in custom_result and custom_result.get("sections"):
-            for name, content in custom_result["sections"].items():
-                content_str = str(content).strip()
-                if content_str and content_str != "null":
-                    out["customSections"][name] = content_str
+    if "error" in result:
+        return result
+
+    out = _normalize_analyze_and_tailor(result)
+
+    # Optional second call: batch generate custom sections
+    if configured_sections:
+        custom_prompt = _custom_sections_prompt(out, resume_json, configured_sections)
+        _merge_custom_sections(out, _call_ai(custom_prompt, temperature=0.1, max_tokens=4096, feature="custom_sections"))
 
     return out
 
 
-def check_resume_completeness(resume: str) -> Dict:
+async def analyze_and_tailor_async(page_text: str, resume_json: dict, configured_sections: list) -> dict:
+    page_text, _ = fit_job_description(page_text, settings.prompt_budget_jd_tokens)
+    result = await _call_ai_async(_analyze_and_tailor_prompt(page_text, resume_json), temperature=0.0, max_tokens=8192,
+                                  feature="analyze_and_tailor")
+
+    if "error" in result:
+        return result
+
+    out = _normalize_analyze_and_tailor(result)
+
+    if configured_sections:
+        custom_prompt = _custom_sections_prompt(out, resume_json, configured_sections)
+        _merge_custom_sections(out, await _call_ai_async(custom_prompt, temperature=0.1, max_tokens=4096, feature="custom_sections"))
+
+    return out
+
+
+def _check_resume_completeness_prompt(resume: str) -> str:
     prompt = f"""You are a resume completeness auditor.
 Evaluate how complete and well-rounded this resume is for a mid-to-senior level professional role.
 
@@ -702,4 +1127,65 @@ Return **only valid JSON** with these exact keys:
 Resume text:
 {resume}
 """
-    return _call_ai(prompt, temperature=0.2)
\ No newline at end of file
+    return prompt
+
+
+def check_resume_completeness(resume: str) -> Dict:
+    return _call_ai(_check_resume_completeness_prompt(resume), temperature=0.2, feature="resume_completeness")
+
+
+async def check_resume_completeness_async(resume: str) -> Dict:
+    return await _call_ai_async(_check_resume_completeness_prompt(resume), temperature=0.2, feature="resume_completeness")
+
+
+# ─────────────────────────────────────────────────────────────
+# Resume intelligence bundle
+# ─────────────────────────────────────────────────────────────
+BUNDLE_SECTIONS = ("analyze", "ats", "keywords", "completeness", "roadmap")
+
+
+async def resume_bundle_async(
+    resume: str,
+    job_description: str,
+    sections: Iterable[str] = BUNDLE_SECTIONS,
+) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    analyze / ats / keywords / completeness / roadmap for one resume + JD in
+    one pass: the local ATS pre-pass and the prompt budgeting run once, the
+    Claude calls run concurrently, and (section, result) pairs are yielded
+    as each finishes — ("score", local ATS score) first when
+    settings.ats_local_scoring is on. A failed section yields
+    (section, {"error": ..., "message": ...}) and the others carry on.
+    """
+    local = score_resume(resume, job_description) if settings.ats_local_scoring else None
+    if local is not None:
+        yield "score", local
+    fit_resume, fit_jd = _budget(resume, job_description)
+
+    async def keywords() -> Dict:
+        if local is not None:
+            return keyword_buckets(resume, job_description)
+        return await _keyword_distribution_budgeted_async(fit_resume, fit_jd)
+
+    jobs = {
+        "analyze":      lambda: _analyze_budgeted_async(fit_resume, fit_jd, local),
+        "ats":          lambda: _ats_budgeted_async(fit_resume, fit_jd, local),
+        "keywords":     keywords,
+        "completeness": lambda: check_resume_completeness_async(resume),
+        "roadmap":      lambda: _skills_roadmap_budgeted_async(fit_resume, fit_jd),
+    }
+
+    async def run(name: str) -> Tuple[str, Dict]:
+        try:
+            return name, await jobs[name]()
+        except Exception as e:
+            logger.exception(f"Resume bundle section {name} failed")
+            return name, {"error": "section_failed", "message": str(e)}
+
+    tasks = [asyncio.create_task(run(name)) for name in dict.fromkeys(sections)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()  # consumer went away mid-bundle
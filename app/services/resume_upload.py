@@ -0,0 +1,164 @@
+"""
+Multipart resume upload, spooled straight to a temp file.
+
+The base64-in-JSON path (ExtractResumeRequest.documentText) holds an upload
+several times over: the JSON body, the pydantic string, the stripped and
+prefix-less copies, then the decoded bytes. Here the request body is parsed
+as it arrives (python-multipart's streaming parser) and the "file" part is
+written chunk by chunk to a temp file. The %PDF header is checked on the
+first bytes and the size limit (resume_upload_max_bytes) on every chunk, so
+a wrong or oversized upload is rejected before the rest is read. The PDF
+worker pool then opens the spooled file by path (pdf_text_service).
+
+Exported:
+  UploadError(status_code, message)
+  SpooledUpload                       .path, .size, .filename, .fields (other form fields)
+  spool_pdf_upload(request, field="file")  → async context manager → SpooledUpload
+                                             (the temp file is removed on exit)
+"""
+
+import os
+import logging
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, BinaryIO, Dict, Optional
+
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import Request
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_PDF_MAGIC = b"%PDF"
+_MAX_FIELD_BYTES = 1024
+# Multipart framing (boundaries, part headers, small fields) on top of the file
+_FRAMING_ALLOWANCE = 64 * 1024
+
+
+class UploadError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+class SpooledUpload:
+    def __init__(self, path: str, size: int, filename: Optional[str], fields: Dict[str, str]):
+        self.path = path
+        self.size = size
+        self.filename = filename
+        self.fields = fields
+
+
+class _Spooler:
+    """python-multipart callbacks: the file part goes to out, other parts to fields."""
+
+    def __init__(self, out: BinaryIO, file_field: str, max_bytes: int):
+        self.out = out
+        self.file_field = file_field
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.filename: Optional[str] = None
+        self.fields: Dict[str, str] = {}
+        self._seen_file = False
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._name: Optional[str] = None
+        self._is_file = False
+        self._head = b""
+        self._value = b""
+
+    def callbacks(self) -> Dict:
+        return {
+            "on_part_begin":        self._part_begin,
+            "on_header_field":      self._on_header_field,
+            "on_header_value":      self._on_header_value,
+            "on_header_end":        self._header_end,
+            "on_headers_finished":  self._headers_finished,
+            "on_part_data":         self._part_data,
+            "on_part_end":          self._part_end,
+        }
+
+    def _part_begin(self) -> None:
+        self._headers, self._name, self._is_file, self._value = {}, None, False, b""
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = options.get(b"name", b"").decode("utf-8", "replace")
+        if self._name == self.file_field:
+            if self._seen_file:
+                raise UploadError(400, f"Only one '{self.file_field}' part is accepted")
+            self._seen_file = self._is_file = True
+            filename = options.get(b"filename")
+            self.filename = filename.decode("utf-8", "replace") if filename else None
+
+    def _part_data(self, data: bytes, start: int, end: int) -> None:
+        chunk = data[start:end]
+        if not self._is_file:
+            self._value += chunk
+            if len(self._value) > _MAX_FIELD_BYTES:
+                raise UploadError(400, f"Form field '{self._name}' is too long")
+            return
+        if len(self._head) < len(_PDF_MAGIC):
+            self._head += chunk[:len(_PDF_MAGIC) - len(self._head)]
+            if not _PDF_MAGIC.startswith(self._head):
+                raise UploadError(415, "The uploaded file is not a PDF")
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadError(413, f"The PDF is larger than {self.max_bytes // (1024 * 1024)} MB")
+        self.out.write(chunk)
+
+    def _part_end(self) -> None:
+        if self._is_file:
+            if self.size and self._head != _PDF_MAGIC:
+                raise UploadError(415, "The uploaded file is not a PDF")
+        elif self._name:
+            self.fields[self._name] = self._value.decode("utf-8", "replace")
+
+
+@asynccontextmanager
+async def spool_pdf_upload(request: Request, field: str = "file") -> AsyncIterator[SpooledUpload]:
+    """Read a multipart/form-data body into a temp file; raises UploadError."""
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise UploadError(415, f"Expected multipart/form-data with the PDF in a '{field}' field")
+    max_bytes = settings.resume_upload_max_bytes
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes + _FRAMING_ALLOWANCE:
+        raise UploadError(413, f"The PDF is larger than {max_bytes // (1024 * 1024)} MB")
+
+    out = tempfile.NamedTemporaryFile(prefix="resume-", suffix=".pdf", delete=False)
+    try:
+        spooler = _Spooler(out, field, max_bytes)
+        parser = MultipartParser(boundary, spooler.callbacks())
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+            parser.finalize()
+        except MultipartParseError as e:
+            raise UploadError(400, f"Malformed multipart body: {e}")
+        out.close()
+        if not spooler.size:
+            raise UploadError(400, f"No PDF in the upload (form field '{field}')")
+        logger.info(f"Resume upload spooled: {spooler.size} bytes ({spooler.filename or 'unnamed'})")
+        yield SpooledUpload(out.name, spooler.size, spooler.filename, spooler.fields)
+    finally:
+        out.close()
+        try:
+            os.unlink(out.name)
+        except OSError:
+            pass
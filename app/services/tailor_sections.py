@@ -0,0 +1,422 @@
+"""
+Section-parallel resume tailoring.
+
+tailor_resume() asks for the whole tailored resume in one ~8k-token answer,
+so the user waits for the full generation. Here every section is its own
+small Claude call (feature route "tailor_section"):
+
+  summary          (+ target jobTitle / company)
+  skills
+  experience[i]    one call per experience block
+  projects
+  customSections
+
+The calls run concurrently (settings.tailor_section_concurrency at a time)
+and each section is emitted as soon as it is back. contact, education,
+certifications, achievements, publications and hobbies pass through
+verbatim. Merging keeps the guards of tailor_resume(): empty-resume guard,
+prompt budget, original titles / companies / dates / project metadata, no
+sections the user doesn't have, and the objective ATS re-score. Scores,
+keywordsAdded / keywordsPresent and sectionScores come from the local ATS
+engine, so with settings.ats_local_scoring off (Claude-only scoring) a
+tailoring goes through tailor_resume() instead, as does a plain-text
+resume. A section whose call fails keeps the original text.
+
+Rewritten sections are cached in tailor_section_cache, keyed by the
+section's content hash and the model. A section's targets are the JD terms
+it can address — those in the section or among the resume's skills
+(ats_engine.target_keywords); when a new JD's targets overlap
+a cached run's by tailor_cache_min_overlap (Jaccard), the cached rewrite is
+reused and only sections whose targets changed go back to Claude. summary is
+always regenerated — it carries the JD's title and company.
+
+Exported callables:
+  stream_tailor_resume(resume, job_description)  → async iterator of events
+      {"type": "section", "section": str, "data": Dict, "reused": bool}
+                                                          as each section finishes
+      {"type": "done", "result": Dict}                    TailorResumeResponse shape,
+                                                          with sectionsReused
+                                                          (or {"error", "message"})
+  tailor_resume_sections_async(resume, job_description) → Dict  (the "done" result)
+"""
+
+import json
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from app.config import settings
+from app.models.resume_ai.schemas import (
+    TailorCustomSectionsPart,
+    TailorExperiencePart,
+    TailorProjectsPart,
+    TailorSkillsPart,
+    TailorSummaryPart,
+    output_schema,
+)
+from app.services.ai_provider_service import call_ai_async, feature_model, get_served_model
+from app.services.ats_engine import score_resume, section_scores, target_keywords
+from app.services.mongo import mongo
+from app.services.prompt_budget import fit_job_description, fit_resume
+from app.services.resume_processor import apply_ats_cross_check, tailor_resume_async, tailor_resume_guard
+
+logger = logging.getLogger(__name__)
+
+_PASS_THROUGH = ("contact", "education", "certifications", "achievements", "publications", "hobbies")
+_MAX_NOTES = 5
+_MAX_KEYWORDS = 8
+_SECTION_MAX_TOKENS = 2048
+# Part of every cache key — bump it when the section prompts or schemas change
+_CACHE_VERSION = 1
+_CACHE_CANDIDATES = 20
+
+_RULES = """You are an expert ATS optimization specialist and professional resume writer.
+You are rewriting ONE section of a resume for MAXIMUM ATS compatibility against the job description.
+
+## ABSOLUTE RULES — DO NOT VIOLATE
+1. Rewrite only the section given to you. Never move content in from other sections.
+2. No fabrication. Keep all original facts — do not invent experience, employers, credentials, projects, skills or metrics. Quantify only with numbers already in the original.
+3. NEVER copy text from the Job Description. It is for keyword targeting only: weave its exact terminology ("CI/CD pipelines", "cross-functional collaboration") into the user's existing content where the content supports it.
+4. `note` describes your most important change: `section`, `note` (what changed and why), `before` (short excerpt of the original), `after` (the rewritten version).
+"""
+
+
+def _as_resume_dict(resume: Union[str, Dict]) -> Optional[Dict]:
+    if isinstance(resume, dict):
+        return resume
+    stripped = resume.strip() if isinstance(resume, str) else ""
+    if not stripped.startswith("{"):
+        return None
+    try:
+        parsed = json.loads(stripped)
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def _compact(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+# ── Section prompts ─────────────────────────────────────────
+def _summary_prompt(resume_text: str, job_description: str, has_summary: bool) -> str:
+    task = (
+        "Rewrite `summary` as a 2–3 sentence professional summary emphasizing JD-relevant experience the user actually has. Do not invent skills."
+        if has_summary else
+        "The user has no summary section: return `summary` as an empty string."
+    )
+    return f"""{_RULES}
+## Section: summary
+{task}
+Also return `jobTitle` and `company`: the role and employer of the Job Description ("" when not stated).
+
+Original Resume (the source of truth):
+{resume_text}
+
+Job Description (used ONLY for keyword targeting):
+{job_description}
+"""
+
+
+def _skills_prompt(skills: List, evidence: str, job_description: str) -> str:
+    return f"""{_RULES}
+## Section: skills
+Reorder the skills by descending JD relevance. Keep ALL original skills. You may add a JD-priority skill only if the
+user demonstrably has it in the experience / project evidence below.
+
+Original skills:
+{_compact(skills)}
+
+Experience and project evidence:
+{evidence}
+
+Job Description (used ONLY for keyword targeting):
+{job_description}
+"""
+
+
+def _experience_prompt(entry: Dict, job_description: str) -> str:
+    return f"""{_RULES}
+## Section: one experience entry
+Rewrite the `description` bullets with JD keywords and exact JD phrasing. Keep the same facts; return the bullets only
+(the title, company, dates and location are kept as they are).
+
+Original entry:
+{_compact(entry)}
+
+Job Description (used ONLY for keyword targeting):
+{job_description}
+"""
+
+
+def _projects_prompt(projects: List, job_description: str) -> str:
+    return f"""{_RULES}
+## Section: projects
+Rewrite each project's `description` to emphasize technologies and outcomes that match the JD. Return every project,
+in the same order, with its exact original `title`.
+
+Original projects:
+{_compact(projects)}
+
+Job Description (used ONLY for keyword targeting):
+{job_description}
+"""
+
+
+def _custom_sections_prompt(sections: Dict, job_description: str) -> str:
+    return f"""{_RULES}
+## Section: customSections
+A map of section name → text. Return every original key, unchanged, with its text enhanced for the JD the same way.
+
+Original customSections:
+{_compact(sections)}
+
+Job Description (used ONLY for keyword targeting):
+{job_description}
+"""
+
+
+async def _ask(prompt: str, schema) -> Dict:
+    result = await call_ai_async(prompt, temperature=0.0, max_tokens=_SECTION_MAX_TOKENS,
+                                 feature="tailor_section", schema=output_schema(schema))
+    if not isinstance(result, dict) or "error" in result:
+        raise RuntimeError((result or {}).get("message") or (result or {}).get("error") or "empty answer")
+    return result
+
+
+# ── Merging (original structure and facts always win) ──────
+def _merge_skills(original: List, part: Dict) -> List:
+    tailored = [s for s in part.get("skills") or [] if isinstance(s, str) and s.strip()]
+    seen = {s.lower() for s in tailored}
+    return tailored + [s for s in original if str(s).lower() not in seen]
+
+
+def _merge_experience(original: Dict, part: Dict) -> Dict:
+    bullets = [b for b in part.get("description") or [] if isinstance(b, str) and b.strip()]
+    return {**original, "description": bullets or original.get("description", [])}
+
+
+def _merge_projects(original: List, part: Dict) -> List:
+    by_title = {str(p.get("title", "")).lower(): p for p in part.get("projects") or [] if isinstance(p, dict)}
+    merged = []
+    for index, project in enumerate(original):
+        if not isinstance(project, dict):
+            merged.append(project)
+            continue
+        tailored = by_title.get(str(project.get("title", "")).lower())
+        if tailored is None and index < len(part.get("projects") or []):
+            tailored = part["projects"][index]
+        description = (tailored or {}).get("description")
+        merged.append({**project, "description": description or project.get("description", "")})
+    return merged
+
+
+def _merge_custom_sections(original: Dict, part: Dict) -> Dict:
+    tailored = part.get("customSections") or {}
+    return {key: tailored.get(key) or value for key, value in original.items()}
+
+
+# ── Section cache ───────────────────────────────────────────
+def _section_hash(key: str, content: str) -> str:
+    return hashlib.sha256(f"{_CACHE_VERSION}|{_label(key)}|{content}".encode("utf-8")).hexdigest()
+
+
+def _overlap(a: List[str], b: List[str]) -> float:
+    sa, sb = set(a), set(b)
+    return len(sa & sb) / len(sa | sb) if sa | sb else 1.0
+
+
+async def _cached_part(section_hash: str, model: str, targets: List[str]) -> Optional[Dict]:
+    """Best cached rewrite of this exact section whose targets overlap enough, else None."""
+    try:
+        cursor = mongo.tailor_section_cache.find(
+            {"section_hash": section_hash, "model": model},
+            {"keywords": 1, "part": 1},
+        ).sort("created_at", -1).limit(_CACHE_CANDIDATES)
+        best, best_overlap = None, settings.tailor_cache_min_overlap
+        async for doc in cursor:
+            overlap = _overlap(doc.get("keywords") or [], targets)
+            if overlap >= best_overlap:
+                best, best_overlap = doc.get("part"), overlap
+        return best
+    except Exception as e:  # the cache is an optimization — a read error means a Claude call
+        logger.warning(f"Tailor section cache read failed: {e}")
+        return None
+
+
+async def _store_part(section_hash: str, key: str, model: str, targets: List[str], part: Dict) -> None:
+    try:
+        await mongo.tailor_section_cache.insert_one({
+            "section_hash": section_hash,
+            "section":      _label(key),
+            "model":        model,
+            "keywords":     targets,
+            "part":         part,
+            "created_at":   datetime.utcnow(),
+        })
+    except Exception as e:
+        logger.warning(f"Tailor section cache write failed: {e}")
+
+
+# ── Jobs ────────────────────────────────────────────────────
+# (key, call, content) — content is the section input the answer depends on
+# besides the JD; None means the section is never cached.
+Job = Tuple[str, Callable[[], Awaitable[Dict]], Optional[str]]
+
+
+def _section_jobs(resume: Dict, resume_text: str, job_description: str) -> List[Job]:
+    jobs: List[Job] = [
+        ("summary", lambda: _ask(_summary_prompt(resume_text, job_description, bool(resume.get("summary"))),
+                                 TailorSummaryPart), None),
+    ]
+    if resume.get("skills"):
+        evidence = _compact({
+            "experience": [e.get("description") for e in resume.get("experience") or [] if isinstance(e, dict)],
+            "projects": [{"title": p.get("title"), "technologies": p.get("technologies"), "description": p.get("description")}
+                         for p in resume.get("projects") or [] if isinstance(p, dict)],
+        })
+        evidence, _ = fit_resume(evidence, settings.prompt_budget_resume_tokens // 2)
+        jobs.append(("skills", lambda: _ask(_skills_prompt(resume["skills"], evidence, job_description), TailorSkillsPart),
+                     _compact(resume["skills"]) + "\n" + evidence))
+    for index, entry in enumerate(resume.get("experience") or []):
+        if isinstance(entry, dict) and entry.get("description"):
+            jobs.append((f"experience:{index}",
+                         lambda entry=entry: _ask(_experience_prompt(entry, job_description), TailorExperiencePart),
+                         _compact(entry)))
+    if resume.get("projects"):
+        jobs.append(("projects", lambda: _ask(_projects_prompt(resume["projects"], job_description), TailorProjectsPart),
+                     _compact(resume["projects"])))
+    if resume.get("customSections"):
+        jobs.append(("customSections",
+                     lambda: _ask(_custom_sections_prompt(resume["customSections"], job_description), TailorCustomSectionsPart),
+                     _compact(resume["customSections"])))
+    return jobs
+
+
+def _apply(result: Dict, key: str, part: Dict, original: Dict) -> Dict:
+    """Merge one section answer into result; returns what changed (the streamed section payload)."""
+    if key == "summary":
+        result["summary"] = part.get("summary") or original.get("summary") or ""
+        result["jobTitle"] = part.get("jobTitle") or ""
+        result["company"] = part.get("company") or ""
+        return {"summary": result["summary"], "jobTitle": result["jobTitle"], "company": result["company"]}
+    if key == "skills":
+        result["skills"] = _merge_skills(original["skills"], part)
+        return {"skills": result["skills"]}
+    if key.startswith("experience:"):
+        index = int(key.split(":", 1)[1])
+        result["experience"][index] = _merge_experience(original["experience"][index], part)
+        return {"index": index, "experience": result["experience"][index]}
+    if key == "projects":
+        result["projects"] = _merge_projects(original["projects"], part)
+        return {"projects": result["projects"]}
+    result["customSections"] = _merge_custom_sections(original["customSections"], part)
+    return {"customSections": result["customSections"]}
+
+
+def _label(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+def _finish(result: Dict, original: Dict, notes: List[Dict], job_description: str) -> Dict:
+    before = score_resume(original, job_description)
+    after = score_resume(result, job_description)
+    result["optimizationNotes"] = notes[:_MAX_NOTES]
+    result["keywordsPresent"] = before["matchedSkills"][:_MAX_KEYWORDS]
+    result["keywordsAdded"] = [s for s in after["matchedSkills"] if s not in before["matchedSkills"]][:_MAX_KEYWORDS]
+    result["originalAtsScore"] = before["atsScore"]
+    result["sectionScores"] = section_scores(result, job_description)
+    apply_ats_cross_check(result, after)
+    return result
+
+
+async def stream_tailor_resume(resume: Union[str, Dict], job_description: str) -> AsyncIterator[Dict]:
+    original = _as_resume_dict(resume)
+    if original is None or not settings.ats_local_scoring:
+        # Plain-text resume (no sections to split on), or Claude-only scoring
+        text = resume if isinstance(resume, str) else json.dumps(resume, ensure_ascii=False)
+        yield {"type": "done", "result": await tailor_resume_async(text, job_description)}
+        return
+    guard = tailor_resume_guard(json.dumps(original))
+    if guard:
+        yield {"type": "done", "result": guard}
+        return
+
+    job_description, _ = fit_job_description(job_description, settings.prompt_budget_jd_tokens)
+    resume_text, _ = fit_resume(_compact(original), settings.prompt_budget_resume_tokens)
+
+    result: Dict = {key: original.get(key) or ([] if key != "contact" else {}) for key in _PASS_THROUGH}
+    result.update({
+        "summary": original.get("summary") or "",
+        "skills": list(original.get("skills") or []),
+        "experience": list(original.get("experience") or []),
+        "projects": list(original.get("projects") or []),
+        "customSections": dict(original.get("customSections") or {}),
+        "jobTitle": "",
+        "company": "",
+    })
+
+    gate = asyncio.Semaphore(max(1, settings.tailor_section_concurrency))
+    model = feature_model("tailor_section")
+    # Skills a rewrite may weave into any section (the rules forbid any others)
+    vocabulary = _compact(original.get("skills") or [])
+
+    async def run(key: str, job: Callable[[], Awaitable[Dict]],
+                  content: Optional[str]) -> Tuple[str, Optional[Dict], Optional[str], bool]:
+        cacheable = settings.tailor_section_cache and content is not None
+        if cacheable:
+            section_hash = _section_hash(key, content)
+            targets = target_keywords(job_description, f"{content}\n{vocabulary}")
+            cached = await _cached_part(section_hash, model, targets)
+            if cached is not None:
+                return key, cached, None, True
+        async with gate:
+            try:
+                part = await job()
+            except Exception as e:
+                logger.warning(f"Tailor section {key} failed, keeping the original: {e}")
+                return key, None, str(e), False
+        # Only answers from the requested model — a fallback's rewrite is not cached under its key
+        if cacheable and get_served_model() == model:
+            await _store_part(section_hash, key, model, targets, part)
+        return key, part, None, False
+
+    jobs = _section_jobs(original, resume_text, job_description)
+    tasks = [asyncio.create_task(run(key, job, content)) for key, job, content in jobs]
+    order = {key: i for i, (key, _, _) in enumerate(jobs)}
+    notes: Dict[str, Dict] = {}
+    failures: List[str] = []
+    reused = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            key, part, error, from_cache = await next_done
+            if part is None:
+                failures.append(error or "failed")
+                continue
+            reused += from_cache
+            if isinstance(part.get("note"), dict):
+                notes[key] = part["note"]
+            yield {"type": "section", "section": _label(key), "data": _apply(result, key, part, original),
+                   "reused": from_cache}
+    finally:
+        for task in tasks:
+            task.cancel()  # consumer went away mid-tailoring
+
+    if failures and len(failures) == len(jobs):
+        yield {"type": "done", "result": {"error": "ai_error", "message": failures[0]}}
+        return
+    ordered_notes = [notes[k] for k in sorted(notes, key=order.get)]
+    logger.info(f"Tailored {len(jobs) - len(failures)}/{len(jobs)} sections, {reused} reused from cache")
+    result["sectionsReused"] = reused
+    yield {"type": "done", "result": _finish(result, original, ordered_notes, job_description)}
+
+
+async def tailor_resume_sections_async(resume: Union[str, Dict], job_description: str) -> Dict:
+    """stream_tailor_resume() without the intermediate events."""
+    result: Dict = {}
+    async for event in stream_tailor_resume(resume, job_description):
+        if event["type"] == "done":
+            result = event["result"]
+    return result
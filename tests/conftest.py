@@ -0,0 +1,13 @@
+import os
+
+# app.config requires these; unit tests never reach Mongo, Google or the frontend
+for _name, _value in {
+    "MONGODB_URL": "mongodb://localhost:27017",
+    "MONGODB_DB_NAME": "resumematch_test",
+    "JWT_SECRET": "test-secret",
+    "GOOGLE_CLIENT_ID": "test",
+    "GOOGLE_CLIENT_SECRET": "test",
+    "GOOGLE_REDIRECT_URI": "http://localhost/callback",
+    "FRONTEND_BASE_URL": "http://localhost",
+}.items():
+    os.environ.setdefault(_name, _value)
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from app.services import ai_jobs
+from app.services.credits_service import CreditsService
+from app.services.mongo import MongoService
+
+
+class _UpdateResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+class _FakeJobs:
+    """The slice of a motor collection _finish / _refund use."""
+
+    def __init__(self, *docs):
+        self.docs = {doc["_id"]: dict(doc) for doc in docs}
+
+    @staticmethod
+    def _matches(doc, query):
+        for field, expected in query.items():
+            if isinstance(expected, dict) and "$ne" in expected:
+                if doc.get(field) == expected["$ne"]:
+                    return False
+            elif doc.get(field) != expected:
+                return False
+        return True
+
+    async def update_one(self, query, update):
+        doc = next((d for d in self.docs.values() if self._matches(d, query)), None)
+        if doc is None:
+            return _UpdateResult(0)
+        doc.update(update.get("$set", {}))
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+        for field, step in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + step
+        return _UpdateResult(1)
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    refunds = []
+
+    async def refund_credits(user_id, amount, reason="Processing failed"):
+        refunds.append((user_id, amount))
+
+    monkeypatch.setattr(CreditsService, "refund_credits", staticmethod(refund_credits))
+
+    def install(*docs):
+        fake = _FakeJobs(*docs)
+        monkeypatch.setattr(MongoService, "ai_jobs", property(lambda self: fake))
+        return fake, refunds
+
+    return install
+
+
+def _running(cost=4.0, claim="claim-1"):
+    return {"_id": ObjectId(), "user_id": "u1", "kind": "tailor_resume", "status": "running",
+            "claim": claim, "cost": cost, "refunded": False, "seq": 1, "payload": {"resume": "..."}}
+
+
+def test_failed_job_is_refunded_once_even_if_finished_twice(jobs):
+    doc = _running()
+    fake, refunds = jobs(doc)
+
+    asyncio.run(ai_jobs._finish(doc, {"error": "ai_error", "message": "boom"}))
+    fake.docs[doc["_id"]]["status"] = "running"  # a second worker finishing the same job
+    asyncio.run(ai_jobs._finish(doc, {"error": "ai_error", "message": "boom"}))
+
+    assert refunds == [("u1", 4.0)]
+    stored = fake.docs[doc["_id"]]
+    assert stored["status"] == "failed" and stored["credits_used"] == 0
+    assert stored["error"] == "boom" and "payload" not in stored
+
+
+def test_cheaper_result_refunds_the_difference(jobs):
+    doc = _running(cost=4.0)
+    fake, refunds = jobs(doc)
+
+    asyncio.run(ai_jobs._finish(doc, {"creditsUsed": 1.0, "summary": "..."}))
+
+    assert refunds == [("u1", 3.0)]
+    stored = fake.docs[doc["_id"]]
+    assert stored["status"] == "succeeded" and stored["credits_used"] == 1.0
+    assert stored["refunded_amount"] == 3.0
+
+
+def test_result_never_charges_more_than_the_job_cost(jobs):
+    doc = _running(cost=2.0)
+    fake, refunds = jobs(doc)
+
+    asyncio.run(ai_jobs._finish(doc, {"creditsUsed": 5.0}))
+
+    assert refunds == []
+    assert fake.docs[doc["_id"]]["credits_used"] == 2.0
+
+
+def test_finish_after_a_takeover_leaves_the_new_claim_alone(jobs):
+    doc = _running(claim="old-claim")
+    fake, refunds = jobs(doc)
+    # the lease lapsed and another worker claimed the job again
+    fake.docs[doc["_id"]]["claim"] = "new-claim"
+
+    asyncio.run(ai_jobs._finish(doc, {"error": "timeout", "message": "Processing took too long"}))
+
+    assert refunds == []
+    stored = fake.docs[doc["_id"]]
+    assert stored["status"] == "running" and stored["claim"] == "new-claim"
+    assert "payload" in stored
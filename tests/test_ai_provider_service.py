@@ -0,0 +1,226 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services import ai_provider_service as aps
+from app.services.ai_provider_service import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    _AdmissionController,
+    _KeyPool,
+    _repair_json,
+)
+
+MODEL = "claude-test"
+
+
+@pytest.fixture
+def admission(monkeypatch):
+    monkeypatch.setattr(aps._key_pool, "capacity", lambda: 1)
+    monkeypatch.setattr(settings, "claude_max_concurrency_per_model", 1)
+    monkeypatch.setattr(settings, "claude_tokens_per_minute", 1_000_000)
+    return _AdmissionController()
+
+
+def _enqueue(admission, tokens, flow, weight=1.0, priority=PRIORITY_INTERACTIVE, granted=None):
+    ticket = admission._enqueue(MODEL, tokens, (flow, weight, priority), lambda: None)
+    if granted is not None:
+        ticket.wake = lambda: granted.append(ticket)
+    return ticket
+
+
+# ── Admission: fair queuing ──────────────────────────────────
+def test_heavier_flow_is_served_in_proportion_to_its_weight(admission):
+    holder = _enqueue(admission, 100, "other")
+    assert holder.granted
+    granted = []
+    light = [_enqueue(admission, 100, "free", 1.0, granted=granted) for _ in range(3)]
+    heavy = [_enqueue(admission, 100, "paid", 3.0, granted=granted) for _ in range(3)]
+
+    admission.release(MODEL, holder)
+    while len(granted) < 6:
+        admission.release(MODEL, granted[-1])
+
+    # virtual finish tags: paid 33 / 67 / 100, free 100 / 200 / 300
+    assert granted[:2] == heavy[:2]
+    assert granted.index(heavy[2]) < granted.index(light[1])
+    assert granted[-2:] == light[1:]
+
+
+def test_flow_queued_later_is_not_starved_by_an_earlier_burst(admission):
+    holder = _enqueue(admission, 100, "other")
+    granted = []
+    burst = [_enqueue(admission, 100, "bursty", granted=granted) for _ in range(5)]
+    late = _enqueue(admission, 100, "late", granted=granted)
+
+    admission.release(MODEL, holder)
+    while len(granted) < 6:
+        admission.release(MODEL, granted[-1])
+
+    assert granted.index(late) < granted.index(burst[2])
+
+
+# ── Admission: background share ─────────────────────────────
+def test_background_work_is_capped_and_interactive_goes_first(admission, monkeypatch):
+    monkeypatch.setattr(settings, "claude_max_concurrency_per_model", 4)
+    monkeypatch.setattr(settings, "ai_background_max_share", 0.5)
+    lane = admission._lane(MODEL)
+
+    background = [_enqueue(admission, 10, f"cron{i}", priority=PRIORITY_BACKGROUND) for i in range(4)]
+    assert [t.granted for t in background] == [True, True, False, False]
+    assert lane.background_in_flight == 2
+
+    interactive = [_enqueue(admission, 10, f"user{i}") for i in range(3)]
+    assert [t.granted for t in interactive] == [True, True, False]
+
+    # a freed slot goes to the waiting interactive call, not to background
+    admission.release(MODEL, background[0])
+    assert interactive[2].granted
+    assert not background[2].granted
+
+    # background only refills its own share
+    admission.release(MODEL, interactive[0])
+    assert background[2].granted and not background[3].granted
+    assert lane.background_in_flight == 2
+
+
+# ── Admission: token window ─────────────────────────────────
+def test_oversized_request_runs_only_once_the_window_is_empty(admission, monkeypatch):
+    monkeypatch.setattr(settings, "claude_max_concurrency_per_model", 4)
+    monkeypatch.setattr(settings, "claude_tokens_per_minute", 1000)
+    lane = admission._lane(MODEL)
+
+    small = _enqueue(admission, 800, "a")
+    big = _enqueue(admission, 5000, "b")
+    assert small.granted and not big.granted
+
+    admission.release(MODEL, small)
+    assert not admission._poll(MODEL, big)  # its tokens still count for a minute
+
+    small.window_entry[0] -= admission._WINDOW_SECONDS
+    assert admission._poll(MODEL, big)
+    assert lane.in_flight == 1
+
+
+def test_actual_usage_replaces_the_estimate_in_the_window(admission, monkeypatch):
+    monkeypatch.setattr(settings, "claude_max_concurrency_per_model", 4)
+    monkeypatch.setattr(settings, "claude_tokens_per_minute", 1000)
+
+    first = _enqueue(admission, 900, "a")
+    second = _enqueue(admission, 500, "b")
+    assert not second.granted
+    admission.release(MODEL, first, actual_tokens=200)
+    assert second.granted
+
+
+# ── Admission: cancellation ─────────────────────────────────
+def test_cancelled_waiter_leaves_no_slot_or_queue_entry(admission):
+    async def scenario():
+        lane = admission._lane(MODEL)
+        async with admission.admit_async(MODEL, 10):
+            waiter = asyncio.create_task(_admit_and_hold(admission))
+            await asyncio.sleep(0.05)
+            assert len(lane.waiters) == 1
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            assert lane.waiters == [] and lane.in_flight == 1
+        assert lane.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiter_cancelled_right_after_its_grant_releases_the_slot(admission):
+    async def scenario():
+        lane = admission._lane(MODEL)
+        holder = admission.admit_async(MODEL, 10)
+        await holder.__aenter__()
+        waiter = asyncio.create_task(_admit_and_hold(admission))
+        await asyncio.sleep(0.05)
+        await holder.__aexit__(None, None, None)  # grants the waiter's ticket
+        waiter.cancel()                           # before it gets to run
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert lane.in_flight == 0 and lane.waiters == []
+
+    asyncio.run(scenario())
+
+
+async def _admit_and_hold(admission):
+    async with admission.admit_async(MODEL, 10):
+        await asyncio.sleep(10)
+
+
+# ── JSON repair ─────────────────────────────────────────────
+def test_repair_trailing_commas_and_prose():
+    text = 'Here you go:\n{"skills": ["Python", "Go",], "score": 80,}\nHope that helps.'
+    assert _repair_json(text) == {"skills": ["Python", "Go"], "score": 80}
+
+
+def test_repair_output_truncated_at_max_tokens():
+    assert _repair_json('{"summary": "Backend engineer", "skills": ["Python", "Ku') == {
+        "summary": "Backend engineer", "skills": ["Python", "Ku"],
+    }
+    assert _repair_json('{"a": [1, 2], "b": {"c":') == {"a": [1, 2], "b": {"c": None}}
+    assert _repair_json('[{"x": 1}, {"y": "a \\"quoted') == [{"x": 1}, {"y": 'a "quoted'}]
+
+
+def test_repair_raw_control_characters_in_strings():
+    assert _repair_json('{"note": "line one\nline two"}') == {"note": "line one\nline two"}
+
+
+def test_repair_gives_up_on_non_json():
+    assert _repair_json("I can't help with that.") is None
+    assert _repair_json("{not json at all") is None
+
+
+# ── Key pool ────────────────────────────────────────────────
+@pytest.fixture
+def key_pool(monkeypatch):
+    monkeypatch.setattr(settings, "claude_max_concurrency_per_model", 4)
+    monkeypatch.setattr(settings, "claude_key_cooldown_seconds", 30.0)
+    pool = _KeyPool()
+    entries = [{"id": "k1", "label": "primary", "key": "sk-1"}, {"id": "k2", "label": "extra", "key": "sk-2"}]
+    monkeypatch.setattr(pool, "_entries", lambda: entries)
+    return pool
+
+
+def _ratelimit_headers(remaining, limit=1000):
+    return {"anthropic-ratelimit-tokens-remaining": str(remaining), "anthropic-ratelimit-tokens-limit": str(limit)}
+
+
+class _Throttled(Exception):
+    status_code = 429
+
+
+def test_key_with_most_headroom_is_picked(key_pool):
+    key = key_pool.acquire()
+    key_pool.observe(key, _ratelimit_headers(50))
+    key_pool.release(key)
+    other = "sk-2" if key == "sk-1" else "sk-1"
+    assert key_pool.acquire() == other
+
+
+def test_calls_in_flight_spread_over_equal_keys(key_pool):
+    first = key_pool.acquire()
+    second = key_pool.acquire()
+    assert {first, second} == {"sk-1", "sk-2"}
+
+
+def test_throttled_key_cools_down_until_every_key_does(key_pool):
+    key_pool.release(key_pool.acquire(), error=_Throttled("rate_limit"))
+    assert key_pool.capacity() == 1
+    assert key_pool.acquire() == "sk-2"
+
+    key_pool.release("sk-2", error=_Throttled("rate_limit"))
+    assert not key_pool.has_ready()
+    # all cooling down: the one that recovers first
+    assert key_pool.acquire() == "sk-1"
+
+
+def test_observe_ignores_responses_without_ratelimit_headers(key_pool):
+    key = key_pool.acquire()
+    key_pool.observe(key, {"content-type": "application/json"})
+    key_pool.observe(key, None)
+    assert key_pool.snapshot()[0]["ratelimit"] == {}
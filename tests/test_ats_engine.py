@@ -0,0 +1,90 @@
+import json
+
+from app.services.ats_engine import _terms, keyword_buckets, score_resume, section_scores, target_keywords
+
+
+JD = """Senior Backend Engineer
+Requirements: 5+ years of Python and Node.js, PostgreSQL, Kubernetes and CI/CD.
+Must have experience with Kafka. Nice to have: Go, Terraform.
+You will design payment services and payment APIs."""
+
+TEXT_RESUME = """Jane Doe
+jane@example.com | +1 555 0100
+
+Summary
+Backend engineer building payment services.
+
+Skills: Python, NodeJS, Postgres, k8s, Docker
+
+Experience
+Acme Corp - built payment services in Python with Kafka and continuous integration pipelines.
+
+Education
+B.S. Computer Science
+"""
+
+DICT_RESUME = {
+    "contact": {"name": "Jane Doe", "email": "jane@example.com"},
+    "summary": "Backend engineer building payment services.",
+    "skills": ["Python", "NodeJS", "Postgres", "k8s", "Docker"],
+    "experience": [{"title": "Engineer", "company": "Acme Corp",
+                    "description": ["Built payment services in Python with Kafka and continuous integration pipelines."]}],
+    "education": [{"institution": "State University", "degree": "B.S. Computer Science"}],
+    "jobTitle": "Senior Backend Engineer",
+}
+
+
+def test_aliases_fold_onto_canonical_skills():
+    assert _terms("node.js") == _terms("nodejs") == _terms("Node JS") == ["Node.js"]
+    assert _terms("c++ and cpp") == ["C++", "C++"]
+    assert _terms("ci/cd") == _terms("CI CD") == _terms("continuous integration") == ["CI/CD"]
+    assert _terms("k8s") == ["Kubernetes"]
+    # a slash between two skills splits them
+    assert _terms("python/django") == ["Python", "Django"]
+
+
+def test_case_sensitive_skills_only_count_as_written():
+    assert "Go" in _terms("Go, Python")
+    assert "Go" not in _terms("ready to go live")
+    assert "R" in _terms("Statistics in R")
+    assert "R" not in _terms("r")
+    assert _terms("golang") == ["Go"]
+
+
+def test_text_and_dict_resumes_match_the_same_skills():
+    text = score_resume(TEXT_RESUME, JD)
+    structured = score_resume(DICT_RESUME, JD)
+    for result in (text, structured):
+        assert {"Python", "Node.js", "PostgreSQL", "Kubernetes", "Kafka", "CI/CD"} <= set(result["matchedSkills"])
+        assert {"Go", "Terraform"} <= set(result["missingSkills"])
+        assert 0 <= result["atsScore"] <= 100
+        assert set(result["scoreBreakdown"]) == {"formatting", "keywords", "structure", "relevance"}
+    # the same content as JSON text scores as the dict
+    assert score_resume(json.dumps(DICT_RESUME), JD) == structured
+
+
+def test_sections_come_from_headings_and_keys():
+    sections = {s["section"] for s in section_scores(TEXT_RESUME, JD)}
+    assert {"Summary", "Skills", "Experience", "Education"} <= sections
+    buckets = {c["name"]: c["keywords"] for c in keyword_buckets(DICT_RESUME, JD)["categories"]}
+    assert "Python" in buckets["Skills Relevant"]
+    assert "Kafka" in buckets["Experience Relevant"]
+    assert "Terraform" in buckets["Not Relevant"]
+
+
+def test_missing_skills_lower_the_score():
+    full = score_resume(TEXT_RESUME + "\nGo, Terraform, CI/CD\n", JD)
+    assert full["atsScore"] > score_resume(TEXT_RESUME, JD)["atsScore"]
+    assert full["missingSkills"] == []
+
+
+def test_empty_resume_or_job_description():
+    empty_resume = score_resume("", JD)
+    assert empty_resume["matchedSkills"] == []
+    assert empty_resume["scoreBreakdown"]["keywords"] == 0
+    empty_jd = score_resume(TEXT_RESUME, "")
+    assert empty_jd["matchedSkills"] == empty_jd["missingSkills"] == []
+    assert empty_jd["scoreBreakdown"]["relevance"] == 0
+    assert all(c["keywords"] == [] for c in keyword_buckets(TEXT_RESUME, "")["categories"])
+    assert target_keywords("", TEXT_RESUME) == []
+    assert score_resume({}, "")["atsScore"] >= 0
@@ -0,0 +1,74 @@
+import json
+
+from app.services.prompt_budget import count_tokens, fit_resume
+
+
+def _text_resume() -> str:
+    roles = "\n".join(
+        f"Senior Engineer, Company {i} (201{i % 10}-202{i % 10}) - built and operated distributed "
+        f"payment services, led migrations, mentored engineers and owned on-call for team {i}."
+        for i in range(135)
+    )
+    return (
+        "Jane Doe\njane@example.com | +1 555 0100\n\n"
+        f"Experience\n{roles}\n\n"
+        "Skills\nPython, Go, Kubernetes, Terraform, PostgreSQL, Kafka\n\n"
+        "Hobbies\nClimbing, chess, baking sourdough bread every weekend"
+    )
+
+
+def _json_resume() -> dict:
+    return {
+        "contact": {"name": "Jane Doe", "email": "jane@example.com"},
+        "summary": "Backend engineer focused on payments and reliability. " * 20,
+        "skills": ["Python", "Go", "Kubernetes", "Terraform", "PostgreSQL"],
+        "experience": [
+            {"title": f"Engineer {i}", "company": f"Company {i}",
+             "bullets": [f"Shipped service {i}.{j} handling millions of requests per day" for j in range(10)]}
+            for i in range(15)
+        ],
+        "projects": [{"name": f"Project {i}", "description": "A side project. " * 30} for i in range(10)],
+        "hobbies": ["climbing", "chess"],
+    }
+
+
+def test_text_resume_keeps_skills_within_budget():
+    text = _text_resume()
+    assert count_tokens(text) > 6000
+
+    out, report = fit_resume(text, 1000)
+
+    assert count_tokens(out) <= 1000
+    assert "Skills" in out and "Kubernetes" in out
+    assert "Jane Doe" in out
+    # Lowest priority goes first; experience is cut, not dropped
+    assert "Hobbies" not in out
+    assert "Company 0" in out
+    assert report["tokens_after"] <= 1000
+
+
+def test_json_resume_is_cut_to_budget_and_reports_dropped_entries():
+    data = _json_resume()
+    text = json.dumps(data)
+    assert count_tokens(text) > 1500
+
+    out, report = fit_resume(text, 1500)
+
+    assert count_tokens(out) <= 1500
+    fitted = json.loads(out)
+    assert fitted["skills"] == data["skills"]
+    assert fitted["experience"][0]["title"] == "Engineer 0"
+    dropped = report["dropped"]
+    assert dropped["sections"]["hobbies"] == data["hobbies"]
+    # Everything left out of the prompt is reported, oldest entries in order
+    kept = len(fitted.get("projects", []))
+    assert dropped["entries"]["projects"] == data["projects"][kept:]
+    kept = len(fitted["experience"])
+    assert dropped["entries"].get("experience", []) == data["experience"][kept:]
+
+
+def test_json_resume_within_budget_is_unchanged():
+    data = {"skills": ["Python"], "experience": [{"title": "Engineer"}]}
+    out, report = fit_resume(json.dumps(data), 1000)
+    assert json.loads(out) == data
+    assert report["dropped"] == {"sections": {}, "entries": {}}